@@ -3,9 +3,11 @@ BWW Assistant FastAPI Server
 Main FastAPI application with lifecycle management
 """
 
+import asyncio
 from typing import Any, Dict
 
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 import uvicorn
@@ -14,7 +16,7 @@ from pathlib import Path
 
 from config.logging_config import setup_logging, get_logger
 from config.settings import settings
-from database import create_all_tables
+from database import create_all_tables, create_missing_indexes
 from Server.routes import dashboard, api, webhook, settings_api
 
 # Setup logging
@@ -27,8 +29,9 @@ async def lifespan(app: FastAPI):
     """Application lifespan manager"""
     # Startup
     try:
-        # Create database tables
+        # Create database tables, and indexes added to tables that already exist
         create_all_tables()
+        create_missing_indexes()
         logger.info("Database initialized successfully")
 
         # Initialize all services using the new modular architecture
@@ -54,6 +57,14 @@ async def lifespan(app: FastAPI):
 
     # Shutdown
     try:
+        # Flush the buffered lead writes and queued Facebook syncs of the lead
+        # center instances the routes create themselves
+        for lead_center in (webhook.facebook_lead_center, dashboard.lead_automation):
+            try:
+                lead_center.shutdown()
+            except Exception as e:
+                logger.warning(f"Lead center shutdown failed: {e}")
+
         # Shutdown all services using the modular architecture
         try:
             if hasattr(app.state, 'service_bootstrap') and app.state.service_bootstrap:
@@ -73,6 +84,14 @@ app = FastAPI(
     lifespan=lifespan
 )
 
+
+@app.exception_handler(Exception)
+async def unhandled_exception_handler(request: Request, exc: Exception) -> JSONResponse:
+    """Log unexpected errors centrally instead of in every service method"""
+    logger.exception(f"Unhandled error on {request.method} {request.url.path}: {exc}")
+    return JSONResponse(status_code=500, content={"detail": "Internal server error"})
+
+
 # Mount static files from app/static (services are still in app/)
 project_root = Path(__file__).parent.parent
 static_dir = project_root / "app" / "static"
@@ -108,7 +127,8 @@ async def health_check():
         # Check service bootstrap health if available
         if hasattr(app.state, 'service_bootstrap') and app.state.service_bootstrap:
             try:
-                service_health = app.state.service_bootstrap.health_check()
+                # Probes block (Graph API retries back off with sleep), so wait off the loop
+                service_health = await asyncio.to_thread(app.state.service_bootstrap.health_check)
                 health_status["services"] = service_health
             except Exception as e:
                 health_status["service_error"] = str(e)
@@ -1061,7 +1061,7 @@ async def sync_leads_to_facebook() -> Dict[str, Any]:
         if not lead_automation:
             raise HTTPException(status_code=503, detail="Lead automation service unavailable")
 
-        results = lead_automation.sync_all_leads_to_facebook()
+        results = await lead_automation.sync_all_leads_to_facebook_async()
 
         return {
             "success": True,
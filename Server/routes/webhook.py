@@ -234,10 +234,9 @@ async def leadgen_webhook_post(request: Request):
         webhook_data = await request.json()
         logger.info(f"Received leadgen webhook: {webhook_data}")
 
-        # Process the leadgen webhook
-        results = facebook_lead_center.process_leadgen_webhook(webhook_data)
+        # Process the leadgen webhook off the event loop (the wrapper logs the results)
+        results = await facebook_lead_center.process_leadgen_webhook_async(webhook_data)
 
-        logger.info(f"Leadgen webhook processed: {results}")
         return {"status": "ok", "results": results}
 
     except Exception as e:
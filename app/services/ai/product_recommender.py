@@ -2,13 +2,125 @@
 BWW Store Product Recommendation Engine
 Smart recommendations based on customer behavior and preferences
 """
+import asyncio
 import logging
-from typing import Dict, Any, List, Optional
+import time
+from typing import Dict, Any, Iterable, List, Optional, Tuple
 from datetime import datetime, timezone
-from collections import Counter
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
+from functools import lru_cache
 
 logger = logging.getLogger(__name__)
 
+# Egyptian market outfit matching rules (built once at import)
+_COMPLEMENTARY_RULES: Dict[str, Tuple[str, ...]] = {
+    "فستان": ("حذاء", "شنطة", "إكسسوارات", "حجاب"),
+    "بنطلون": ("بلوزة", "تيشرت", "جاكيت", "حذاء"),
+    "بلوزة": ("بنطلون", "تنورة", "جاكيت"),
+    "تنورة": ("بلوزة", "تيشرت", "حذاء"),
+    "جاكيت": ("بنطلون", "تنورة", "بلوزة"),
+    "حذاء": ("شنطة", "إكسسوارات"),
+    "عباية": ("حجاب", "شنطة", "حذاء"),
+    "حجاب": ("بلوزة", "فستان", "عباية"),
+}
+
+
+def _normalize_color(color: Any) -> str:
+    """Canonical form of a free-text product color (trimmed, single-spaced, casefolded)"""
+    return " ".join(str(color).split()).casefold() if color else ""
+
+
+@lru_cache(maxsize=512)
+def _build_outfit(category: str, color: str) -> Tuple[Tuple[str, str, str], ...]:
+    """Top-2 (item, search_query, message) outfit suggestions per (category, normalized color)"""
+    return tuple(
+        (item, f"{item} {color}" if color else item, f"يمكنك تنسيقها مع {item}! 👗✨")
+        for item in _COMPLEMENTARY_RULES.get(category, ())[:2]
+    )
+
+
+# Smart response fragments
+_BULLET = "• "
+_RECOMMENDATIONS_HEADER = "\n\n💡 توصيات لك:"
+_SECTION_BREAK = "\n\n"
+_PRODUCTS_SENT_MESSAGE = "تم إرسال المنتجات!"
+
+# Viewed categories/colors/prices kept per customer
+_MAX_VIEWS = 50
+
+# Least-recently-active customers are evicted beyond this, and once idle this long
+_DEFAULT_MAX_CUSTOMERS = 100_000
+_PREFS_IDLE_SECONDS = 30 * 24 * 60 * 60
+
+
+def _mode(values) -> Optional[str]:
+    """Most frequent value (first seen wins ties); cheaper than Counter for short histories"""
+    counts: Dict[str, int] = {}
+    for value in values:
+        counts[value] = counts.get(value, 0) + 1
+    return max(counts, key=counts.__getitem__) if counts else None
+
+
+def _mean_price(prices) -> float:
+    """Average of a non-empty price history"""
+    return sum(prices) / len(prices)
+
+
+def _is_hashable(value: Any) -> bool:
+    """Whether ``value`` can be counted by _mode()"""
+    try:
+        hash(value)
+    except TypeError:
+        return False
+    return True
+
+
+# (user_id, search_query, viewed_products)
+TrackingEvent = Tuple[str, str, List[Dict[str, Any]]]
+
+
+def _extract_views(
+    viewed_products: Iterable[Dict[str, Any]]
+) -> Tuple[List[Any], List[Any], List[float]]:
+    """Categories, colors and numeric prices of the viewed products, in one pass
+
+    Unhashable categories and colors (e.g. lists) are dropped here so they can
+    never break the favorite counts in get_recommendations().
+    """
+    categories: List[Any] = []
+    colors: List[Any] = []
+    prices: List[float] = []
+    for product in viewed_products:
+        category = product.get("category")
+        if category is not None and _is_hashable(category):
+            categories.append(category)
+
+        color = product.get("color")
+        if color is not None and _is_hashable(color):
+            colors.append(color)
+
+        price = product.get("price")
+        if price is not None:
+            try:
+                prices.append(float(price))
+            except (TypeError, ValueError):
+                continue
+    return categories, colors, prices
+
+
+@dataclass(slots=True)
+class CustomerPrefs:
+    """Per-customer preference record"""
+    last_query: Optional[str] = None
+    search_count: int = 0
+    viewed_categories: deque = field(default_factory=lambda: deque(maxlen=_MAX_VIEWS))
+    viewed_colors: deque = field(default_factory=lambda: deque(maxlen=_MAX_VIEWS))
+    price_range: deque = field(default_factory=lambda: deque(maxlen=_MAX_VIEWS))
+    last_interaction: Optional[str] = None
+    # Monotonic time of the last track or read, for idle expiry
+    last_seen: float = field(default_factory=time.monotonic)
+
 
 class ProductRecommender:
     """
@@ -22,13 +134,42 @@ class ProductRecommender:
     - Personalized recommendations based on history
     """
 
-    def __init__(self):
-        """Initialize the recommendation engine"""
-        self.customer_preferences: Dict[str, Dict[str, Any]] = {}
+    def __init__(self, max_customers: int = _DEFAULT_MAX_CUSTOMERS):
+        """
+        Initialize the recommendation engine
+
+        Args:
+            max_customers: LRU capacity of the preference store
+        """
+        self.customer_preferences: "OrderedDict[str, CustomerPrefs]" = OrderedDict()
+        self._max_customers = max_customers
         self._initialized = True
         logger.info("Product Recommender initialized")
 
-    async def track_product_interest(
+    def _load_prefs(self, user_id: str) -> Optional[CustomerPrefs]:
+        """Get a user's preferences, marking them recently used; idle ones are dropped"""
+        prefs = self.customer_preferences.get(user_id)
+        if prefs is None:
+            return None
+        now = time.monotonic()
+        if now - prefs.last_seen > _PREFS_IDLE_SECONDS:
+            del self.customer_preferences[user_id]
+            return None
+        prefs.last_seen = now
+        self.customer_preferences.move_to_end(user_id)
+        return prefs
+
+    def _evict_idle(self, now: float) -> None:
+        """Drop customers idle past _PREFS_IDLE_SECONDS; the LRU head is always the most idle"""
+        prefs_table = self.customer_preferences
+        cutoff = now - _PREFS_IDLE_SECONDS
+        while prefs_table:
+            user_id, prefs = next(iter(prefs_table.items()))
+            if prefs.last_seen >= cutoff:
+                break
+            del prefs_table[user_id]
+
+    def track_product_interest(
         self,
         user_id: str,
         search_query: str,
@@ -42,156 +183,144 @@ class ProductRecommender:
             search_query: Search query used
             viewed_products: List of products shown to customer
         """
-        try:
-            if user_id not in self.customer_preferences:
-                self.customer_preferences[user_id] = {
-                    "searches": [],
-                    "viewed_categories": [],
-                    "viewed_colors": [],
-                    "price_range": [],
-                    "last_interaction": None
-                }
-
-            prefs = self.customer_preferences[user_id]
-
-            # Track search query
-            prefs["searches"].append({
-                "query": search_query,
-                "timestamp": datetime.now(timezone.utc).isoformat()
-            })
-
-            # Extract categories and colors from viewed products
-            for product in viewed_products:
-                if "category" in product:
-                    prefs["viewed_categories"].append(product["category"])
-
-                if "color" in product:
-                    prefs["viewed_colors"].append(product["color"])
-
-                if "price" in product:
-                    prefs["price_range"].append(float(product["price"]))
-
-            prefs["last_interaction"] = datetime.now(timezone.utc).isoformat()
-
-            # Keep only last 20 searches
-            if len(prefs["searches"]) > 20:
-                prefs["searches"] = prefs["searches"][-20:]
-
-            # Keep only last 50 category/color views
-            if len(prefs["viewed_categories"]) > 50:
-                prefs["viewed_categories"] = prefs["viewed_categories"][-50:]
+        self.track_many(((user_id, search_query, viewed_products),))
+        logger.info("Tracked product interest for user %s: %s", user_id, search_query)
 
-            if len(prefs["viewed_colors"]) > 50:
-                prefs["viewed_colors"] = prefs["viewed_colors"][-50:]
-
-            logger.info(f"Tracked product interest for user {user_id}: {search_query}")
+    def track_many(self, events: Iterable[TrackingEvent]) -> int:
+        """
+        Track a batch of product interest events (e.g. analytics backfills)
 
-        except Exception as e:
-            logger.error(f"Error tracking product interest: {e}")
+        Args:
+            events: Iterable of (user_id, search_query, viewed_products) tuples
 
-    async def get_recommendations(
-        self,
-        user_id: str,
-        current_context: Optional[str] = None
-    ) -> Dict[str, Any]:
+        Returns:
+            Number of events tracked; malformed events are logged and skipped
+        """
+        now = datetime.now(timezone.utc).isoformat()
+        seen = time.monotonic()
+        self._evict_idle(seen)
+        prefs_table = self.customer_preferences
+        move_to_end = prefs_table.move_to_end
+        max_customers = self._max_customers
+        count = 0
+        for event in events:
+            # Read the whole event before touching any state, so a malformed one
+            # is skipped cleanly instead of being half-applied
+            try:
+                user_id, search_query, viewed_products = event
+                categories, colors, prices = _extract_views(viewed_products)
+                prefs = prefs_table.get(user_id)
+            except (TypeError, ValueError, AttributeError) as e:
+                logger.warning("Skipped malformed product interest event: %s", e)
+                continue
+
+            if prefs is None:
+                prefs = prefs_table[user_id] = CustomerPrefs()
+                if len(prefs_table) > max_customers:
+                    prefs_table.popitem(last=False)
+            else:
+                move_to_end(user_id)
+
+            # Only the latest query is ever read back, so keep it plus a running count
+            prefs.last_query = search_query
+            prefs.search_count += 1
+            prefs.last_interaction = now
+            prefs.last_seen = seen
+
+            # Deques keep only the last _MAX_VIEWS of each
+            prefs.viewed_categories.extend(categories)
+            prefs.viewed_colors.extend(colors)
+            prefs.price_range.extend(prices)
+            count += 1
+        return count
+
+    def get_recommendations(self, user_id: str) -> Dict[str, Any]:
         """
         Get personalized product recommendations
 
         Args:
             user_id: Customer ID
-            current_context: Current conversation context
 
         Returns:
             Dictionary with recommendations and reasoning
         """
-        try:
-            if user_id not in self.customer_preferences:
-                return {
-                    "has_recommendations": False,
-                    "message": "لا توجد توصيات حالياً - جرب البحث عن منتجات أولاً! 🛍️"
-                }
-
-            prefs = self.customer_preferences[user_id]
-            recommendations: List[Dict[str, str]] = []
-
-            # Initialize Counter variables outside if blocks to avoid "possibly unbound" errors
-            category_counts: Optional[Counter[str]] = None
-            favorite_category: Optional[str] = None
-            color_counts: Optional[Counter[str]] = None
-            favorite_color: Optional[str] = None
-
-            # Analyze favorite categories
-            if prefs["viewed_categories"]:
-                category_counts = Counter(prefs["viewed_categories"])
-                favorite_category = category_counts.most_common(1)[0][0]
-                recommendations.append({
-                    "type": "favorite_category",
-                    "suggestion": f"منتجات {favorite_category} جديدة وصلت! 🎉",
-                    "search_query": favorite_category,
-                    "reason": "based_on_browsing_history"
-                })
+        prefs = self._load_prefs(user_id)
+        if prefs is None:
+            return {
+                "has_recommendations": False,
+                "message": "لا توجد توصيات حالياً - جرب البحث عن منتجات أولاً! 🛍️"
+            }
+        recommendations: List[Dict[str, str]] = []
+        viewed_categories = prefs.viewed_categories
+        viewed_colors = prefs.viewed_colors
+        price_range = prefs.price_range
+        last_query = prefs.last_query
+
+        # Each favorite is computed once and shared with customer_profile below
+        favorite_category = _mode(viewed_categories)
+        favorite_color = _mode(viewed_colors)
+        avg_price: float = 0
+
+        # Analyze favorite categories
+        if favorite_category is not None:
+            recommendations.append({
+                "type": "favorite_category",
+                "suggestion": f"منتجات {favorite_category} جديدة وصلت! 🎉",
+                "search_query": favorite_category,
+                "reason": "based_on_browsing_history"
+            })
 
-            # Analyze favorite colors
-            if prefs["viewed_colors"]:
-                color_counts = Counter(prefs["viewed_colors"])
-                favorite_color = color_counts.most_common(1)[0][0]
+        # Analyze favorite colors
+        if favorite_color is not None:
+            recommendations.append({
+                "type": "favorite_color",
+                "suggestion": f"منتجات {favorite_color} مميزة! 🌈",
+                "search_query": favorite_color,
+                "reason": "based_on_color_preference"
+            })
+
+        # Price range recommendations
+        if price_range:
+            avg_price = _mean_price(price_range)
+            if avg_price < 500:
                 recommendations.append({
-                    "type": "favorite_color",
-                    "suggestion": f"منتجات {favorite_color} مميزة! 🌈",
-                    "search_query": favorite_color,
-                    "reason": "based_on_color_preference"
+                    "type": "price_match",
+                    "suggestion": "عروض وأسعار مناسبة تحت 500 جنيه! 💰",
+                    "search_query": "budget friendly",
+                    "reason": "based_on_price_preference"
                 })
-
-            # Price range recommendations
-            if prefs["price_range"]:
-                avg_price = sum(prefs["price_range"]) / len(prefs["price_range"])
-                if avg_price < 500:
-                    recommendations.append({
-                        "type": "price_match",
-                        "suggestion": "عروض وأسعار مناسبة تحت 500 جنيه! 💰",
-                        "search_query": "budget friendly",
-                        "reason": "based_on_price_preference"
-                    })
-                elif avg_price > 800:
-                    recommendations.append({
-                        "type": "price_match",
-                        "suggestion": "منتجات مميزة وفاخرة! ✨",
-                        "search_query": "premium quality",
-                        "reason": "based_on_price_preference"
-                    })
-
-            # Recent searches
-            if prefs["searches"]:
-                recent_search = prefs["searches"][-1]["query"]
+            elif avg_price > 800:
                 recommendations.append({
-                    "type": "recent_search",
-                    "suggestion": f"منتجات مشابهة لـ '{recent_search}' 🔍",
-                    "search_query": recent_search,
-                    "reason": "based_on_recent_search"
+                    "type": "price_match",
+                    "suggestion": "منتجات مميزة وفاخرة! ✨",
+                    "search_query": "premium quality",
+                    "reason": "based_on_price_preference"
                 })
 
-            return {
-                "has_recommendations": len(recommendations) > 0,
-                "recommendations": recommendations[:3],  # Top 3 recommendations
-                "customer_profile": {
-                    "total_searches": len(prefs["searches"]),
-                    "favorite_category": category_counts.most_common(1)[0][0] if category_counts and prefs["viewed_categories"] else None,
-                    "favorite_color": color_counts.most_common(1)[0][0] if color_counts and prefs["viewed_colors"] else None,
-                    "avg_price_range": sum(prefs["price_range"]) / len(prefs["price_range"]) if prefs["price_range"] else 0
-                }
-            }
+        # Recent searches
+        if last_query:
+            recommendations.append({
+                "type": "recent_search",
+                "suggestion": f"منتجات مشابهة لـ '{last_query}' 🔍",
+                "search_query": last_query,
+                "reason": "based_on_recent_search"
+            })
 
-        except Exception as e:
-            logger.error(f"Error getting recommendations: {e}")
-            return {
-                "has_recommendations": False,
-                "error": str(e)
+        return {
+            "has_recommendations": len(recommendations) > 0,
+            "recommendations": recommendations[:3],  # Top 3 recommendations
+            "customer_profile": {
+                "total_searches": prefs.search_count,
+                "favorite_category": favorite_category,
+                "favorite_color": favorite_color,
+                "avg_price_range": avg_price
             }
+        }
 
-    async def get_complementary_items(
+    def get_complementary_items(
         self,
         product_category: str
-    ) -> List[str]:
+    ) -> Tuple[str, ...]:
         """
         Get complementary item suggestions (outfit matching)
 
@@ -199,23 +328,11 @@ class ProductRecommender:
             product_category: Category of current product
 
         Returns:
-            List of complementary categories
+            Tuple of complementary categories
         """
-        # Egyptian market outfit matching rules
-        complementary_rules = {
-            "فستان": ["حذاء", "شنطة", "إكسسوارات", "حجاب"],
-            "بنطلون": ["بلوزة", "تيشرت", "جاكيت", "حذاء"],
-            "بلوزة": ["بنطلون", "تنورة", "جاكيت"],
-            "تنورة": ["بلوزة", "تيشرت", "حذاء"],
-            "جاكيت": ["بنطلون", "تنورة", "بلوزة"],
-            "حذاء": ["شنطة", "إكسسوارات"],
-            "عباية": ["حجاب", "شنطة", "حذاء"],
-            "حجاب": ["بلوزة", "فستان", "عباية"]
-        }
-
-        return complementary_rules.get(product_category, [])
+        return _COMPLEMENTARY_RULES.get(product_category, ())
 
-    async def suggest_outfit_combinations(
+    def suggest_outfit_combinations(
         self,
         viewed_product: Dict[str, Any]
     ) -> Dict[str, Any]:
@@ -228,37 +345,52 @@ class ProductRecommender:
         Returns:
             Dictionary with outfit suggestions
         """
-        try:
-            category = viewed_product.get("category", "")
-            color = viewed_product.get("color", "")
-
-            complementary = await self.get_complementary_items(category)
-
-            if not complementary:
-                return {
-                    "has_suggestions": False
-                }
+        category = viewed_product.get("category", "")
+        color = _normalize_color(viewed_product.get("color", ""))
 
-            suggestions: List[Dict[str, str]] = []
-
-            # Suggest matching items
-            for item in complementary[:2]:  # Top 2 matches
-                suggestions.append({
-                    "item": item,
-                    "search_query": f"{item} {color}" if color else item,
-                    "message": f"يمكنك تنسيقها مع {item}! 👗✨"
-                })
+        try:
+            suggestions = _build_outfit(category, color)
+        except TypeError:  # unhashable category from a malformed product
+            return {"has_suggestions": False}
 
+        if not suggestions:
             return {
-                "has_suggestions": True,
-                "suggestions": suggestions,
-                "message": f"نصيحة تنسيق: {category} يليق معاها:",
-                "complementary_items": complementary
+                "has_suggestions": False
             }
 
+        return {
+            "has_suggestions": True,
+            # Fresh dicts per call; the cached tuples stay immutable
+            "suggestions": [
+                {"item": item, "search_query": search_query, "message": message}
+                for item, search_query, message in suggestions
+            ],
+            "message": f"نصيحة تنسيق: {category} يليق معاها:",
+            "complementary_items": self.get_complementary_items(category)
+        }
+
+    def _schedule_tracking(
+        self,
+        user_id: str,
+        search_query: str,
+        viewed_products: List[Dict[str, Any]]
+    ) -> None:
+        """Run track_product_interest after the current response is produced"""
+        asyncio.get_running_loop().call_soon(
+            self._track_in_background, user_id, search_query, list(viewed_products)
+        )
+
+    def _track_in_background(
+        self,
+        user_id: str,
+        search_query: str,
+        viewed_products: List[Dict[str, Any]]
+    ) -> None:
+        """Scheduled tracking call; nobody awaits it, so failures are logged here"""
+        try:
+            self.track_product_interest(user_id, search_query, viewed_products)
         except Exception as e:
-            logger.error(f"Error suggesting outfit combinations: {e}")
-            return {"has_suggestions": False, "error": str(e)}
+            logger.error(f"Error tracking product interest for user {user_id}: {e}")
 
     async def generate_smart_response(
         self,
@@ -277,51 +409,46 @@ class ProductRecommender:
         Returns:
             Smart response message in Arabic
         """
-        try:
-            # Track interest first
-            await self.track_product_interest(user_id, search_query, products_found)
+        # Tracking is write-side analytics; keep it off the response path
+        self._schedule_tracking(user_id, search_query, products_found)
 
-            # Get recommendations
-            recommendations = await self.get_recommendations(user_id)
+        # Get recommendations (from the state before this search is tracked)
+        recommendations = self.get_recommendations(user_id)
 
-            response_parts: List[str] = []
+        response_parts: List[str] = []
 
-            # Main results message
-            if products_found:
-                response_parts.append(f"تم العثور على {len(products_found)} منتج مناسب! 🎉")
+        # Main results message
+        if products_found:
+            response_parts.append(f"تم العثور على {len(products_found)} منتج مناسب! 🎉")
 
-            # Add recommendations if available
-            if recommendations.get("has_recommendations"):
-                recs = recommendations["recommendations"]
-                if recs:
-                    response_parts.append("\n\n💡 توصيات لك:")
-                    for rec in recs[:2]:  # Top 2
-                        response_parts.append(f"• {rec['suggestion']}")
+        # Add recommendations if available
+        if recommendations.get("has_recommendations"):
+            recs = recommendations["recommendations"]
+            if recs:
+                response_parts.append(_RECOMMENDATIONS_HEADER)
+                for rec in recs[:2]:  # Top 2
+                    response_parts.append(_BULLET + rec["suggestion"])
 
-            # Suggest outfit combinations for first product
-            if products_found and len(products_found) > 0:
-                outfit_suggestions = await self.suggest_outfit_combinations(products_found[0])
-                if outfit_suggestions.get("has_suggestions"):
-                    response_parts.append(f"\n\n{outfit_suggestions['message']}")
-                    for suggestion in outfit_suggestions["suggestions"][:2]:
-                        response_parts.append(f"• {suggestion['message']}")
+        # Suggest outfit combinations for first product
+        if products_found and len(products_found) > 0:
+            outfit_suggestions = self.suggest_outfit_combinations(products_found[0])
+            if outfit_suggestions.get("has_suggestions"):
+                response_parts.append(_SECTION_BREAK + outfit_suggestions["message"])
+                for suggestion in outfit_suggestions["suggestions"][:2]:
+                    response_parts.append(_BULLET + suggestion["message"])
 
-            return "\n".join(response_parts) if response_parts else "تم إرسال المنتجات!"
-
-        except Exception as e:
-            logger.error(f"Error generating smart response: {e}")
-            return f"تم العثور على {len(products_found)} منتج!"
+        return "\n".join(response_parts) if response_parts else _PRODUCTS_SENT_MESSAGE
 
-    def get_customer_preferences(self, user_id: str) -> Optional[Dict[str, Any]]:
+    def get_customer_preferences(self, user_id: str) -> Optional[CustomerPrefs]:
         """Get customer preferences for analytics"""
-        return self.customer_preferences.get(user_id)
+        return self._load_prefs(user_id)
 
     def clear_customer_data(self, user_id: str) -> bool:
         """Clear customer preference data (GDPR compliance)"""
         try:
             if user_id in self.customer_preferences:
                 del self.customer_preferences[user_id]
-                logger.info(f"Cleared preferences for user {user_id}")
+                logger.info("Cleared preferences for user %s", user_id)
                 return True
             return False
         except Exception as e:
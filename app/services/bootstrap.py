@@ -3,11 +3,16 @@ Professional Service Bootstrap and Initialization for BWW Assistant Chatbot
 Centralized service initialization with dependency management and health monitoring
 """
 
+import functools
 import logging
 import threading
-from typing import Dict, Any, Optional, List, Type
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed, wait
+from typing import Callable, Deque, Dict, Any, Mapping, Optional, List, Sequence, Tuple, Type
 from datetime import datetime, timezone
 from pathlib import Path
+from types import MappingProxyType
 
 from app.services.core.interfaces import ServiceInterface, ServiceStatus
 from app.services.infrastructure.di_container import DependencyInjectionContainer, ServiceScope
@@ -18,6 +23,58 @@ from app.services.core.base_service import BaseService
 
 logger = logging.getLogger(__name__)
 
+# Upper bound on services initialized concurrently within one dependency level
+_MAX_INIT_WORKERS = 8
+_MAX_HEALTH_WORKERS = 8
+_HEALTH_PROBE_TIMEOUT = 2.0  # seconds one health check waits for all of its probes
+_MAX_INITIALIZATION_ERRORS = 128
+_TIMESTAMP_RESOLUTION = 0.5  # seconds a formatted report timestamp is reused for
+
+# Service registrations: (name, class getter, priority, dependencies).
+# Database and Health Monitor services are archived and not registered; use the
+# database module directly for persistence.
+_SERVICE_TABLE: Tuple[Tuple[str, str, ServicePriority, Tuple[str, ...]], ...] = (
+    # Core services
+    ("configuration_service", "_get_configuration_service_class", ServicePriority.CRITICAL, ()),
+    ("error_handler_service", "_get_error_handler_service_class", ServicePriority.CRITICAL, ()),
+    # Platform services
+    ("messenger_service", "_get_messenger_service_class", ServicePriority.HIGH, ("ai_service",)),
+    ("whatsapp_service", "_get_whatsapp_service_class", ServicePriority.HIGH, ("ai_service",)),
+    ("message_handler", "_get_message_handler_class", ServicePriority.HIGH,
+     ("messenger_service", "ai_service")),
+    ("whatsapp_message_handler", "_get_whatsapp_message_handler_class", ServicePriority.HIGH,
+     ("whatsapp_service", "ai_service")),
+    # AI services
+    ("ai_service", "_get_ai_service_class", ServicePriority.CRITICAL, ()),
+    ("gemini_service", "_get_gemini_service_class", ServicePriority.NORMAL, ()),
+    ("keyword_manager", "_get_keyword_manager_class", ServicePriority.NORMAL, ()),
+    # Integration services
+    ("facebook_lead_center_service", "_get_facebook_lead_center_service_class",
+     ServicePriority.NORMAL, ()),
+    ("message_source_tracker", "_get_message_source_tracker_class", ServicePriority.LOW, ()),
+)
+
+# Overall health: 0 = no unhealthy services, 1 = unhealthy but some degraded, 2 = otherwise
+_OVERALL_STATUS = ("healthy", "degraded", "unhealthy")
+
+# Lifecycle capability flags, probed once per implementation class
+_CAP_INITIALIZE = 1
+_CAP_HEALTH_CHECK = 2
+_CAP_SHUTDOWN = 4
+
+
+@functools.lru_cache(maxsize=None)
+def _capabilities(service_class: type) -> int:
+    """Return the lifecycle capability bitmap for a service class"""
+    caps = 0
+    if hasattr(service_class, 'initialize'):
+        caps |= _CAP_INITIALIZE
+    if hasattr(service_class, 'health_check'):
+        caps |= _CAP_HEALTH_CHECK
+    if hasattr(service_class, 'shutdown'):
+        caps |= _CAP_SHUTDOWN
+    return caps
+
 
 class ServiceBootstrap:
     """Professional service bootstrap and initialization system"""
@@ -34,15 +91,42 @@ class ServiceBootstrap:
 
         # Service definitions
         self._service_definitions: Dict[str, ServiceDefinition] = {}
+        # Frozen after registration: definitions in registration order plus name -> position
+        self._defs_tuple: Tuple[ServiceDefinition, ...] = ()
+        self._defs_index: Dict[str, int] = {}
         self._initialized_services: Dict[str, ServiceInterface] = {}
+        # Live read-only view handed to callers instead of a per-call copy
+        self._services_view: Mapping[str, ServiceInterface] = MappingProxyType(
+            self._initialized_services
+        )
+        self._service_count = 0
+        # Capability bitmap per initialized service, resolved from its class on first use
+        self._service_caps: Dict[str, int] = {}
+        # Immutable snapshot published once bootstrap completes, read without the lock
+        self._resolved: Mapping[str, ServiceInterface] = MappingProxyType({})
+
+        # Startup order is resolved once after registration; shutdown order is the
+        # reverse of the order services actually finished initializing in
+        self._startup_order: Tuple[str, ...] = ()
+        self._init_order: List[str] = []
+        self._shutdown_order: Tuple[str, ...] = ()
 
         # Bootstrap state
         self._bootstrap_complete = False
         self._lock = threading.RLock()
+        self._health_executor: Optional[ThreadPoolExecutor] = None
+        # Probes still running per service; a later health check waits on these
+        # instead of submitting another probe behind a hung one
+        self._health_probes: Dict[str, Future] = {}
 
         # Performance monitoring
-        self._startup_time: Optional[datetime] = None
-        self._initialization_errors: List[str] = []
+        # Wall-clock start is formatted once; durations use the monotonic clock
+        self._startup_iso: Optional[str] = None
+        self._startup_mono_ns: Optional[int] = None
+        # (monotonic time, ISO string) of the last report timestamp
+        self._ts_cache: Tuple[float, str] = (float("-inf"), "")
+        # Bounded so repeated bootstrap retries cannot grow it without limit
+        self._initialization_errors: Deque[str] = deque(maxlen=_MAX_INITIALIZATION_ERRORS)
 
     # Properties for accessing core components
     @property
@@ -72,15 +156,27 @@ class ServiceBootstrap:
 
     def initialize(self) -> bool:
         """Initialize the service bootstrap system"""
+        # Lock-free fast path: _bootstrap_complete is only set after the service
+        # snapshot is published, and a plain attribute read is atomic under the GIL
+        if self._bootstrap_complete:
+            return True
+
         try:
             with self._lock:
+                # Re-check: another thread may have finished while we waited
                 if self._bootstrap_complete:
                     logger.info("Service bootstrap already initialized")
                     return True
 
-                self._startup_time = datetime.now(timezone.utc)
+                self._startup_iso = datetime.now(timezone.utc).isoformat()
+                self._startup_mono_ns = time.monotonic_ns()
                 logger.info("Starting service bootstrap initialization...")
 
+                # Overlap heavy service-module imports with core component setup
+                threading.Thread(
+                    target=self._prewarm_imports, name="service-prewarm", daemon=True
+                ).start()
+
                 # Initialize core components in order
                 if not self._initialize_core_components():
                     return False
@@ -93,19 +189,34 @@ class ServiceBootstrap:
                 if not self._initialize_services():
                     return False
 
+                self._resolved = MappingProxyType(dict(self._initialized_services))
+                # Drop module-level lookups memoized against an earlier snapshot
+                _get_resolved_service.cache_clear()
+                self._shutdown_order = tuple(reversed(self._init_order))
                 self._bootstrap_complete = True
-                startup_duration = (datetime.now(timezone.utc) - self._startup_time).total_seconds()
+                startup_duration = (time.monotonic_ns() - self._startup_mono_ns) / 1e9
 
-                logger.info(f"Service bootstrap completed successfully in {startup_duration:.2f}s")
-                logger.info(f"Initialized {len(self._initialized_services)} services")
+                logger.info("Service bootstrap completed successfully in %.2fs", startup_duration)
+                logger.info("Initialized %s services", self._service_count)
 
                 return True
 
         except Exception as e:
-            logger.error(f"Service bootstrap initialization failed: {e}")
+            logger.error("Service bootstrap initialization failed: %s", e)
             self._initialization_errors.append(str(e))
             return False
 
+    def _prewarm_imports(self) -> None:
+        """Import CRITICAL/HIGH priority service modules ahead of their first resolution"""
+        for _name, getter, priority, _dependencies in _SERVICE_TABLE:
+            if priority not in (ServicePriority.CRITICAL, ServicePriority.HIGH):
+                continue
+            try:
+                getattr(self, getter)()
+            except Exception as e:
+                # The failure resurfaces, and is reported, when the service is resolved
+                logger.debug("Service module prewarm failed for %s: %s", getter, e)
+
     def _initialize_core_components(self) -> bool:
         """Initialize core components"""
         try:
@@ -132,7 +243,7 @@ class ServiceBootstrap:
             return True
 
         except Exception as e:
-            logger.error(f"Failed to initialize core components: {e}")
+            logger.error("Failed to initialize core components: %s", e)
             return False
 
     def _register_service_definitions(self) -> bool:
@@ -140,225 +251,172 @@ class ServiceBootstrap:
         try:
             logger.info("Registering service definitions...")
 
-            # Register core services (skip database_service - use app.database directly)
-            self._register_core_services()
-
-            # Register platform services
-            self._register_platform_services()
-
-            # Register AI services
-            self._register_ai_services()
-
-            # Register integration services
-            self._register_integration_services()
-
-            logger.info(f"Registered {len(self._service_definitions)} service definitions")
+            for name, getter, priority, dependencies in _SERVICE_TABLE:
+                self._register_service(
+                    name=name,
+                    service_type=BaseService,
+                    implementation_factory=getattr(self, getter),
+                    scope=ServiceScope.SINGLETON,
+                    priority=priority,
+                    dependencies=dependencies
+                )
+
+            # Registration is closed from here on
+            self._defs_tuple = tuple(self._service_definitions.values())
+            self._defs_index = {definition.name: i for i, definition in enumerate(self._defs_tuple)}
+
+            # Resolve orderings once; initialization, health checks and shutdown reuse them
+            if self._service_registry is not None:
+                self._startup_order = self._service_registry.get_startup_order()
+
+            logger.info("Registered %s service definitions", len(self._defs_tuple))
             return True
 
         except Exception as e:
-            logger.error(f"Failed to register service definitions: {e}")
+            logger.error("Failed to register service definitions: %s", e)
             return False
 
-    def _register_core_services(self) -> None:
-        """Register core services"""
-        # Note: Database Service has been archived - use database module directly
-        # from database import get_session, User, Message, etc.
-
-        # Configuration Service
-        self._register_service(
-            name="configuration_service",
-            service_type=BaseService,
-            implementation=self._get_configuration_service_class(),
-            scope=ServiceScope.SINGLETON,
-            priority=ServicePriority.CRITICAL,
-            dependencies=[]
-        )
-
-        # Error Handler Service
-        self._register_service(
-            name="error_handler_service",
-            service_type=BaseService,
-            implementation=self._get_error_handler_service_class(),
-            scope=ServiceScope.SINGLETON,
-            priority=ServicePriority.CRITICAL,
-            dependencies=[]
-        )
-
-    def _register_platform_services(self) -> None:
-        """Register platform services"""
-        # Messenger Service (no database_service dependency - uses app.database directly)
-        self._register_service(
-            name="messenger_service",
-            service_type=BaseService,
-            implementation=self._get_messenger_service_class(),
-            scope=ServiceScope.SINGLETON,
-            priority=ServicePriority.HIGH,
-            dependencies=["ai_service"]
-        )
-
-        # WhatsApp Service
-        self._register_service(
-            name="whatsapp_service",
-            service_type=BaseService,
-            implementation=self._get_whatsapp_service_class(),
-            scope=ServiceScope.SINGLETON,
-            priority=ServicePriority.HIGH,
-            dependencies=["ai_service"]
-        )
-
-        # Message Handler
-        self._register_service(
-            name="message_handler",
-            service_type=BaseService,
-            implementation=self._get_message_handler_class(),
-            scope=ServiceScope.SINGLETON,
-            priority=ServicePriority.HIGH,
-            dependencies=["messenger_service", "ai_service"]
-        )
-
-        # WhatsApp Message Handler
-        self._register_service(
-            name="whatsapp_message_handler",
-            service_type=BaseService,
-            implementation=self._get_whatsapp_message_handler_class(),
-            scope=ServiceScope.SINGLETON,
-            priority=ServicePriority.HIGH,
-            dependencies=["whatsapp_service", "ai_service"]
-        )
-
-    def _register_ai_services(self) -> None:
-        """Register AI services"""
-        # AI Service (no database_service dependency)
-        self._register_service(
-            name="ai_service",
-            service_type=BaseService,
-            implementation=self._get_ai_service_class(),
-            scope=ServiceScope.SINGLETON,
-            priority=ServicePriority.CRITICAL,
-            dependencies=[]
-        )
-
-        # Gemini Service
-        self._register_service(
-            name="gemini_service",
-            service_type=BaseService,
-            implementation=self._get_gemini_service_class(),
-            scope=ServiceScope.SINGLETON,
-            priority=ServicePriority.NORMAL,
-            dependencies=[]
-        )
-
-        # Keyword Manager
-        self._register_service(
-            name="keyword_manager",
-            service_type=BaseService,
-            implementation=self._get_keyword_manager_class(),
-            scope=ServiceScope.SINGLETON,
-            priority=ServicePriority.NORMAL,
-            dependencies=[]
-        )
-
-    def _register_integration_services(self) -> None:
-        """Register integration services"""
-        # Facebook Lead Center Service (no database_service dependency)
-        self._register_service(
-            name="facebook_lead_center_service",
-            service_type=BaseService,
-            implementation=self._get_facebook_lead_center_service_class(),
-            scope=ServiceScope.SINGLETON,
-            priority=ServicePriority.NORMAL,
-            dependencies=[]
-        )
-
-        # Message Source Tracker (no database_service dependency)
-        self._register_service(
-            name="message_source_tracker",
-            service_type=BaseService,
-            implementation=self._get_message_source_tracker_class(),
-            scope=ServiceScope.SINGLETON,
-            priority=ServicePriority.LOW,
-            dependencies=[]
-        )
-
-        # Note: Health Monitor service has been archived and is no longer registered
-        # The _get_health_monitor_class() method is kept for backward compatibility
-
     def _register_service(self, name: str, service_type: Type[ServiceInterface],
                           implementation: Optional[Type[ServiceInterface]] = None,
                           scope: ServiceScope = ServiceScope.SINGLETON,
                           priority: ServicePriority = ServicePriority.NORMAL,
-                          dependencies: Optional[List[str]] = None) -> None:
-        """Register a service definition"""
+                          dependencies: Sequence[str] = (),
+                          implementation_factory: Optional[Callable[[], type]] = None) -> None:
+        """
+        Register a service definition
+
+        Pass ``implementation_factory`` instead of ``implementation`` to defer
+        importing the service module until the service is first resolved.
+        """
+        if implementation is None and implementation_factory is None:
+            implementation = service_type
+
         definition = ServiceDefinition(
             name=name,
             service_type=service_type,
-            implementation=implementation or service_type,
+            implementation=implementation,
+            implementation_factory=implementation_factory,
             scope=scope,
             priority=priority,
-            dependencies=dependencies or [],
+            dependencies=tuple(dependencies),
             auto_start=True
         )
 
         self._service_definitions[name] = definition
-        logger.debug(f"Registered service definition: {name}")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Registered service definition: %s", name)
+
+    def _compute_levels(self, startup_order: Sequence[str]) -> List[List[str]]:
+        """
+        Group services into dependency levels
+
+        Every service lands one level after its deepest dependency, so services
+        within a level never depend on each other and can start concurrently.
+        """
+        level_of: Dict[str, int] = {}
+        levels: List[List[str]] = []
+        defs = self._defs_tuple
+        defs_index = self._defs_index
+        for service_name in startup_order:
+            index = defs_index.get(service_name)
+            dependencies = defs[index].dependencies if index is not None else ()
+            level = 1 + max((level_of[dep] for dep in dependencies if dep in level_of), default=-1)
+            level_of[service_name] = level
+            if level == len(levels):
+                levels.append([])
+            levels[level].append(service_name)
+        return levels
+
+    def _init_one(self, service_name: str) -> Optional[Tuple[ServiceInterface, int]]:
+        """Resolve and initialize a single service; returns (service, caps) or None on failure"""
+        if service_name not in self._defs_index:
+            logger.warning("Service definition not found: %s", service_name)
+            return None
+
+        try:
+            logger.info("Initializing service: %s", service_name)
+
+            # Get service from DI container
+            if self._di_container is None:
+                logger.error("DI container not initialized")
+                return None
+            service = self._di_container.get_service(service_name)
+            if not service:
+                logger.error("Failed to get service from container: %s", service_name)
+                return None
+
+            # Initialize service
+            caps = _capabilities(type(service))
+            if caps & _CAP_INITIALIZE:
+                if not service.initialize():
+                    logger.error("Service initialization failed: %s", service_name)
+                    return None
+
+            logger.info("Service initialized successfully: %s", service_name)
+            return service, caps
+
+        except Exception as e:
+            logger.error("Failed to initialize service %s: %s", service_name, e)
+            self._initialization_errors.append(f"{service_name}: {e}")
+            return None
 
     def _initialize_services(self) -> bool:
-        """Initialize all services in dependency order"""
+        """Initialize all services in dependency order, one level at a time"""
         try:
             logger.info("Initializing services...")
 
-            # Get startup order from registry
             if self._service_registry is None:
                 logger.error("Service registry not initialized")
                 return False
-            startup_order = self._service_registry.get_startup_order()
-
-            for service_name in startup_order:
-                if service_name not in self._service_definitions:
-                    logger.warning(f"Service definition not found: {service_name}")
-                    continue
-
-                try:
-                    logger.info(f"Initializing service: {service_name}")
-
-                    # Get service from DI container
-                    if self._di_container is None:
-                        logger.error("DI container not initialized")
-                        continue
-                    service = self._di_container.get_service(service_name)
-                    if not service:
-                        logger.error(f"Failed to get service from container: {service_name}")
-                        continue
-
-                    # Initialize service
-                    if hasattr(service, 'initialize'):
-                        if not service.initialize():
-                            logger.error(f"Service initialization failed: {service_name}")
-                            continue
 
-                    self._initialized_services[service_name] = service
-                    logger.info(f"Service initialized successfully: {service_name}")
-
-                except Exception as e:
-                    logger.error(f"Failed to initialize service {service_name}: {e}")
-                    self._initialization_errors.append(f"{service_name}: {e}")
-                    continue
-
-            logger.info(f"Successfully initialized {len(self._initialized_services)} services")
+            for level in self._compute_levels(self._startup_order):
+                results: List[Tuple[str, Tuple[ServiceInterface, int]]] = []
+
+                # A pool is not worth its overhead for a single service
+                if len(level) == 1:
+                    result = self._init_one(level[0])
+                    if result is not None:
+                        results.append((level[0], result))
+                else:
+                    # Independent services overlap their blocking client setup
+                    with ThreadPoolExecutor(max_workers=min(_MAX_INIT_WORKERS, len(level)),
+                                            thread_name_prefix="service-init") as executor:
+                        futures = {executor.submit(self._init_one, name): name for name in level}
+                        for future in as_completed(futures):
+                            result = future.result()
+                            if result is not None:
+                                results.append((futures[future], result))
+
+                # Publish the whole level in one critical section
+                with self._lock:
+                    for name, (service, caps) in results:
+                        self._initialized_services[name] = service
+                        self._service_caps[name] = caps
+                        self._init_order.append(name)
+                    self._service_count = len(self._initialized_services)
+
+            logger.info("Successfully initialized %s services", self._service_count)
             # Return True even if no services initialized - bootstrap itself is working
             return True
 
         except Exception as e:
-            logger.error(f"Service initialization failed: {e}")
+            logger.error("Service initialization failed: %s", e)
             return False
 
     def get_service(self, name: str) -> Optional[ServiceInterface]:
         """Get initialized service by name"""
+        # Fast path: the published snapshot never mutates, so no lock is needed
+        if self._bootstrap_complete:
+            return self._resolved.get(name)
         with self._lock:
             return self._initialized_services.get(name)
 
-    def get_all_services(self) -> Dict[str, ServiceInterface]:
-        """Get all initialized services"""
+    def get_all_services(self) -> Mapping[str, ServiceInterface]:
+        """Get a read-only view of all initialized services"""
+        return self._services_view
+
+    def snapshot_services(self) -> Dict[str, ServiceInterface]:
+        """Get an independent copy of all initialized services"""
         with self._lock:
             return self._initialized_services.copy()
 
@@ -366,21 +424,39 @@ class ServiceBootstrap:
         """Get bootstrap system status"""
         with self._lock:
             startup_duration = None
-            if self._startup_time:
-                startup_duration = (datetime.now(timezone.utc) - self._startup_time).total_seconds()
+            if self._startup_mono_ns is not None:
+                startup_duration = (time.monotonic_ns() - self._startup_mono_ns) / 1e9
 
             return {
                 "bootstrap_complete": self._bootstrap_complete,
-                "startup_time": self._startup_time.isoformat() if self._startup_time else None,
+                "startup_time": self._startup_iso,
                 "startup_duration_seconds": startup_duration,
-                "services_initialized": len(self._initialized_services),
-                "services_registered": len(self._service_definitions),
-                "initialization_errors": self._initialization_errors,
+                "services_initialized": self._service_count,
+                "services_registered": len(self._defs_tuple),
+                "initialization_errors": list(self._initialization_errors),
                 "service_names": list(self._initialized_services.keys())
             }
 
+    def _iso_now(self) -> str:
+        """Current UTC time in ISO format, reused for up to _TIMESTAMP_RESOLUTION seconds"""
+        now = time.monotonic()
+        cached_at, cached = self._ts_cache
+        if now - cached_at < _TIMESTAMP_RESOLUTION:
+            return cached
+        iso = datetime.now(timezone.utc).isoformat()
+        self._ts_cache = (now, iso)
+        return iso
+
+    def _get_health_executor(self) -> ThreadPoolExecutor:
+        """Lazily create the pool used to run health probes concurrently"""
+        with self._lock:
+            if self._health_executor is None:
+                self._health_executor = ThreadPoolExecutor(max_workers=_MAX_HEALTH_WORKERS,
+                                                           thread_name_prefix="health")
+            return self._health_executor
+
     def health_check(self) -> Dict[str, Any]:
-        """Perform health check on all services"""
+        """Perform health check on all services, probing them concurrently"""
         try:
             healthy_services = 0
             unhealthy_services = 0
@@ -388,42 +464,70 @@ class ServiceBootstrap:
 
             service_health = {}
 
-            for name, service in self._initialized_services.items():
+            # Submit every probe first so total latency is the slowest probe, not the sum
+            executor = self._get_health_executor()
+            futures: Dict[str, Future] = {}
+            with self._lock:
+                for name in self._startup_order:
+                    service = self._initialized_services.get(name)
+                    if service is None:
+                        continue
+                    if self._service_caps.get(name, 0) & _CAP_HEALTH_CHECK:
+                        future = self._health_probes.get(name)
+                        if future is None:
+                            future = executor.submit(service.health_check)
+                            self._health_probes[name] = future
+                        futures[name] = future
+                    else:
+                        service_health[name] = {
+                            "status": "unknown", "message": "No health check available"
+                        }
+                        unhealthy_services += 1
+
+            # One deadline for the whole check; probes still running are reported
+            # unhealthy and left for the next check to pick up
+            done, _ = wait(futures.values(), timeout=_HEALTH_PROBE_TIMEOUT)
+            for name, future in futures.items():
+                if future not in done:
+                    service_health[name] = {"status": "error", "message": "Health check timed out"}
+                    unhealthy_services += 1
+                    continue
+
+                with self._lock:
+                    if self._health_probes.get(name) is future:
+                        del self._health_probes[name]
                 try:
-                    if hasattr(service, 'health_check'):
-                        health = service.health_check()
-                        service_health[name] = health
-
-                        if health.status == ServiceStatus.HEALTHY:
-                            healthy_services += 1
-                        elif health.status == ServiceStatus.DEGRADED:
-                            degraded_services += 1
-                        else:
-                            unhealthy_services += 1
+                    health = future.result()
+                    service_health[name] = health
+
+                    if health.status == ServiceStatus.HEALTHY:
+                        healthy_services += 1
+                    elif health.status == ServiceStatus.DEGRADED:
+                        degraded_services += 1
                     else:
-                        service_health[name] = {"status": "unknown", "message": "No health check available"}
                         unhealthy_services += 1
 
                 except Exception as e:
                     service_health[name] = {"status": "error", "message": str(e)}
                     unhealthy_services += 1
 
+            status_level = 0 if unhealthy_services == 0 else 1 if degraded_services else 2
             return {
-                "overall_status": "healthy" if unhealthy_services == 0 else "degraded" if degraded_services > 0 else "unhealthy",
+                "overall_status": _OVERALL_STATUS[status_level],
                 "healthy_services": healthy_services,
                 "degraded_services": degraded_services,
                 "unhealthy_services": unhealthy_services,
-                "total_services": len(self._initialized_services),
+                "total_services": self._service_count,
                 "service_health": service_health,
-                "timestamp": datetime.now(timezone.utc).isoformat()
+                "timestamp": self._iso_now()
             }
 
         except Exception as e:
-            logger.error(f"Health check failed: {e}")
+            logger.error("Health check failed: %s", e)
             return {
                 "overall_status": "error",
                 "error": str(e),
-                "timestamp": datetime.now(timezone.utc).isoformat()
+                "timestamp": self._iso_now()
             }
 
     def shutdown(self) -> None:
@@ -431,31 +535,44 @@ class ServiceBootstrap:
         try:
             logger.info("Shutting down services...")
 
-            # Shutdown services in reverse order
-            shutdown_order = list(reversed(self._initialized_services.keys()))
-
+            # Shutdown services in reverse initialization order; a bootstrap that
+            # failed part-way has not precomputed it yet
+            shutdown_order = self._shutdown_order or tuple(reversed(self._init_order))
+            services = self._initialized_services
+            caps = self._service_caps
             for service_name in shutdown_order:
                 try:
-                    service = self._initialized_services[service_name]
-                    if hasattr(service, 'shutdown'):
-                        service.shutdown()
-                        logger.info(f"Service shutdown completed: {service_name}")
+                    if caps[service_name] & _CAP_SHUTDOWN:
+                        services[service_name].shutdown()
+                        logger.info("Service shutdown completed: %s", service_name)
                 except Exception as e:
-                    logger.error(f"Error shutting down service {service_name}: {e}")
+                    logger.error("Error shutting down service %s: %s", service_name, e)
+
+            if self._health_executor is not None:
+                self._health_executor.shutdown(wait=False, cancel_futures=True)
+                self._health_executor = None
+                self._health_probes.clear()
 
             # Shutdown core components
             if self._config_manager:
                 self._config_manager.shutdown()
 
-            self._initialized_services.clear()
             self._bootstrap_complete = False
+            self._resolved = MappingProxyType({})
+            _get_resolved_service.cache_clear()
+            self._initialized_services.clear()
+            self._service_caps.clear()
+            self._init_order.clear()
+            self._service_count = 0
+            self._shutdown_order = ()
 
             logger.info("Service bootstrap shutdown completed")
 
         except Exception as e:
-            logger.error(f"Error during shutdown: {e}")
+            logger.error("Error during shutdown: %s", e)
 
-    # Service class getters (to be implemented based on actual service classes)
+    # Service class getters - passed to the registry as lazy implementation
+    # factories, so each service module is imported on first resolution only
     def _get_database_service_class(self) -> Type[ServiceInterface]:
         """Get database service class - ARCHIVED"""
         # Database service has been archived
@@ -465,55 +582,77 @@ class ServiceBootstrap:
             "Use database module directly: from database import get_session, User, etc."
         )
 
-    def _get_configuration_service_class(self) -> Type[ServiceInterface]:
+    @staticmethod
+    @functools.lru_cache(maxsize=1)
+    def _get_configuration_service_class() -> Type[ServiceInterface]:
         """Get configuration service class"""
         return ConfigurationManager
 
-    def _get_error_handler_service_class(self) -> type:
+    @staticmethod
+    @functools.lru_cache(maxsize=1)
+    def _get_error_handler_service_class() -> type:
         """Get error handler service class"""
         return ErrorHandler
 
-    def _get_messenger_service_class(self) -> Type[ServiceInterface]:
+    @staticmethod
+    @functools.lru_cache(maxsize=1)
+    def _get_messenger_service_class() -> Type[ServiceInterface]:
         """Get messenger service class"""
         from app.services.messaging.messenger_service import MessengerService
         return MessengerService
 
-    def _get_whatsapp_service_class(self) -> Type[ServiceInterface]:
+    @staticmethod
+    @functools.lru_cache(maxsize=1)
+    def _get_whatsapp_service_class() -> Type[ServiceInterface]:
         """Get WhatsApp service class"""
         from app.services.messaging.whatsapp_service import WhatsAppService
         return WhatsAppService
 
-    def _get_message_handler_class(self) -> Type[ServiceInterface]:
+    @staticmethod
+    @functools.lru_cache(maxsize=1)
+    def _get_message_handler_class() -> Type[ServiceInterface]:
         """Get message handler class"""
         from app.services.messaging.message_handler import MessageHandler
         return MessageHandler
 
-    def _get_whatsapp_message_handler_class(self) -> Type[ServiceInterface]:
+    @staticmethod
+    @functools.lru_cache(maxsize=1)
+    def _get_whatsapp_message_handler_class() -> Type[ServiceInterface]:
         """Get WhatsApp message handler class (using professional handler)"""
         from app.services.messaging.message_handler import MessageHandler
         return MessageHandler
 
-    def _get_ai_service_class(self) -> Type[ServiceInterface]:
+    @staticmethod
+    @functools.lru_cache(maxsize=1)
+    def _get_ai_service_class() -> Type[ServiceInterface]:
         """Get AI service class"""
         from app.services.ai.ai_service import AIService
         return AIService
 
-    def _get_gemini_service_class(self) -> Type[ServiceInterface]:
+    @staticmethod
+    @functools.lru_cache(maxsize=1)
+    def _get_gemini_service_class() -> Type[ServiceInterface]:
         """Get Gemini service class"""
         from app.services.ai.gemini_service import GeminiService
         return GeminiService
 
-    def _get_keyword_manager_class(self) -> type:
+    @staticmethod
+    @functools.lru_cache(maxsize=1)
+    def _get_keyword_manager_class() -> type:
         """Get keyword manager class"""
         from app.services.business.keyword_manager import KeywordManager
         return KeywordManager
 
-    def _get_facebook_lead_center_service_class(self) -> type:
+    @staticmethod
+    @functools.lru_cache(maxsize=1)
+    def _get_facebook_lead_center_service_class() -> type:
         """Get Facebook lead center service class"""
         from app.services.business.facebook_lead_center_service import FacebookLeadCenterService
         return FacebookLeadCenterService
 
-    def _get_message_source_tracker_class(self) -> type:
+    @staticmethod
+    @functools.lru_cache(maxsize=1)
+    def _get_message_source_tracker_class() -> type:
         """Get message source tracker class"""
         from app.services.business.message_source_tracker import MessageSourceTracker
         return MessageSourceTracker
@@ -530,15 +669,26 @@ _bootstrap_lock = threading.Lock()
 
 
 def get_service_bootstrap(config_dir: Optional[str] = None) -> ServiceBootstrap:
-    """Get global service bootstrap instance"""
+    """Get global service bootstrap instance
+
+    ``config_dir`` only applies to the call that creates the instance; a different
+    directory passed afterwards is ignored with a warning.
+    """
     global _service_bootstrap
 
-    if _service_bootstrap is None:
+    bootstrap = _service_bootstrap
+    if bootstrap is None:
         with _bootstrap_lock:
             if _service_bootstrap is None:
                 _service_bootstrap = ServiceBootstrap(config_dir)
+            bootstrap = _service_bootstrap
 
-    return _service_bootstrap
+    if config_dir is not None and Path(config_dir) != bootstrap.config_dir:
+        logger.warning(
+            "Service bootstrap already created with config dir %s; ignoring %s",
+            bootstrap.config_dir, config_dir
+        )
+    return bootstrap
 
 
 def initialize_services(config_dir: Optional[str] = None) -> bool:
@@ -547,21 +697,38 @@ def initialize_services(config_dir: Optional[str] = None) -> bool:
     return bootstrap.initialize()
 
 
+@functools.lru_cache(maxsize=None)
+def _get_resolved_service(name: str) -> Optional[ServiceInterface]:
+    """Memoized lookup, only used once bootstrap is complete"""
+    return get_service_bootstrap().get_service(name)
+
+
 def get_service(name: str) -> Optional[ServiceInterface]:
     """Get service by name"""
     bootstrap = get_service_bootstrap()
+    if bootstrap.is_initialized:
+        return _get_resolved_service(name)
     return bootstrap.get_service(name)
 
 
-def get_all_services() -> Dict[str, ServiceInterface]:
-    """Get all services"""
+def get_all_services() -> Mapping[str, ServiceInterface]:
+    """Get a read-only view of all services"""
     bootstrap = get_service_bootstrap()
     return bootstrap.get_all_services()
 
 
+def snapshot_services() -> Dict[str, ServiceInterface]:
+    """Get an independent copy of all services"""
+    bootstrap = get_service_bootstrap()
+    return bootstrap.snapshot_services()
+
+
 def shutdown_services() -> None:
     """Shutdown all services"""
     global _service_bootstrap
-    if _service_bootstrap:
-        _service_bootstrap.shutdown()
-        _service_bootstrap = None
+    with _bootstrap_lock:
+        bootstrap, _service_bootstrap = _service_bootstrap, None
+    # Only shut down an instance that was actually created
+    if bootstrap is not None:
+        bootstrap.shutdown()
+    _get_resolved_service.cache_clear()
@@ -11,6 +11,7 @@ This module provides:
 Implements core business rules and lead management workflows.
 """
 
+from importlib import import_module
 from typing import TYPE_CHECKING
 
 # Lazy imports for better performance
@@ -26,18 +27,25 @@ __all__ = [
 ]
 
 
-def __getattr__(name: str):
-    """Lazy import mechanism for better performance."""
-    if name == "FacebookLeadCenterService":
-        from .facebook_lead_center_service import FacebookLeadCenterService
-        return FacebookLeadCenterService
-
-    if name == "KeywordManager":
-        from .keyword_manager import KeywordManager
-        return KeywordManager
+# Public name -> submodule that defines it
+_LAZY_IMPORTS = {
+    "FacebookLeadCenterService": ".facebook_lead_center_service",
+    "KeywordManager": ".keyword_manager",
+    "MessageSourceTracker": ".message_source_tracker",
+}
 
-    if name == "MessageSourceTracker":
-        from .message_source_tracker import MessageSourceTracker
-        return MessageSourceTracker
 
-    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+def __getattr__(name: str):
+    """Lazy import mechanism for better performance.
+
+    The resolved object is stored in the module globals, so later lookups
+    bypass this hook entirely.
+    """
+    try:
+        module_name = _LAZY_IMPORTS[name]
+    except KeyError:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}") from None
+
+    value = getattr(import_module(module_name, __name__), name)
+    globals()[name] = value
+    return value
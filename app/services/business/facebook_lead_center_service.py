@@ -1,15 +1,269 @@
+import asyncio
+import copy
+import functools
+import inspect
 import logging
-import requests
-from typing import Dict, Optional, List, Tuple, Any
-from sqlalchemy import func
+import re
+import threading
+import time
+import httpx
+from concurrent.futures import ThreadPoolExecutor
+from enum import Enum
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple, Type, TypeVar, cast
+from sqlalchemy import case, func, insert, or_, update
+from sqlalchemy.orm import Session, load_only
 from config.settings import settings
-from database import User, LeadStage, CustomerLabel, CustomerType, LeadActivity, Message, MessageDirection, enum_to_value
-from database.context import get_db_session
+from database import (
+    User, LeadStage, CustomerLabel, CustomerType, Governorate, LeadActivity, Message,
+    MessageDirection
+)
+from database.context import get_db_session, get_writer_db_session
 from app.services.messaging.messenger_service import MessengerService
+from app.services.infrastructure.error_handler import (
+    retry_on_error, circuit_breaker, RetryConfig, CircuitBreakerConfig
+)
 from datetime import datetime, timezone
 
+try:
+    import ahocorasick
+    ahocorasick_available = True
+except ImportError:
+    ahocorasick = None
+    ahocorasick_available = False
+
+try:
+    import orjson
+    orjson_available = True
+except ImportError:
+    orjson = None
+    orjson_available = False
+
+try:
+    import h2  # noqa: F401 - lets httpx negotiate HTTP/2
+    http2_available = True
+except ImportError:
+    http2_available = False
+
 logger = logging.getLogger(__name__)
 
+EnumT = TypeVar("EnumT", bound=Enum)
+F = TypeVar("F", bound=Callable[..., Any])
+
+_LEAD_DETAIL_FIELDS = (
+    "id,created_time,field_data,ad_id,ad_name,adset_id,adset_name,campaign_id,campaign_name,form_id"
+)
+# Graph API limit on object ids per ``?ids=`` request
+_LEAD_BATCH_SIZE = 50
+# Seconds a successful leadgen form listing is reused before polling Graph again
+_FORMS_CACHE_TTL = 300
+# Seconds lead analytics are reused, absorbing dashboard polling; lead writes invalidate them
+_ANALYTICS_CACHE_TTL = 30
+# Seconds queued lead syncs wait so rapid updates to one lead coalesce into one sync
+_SYNC_DEBOUNCE_SECONDS = 0.1
+# Seconds before queued syncs are retried when the leadgen forms could not be
+# fetched; at most this many leads stay queued meanwhile, the oldest are dropped
+_SYNC_RETRY_SECONDS = 30.0
+_MAX_PENDING_SYNCS = 10000
+# Buffered lead automation writes are committed together by the writer thread once
+# the oldest has waited this many seconds, or as soon as this many rows are pending
+_WRITE_FLUSH_SECONDS = 0.25
+_WRITE_FLUSH_ROWS = 100
+# A batch that fails to commit goes back into the buffer and the writer retries
+# it after a delay doubling from the first value per failure up to the second;
+# at most this many users / activity rows stay buffered meanwhile, the oldest
+# beyond that are dropped
+_WRITE_RETRY_SECONDS = 1.0
+_MAX_WRITE_RETRY_SECONDS = 60.0
+_MAX_PENDING_WRITES = 10000
+# Seconds shutdown waits for a flush the writer thread is in the middle of
+_WRITER_JOIN_SECONDS = 5.0
+# Lead form fields holding a Messenger PSID / a phone number
+_PSID_FIELDS = frozenset(("psid", "user_id", "messenger_id"))
+_PHONE_FIELDS = frozenset(("phone_number", "phone", "mobile"))
+# Seconds the health check's database query may run before SQLite interrupts it,
+# and how many SQLite VM instructions pass between deadline checks
+_HEALTH_QUERY_TIMEOUT = 2.0
+_HEALTH_QUERY_CHECK_INTERVAL = 1000
+# Concurrent per-form lead fetches when searching forms for a user's lead
+_MAX_FORM_FETCH_WORKERS = 8
+# Behaviour keywords: hesitation/question words are matched in SQL, quantity
+# words (wholesale intent) with one compiled alternation
+_HESITATION_WORDS = ("مش متأكد", "أفكر", "شوف", "أرجع", "أشوف")
+_QUESTION_WORDS = ("إيه", "أيه", "كيف", "متى", "أين", "لماذا")
+_QUANTITY_RE = re.compile("|".join(map(re.escape, ("كمية", "كيلو", "جمله"))))
+# Lead form field aliases -> lead info key; _FULL_NAME is split into first/last name
+_FULL_NAME = "_full_name"
+_FIELD_ALIAS: Dict[str, str] = {
+    "full_name": _FULL_NAME, "name": _FULL_NAME,
+    "first_name": "first_name", "given_name": "first_name",
+    "last_name": "last_name", "family_name": "last_name", "surname": "last_name",
+    "email": "email", "email_address": "email",
+    "phone_number": "phone_number", "phone": "phone_number", "mobile": "phone_number",
+    "mobile_number": "phone_number",
+    "psid": "psid", "user_id": "psid", "messenger_id": "psid",
+    "city": "city", "location": "city",
+    "governorate": "governorate", "state": "governorate", "province": "governorate",
+}
+# Graph API error codes for app/user/page rate limiting
+_GRAPH_RATE_LIMIT_CODES = frozenset((4, 17, 32, 613))
+# Users read per batch (one short session each) by sync_all_leads_to_facebook
+_USER_SYNC_CHUNK_SIZE = 500
+# User columns read by _prepare_lead_data()
+_USER_SYNC_COLUMNS = (
+    User.psid, User.first_name, User.last_name, User.phone_number, User.governorate,
+    User.last_message_at, User.lead_stage, User.customer_label, User.customer_type,
+    User.lead_score, User.last_stage_change,
+)
+
+# Lead score contributions
+_TYPE_SCORES: Dict[CustomerType, int] = {
+    CustomerType.VALUE_SEEKER: 25,
+    CustomerType.LOYAL_BUYER: 20,
+    CustomerType.LOGICAL_BUYER: 15,
+    CustomerType.EMOTIONAL_BUYER: 10,
+    CustomerType.SCARCITY_BUYER: 15,
+    CustomerType.BARGAIN_HUNTER: 5,
+    CustomerType.HESITANT_BUYER: -5,
+}
+_LABEL_SCORES: Dict[CustomerLabel, int] = {
+    CustomerLabel.JUMLA: 20,         # Wholesale customers are high value
+    CustomerLabel.QITAEI: 10,        # Retail customers
+    CustomerLabel.NEW_CUSTOMER: 5,   # New customers need nurturing
+}
+# (max days since last message, score), checked in order
+_RECENCY_SCORES: Tuple[Tuple[int, int], ...] = ((1, 15), (3, 10), (7, 5))
+_HIGH_VALUE_GOVERNORATES = frozenset((Governorate.CAIRO, Governorate.GIZA, Governorate.ALEXANDRIA))
+# (min score, stage), highest first: the stage a lead's score qualifies for
+_STAGE_BY_SCORE: Tuple[Tuple[int, LeadStage], ...] = (
+    (80, LeadStage.CONVERTED),
+    (60, LeadStage.IN_PROGRESS),
+    (40, LeadStage.QUALIFIED),
+    (0, LeadStage.INTAKE),
+)
+# current stage -> (min score to advance, next stage)
+_STAGE_PROGRESSION: Dict[LeadStage, Tuple[int, LeadStage]] = {
+    LeadStage.INTAKE: (40, LeadStage.QUALIFIED),
+    LeadStage.QUALIFIED: (60, LeadStage.IN_PROGRESS),
+    LeadStage.IN_PROGRESS: (80, LeadStage.CONVERTED),
+    LeadStage.CONVERTED: (80, LeadStage.CONVERTED),  # Stay converted
+}
+
+
+def _coerce_enum(enum_cls: Type[EnumT], value: Any) -> Optional[EnumT]:
+    """Return a column value as a member of ``enum_cls`` (None if missing or unknown)
+
+    Enum columns normally load as members already; raw values are converted once
+    so callers can compare members by identity.
+    """
+    if value is None or isinstance(value, enum_cls):
+        return value
+    try:
+        return enum_cls(value)
+    except ValueError:
+        return None
+
+
+def _enum_value(member: Optional[Enum], default: Optional[str] = None) -> Optional[str]:
+    """Return an enum member's value, or ``default`` when unset"""
+    return member.value if member else default
+
+
+def _isoformat(moment: Optional[datetime]) -> Optional[str]:
+    """Return a datetime in ISO format, or None when unset"""
+    return moment.isoformat() if moment else None
+
+
+def _response_json(response: httpx.Response) -> Any:
+    """Decode a Graph API response body, with orjson when it is installed"""
+    if orjson_available:
+        return orjson.loads(response.content)
+    return response.json()
+
+
+def _error_result(error: Exception) -> Dict[str, Any]:
+    """Result returned by wrappers whose callers expect an error dict"""
+    return {"error": str(error)}
+
+
+def _log_errors(message: str, default: Any = None,
+                default_factory: Optional[Callable[[Exception], Any]] = None) -> Callable[[F], F]:
+    """Log exceptions from the wrapped (sync or async) method as ``message: error``
+
+    The method then returns ``default``, or ``default_factory(error)`` for
+    results that must be fresh or carry the error.
+    """
+    def fallback(error: Exception) -> Any:
+        logger.error(f"{message}: {error}")
+        return default_factory(error) if default_factory is not None else default
+
+    def decorator(func: F) -> F:
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args: Any, **kwargs: Any) -> Any:
+                try:
+                    return await func(*args, **kwargs)
+                except Exception as e:
+                    return fallback(e)
+            return cast(F, async_wrapper)
+
+        @functools.wraps(func)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            try:
+                return func(*args, **kwargs)
+            except Exception as e:
+                return fallback(e)
+        return cast(F, wrapper)
+    return decorator
+
+
+def _recency_score(days_since_last_message: int) -> int:
+    """Score how recently a user was active"""
+    for max_days, points in _RECENCY_SCORES:
+        if days_since_last_message <= max_days:
+            return points
+    return 0
+
+
+@functools.lru_cache(maxsize=4096)
+def _advance_decision(current_stage: LeadStage, current_score: int) -> Tuple[bool, LeadStage]:
+    """Stage advancement for a (stage, score) pair; pure, so results are cached"""
+    suggested_stage = next(
+        stage for min_score, stage in _STAGE_BY_SCORE if (current_score or 0) >= min_score
+    )
+
+    rule = _STAGE_PROGRESSION.get(current_stage)
+    if not rule:
+        return False, current_stage
+
+    # Check if score meets minimum for next stage
+    min_score, next_stage = rule
+    if current_score >= min_score and suggested_stage != current_stage:
+        return True, next_stage
+
+    return False, current_stage
+
+
+# (PSID -> (position, lead), phone number -> (position, lead)), see _index_leads
+LeadIndex = Tuple[Dict[str, Tuple[int, Dict[str, Any]]], Dict[str, Tuple[int, Dict[str, Any]]]]
+# PSID -> (column values, activity rows) of buffered users that have no id yet
+NewUserWrites = Dict[str, Tuple[Dict[str, Any], List[Dict[str, Any]]]]
+
+
+# (monotonic computation time, analytics) of the last get_lead_analytics result.
+# Shared by every service instance (webhook, dashboard, DI container), so a lead
+# write through any of them invalidates it for all
+_analytics_cache: Optional[Tuple[float, Dict[str, Any]]] = None
+
+
+def _invalidate_analytics() -> None:
+    """Drop the cached lead analytics after lead data changed"""
+    global _analytics_cache
+    _analytics_cache = None
+
+
+class GraphAPIUnavailableError(Exception):
+    """Graph API call was rate limited or failed transiently; safe to retry later"""
+
 
 class FacebookLeadCenterService:
     """Comprehensive service for Facebook Lead Center integration - نعتمد على Facebook Lead Center الموجود"""
@@ -22,6 +276,42 @@ class FacebookLeadCenterService:
         # System User Token (اختياري - للصلاحيات المتقدمة)
         self.system_user_token = settings.FB_SYSTEM_USER_TOKEN
 
+        # (monotonic fetch time, forms) of the last successful leadgen form lookup
+        self._forms_cache: Tuple[float, Optional[List[Dict[str, Any]]]] = (0.0, None)
+
+        # Lead data awaiting a debounced Facebook sync, latest snapshot per PSID
+        self._pending_syncs: Dict[str, Dict[str, Any]] = {}
+        self._sync_lock = threading.Lock()
+        self._sync_timer: Optional[threading.Timer] = None
+
+        # Lead writes awaiting one batched commit: column values per user id plus
+        # activity rows, and users without an id yet (column values and their
+        # activity rows per PSID), and the monotonic time the oldest was buffered.
+        # A writer thread, started on the first write, commits them on its own
+        # database connection; _flush_lock keeps flushes in order
+        self._pending_user_writes: Dict[int, Dict[str, Any]] = {}
+        self._pending_activity_rows: List[Dict[str, Any]] = []
+        self._pending_new_users: NewUserWrites = {}
+        self._pending_since: Optional[float] = None
+        self._write_lock = threading.Lock()
+        self._write_ready = threading.Condition(self._write_lock)
+        self._flush_lock = threading.Lock()
+        self._writer: Optional[threading.Thread] = None
+        self._writer_stopped = False
+        # Consecutive failed flushes, and the monotonic time the writer retries after
+        self._write_failures = 0
+        self._write_retry_at = 0.0
+
+        # Pooled keep-alive client shared by all Graph API calls (thread-safe);
+        # idle connections outlive httpx's 5s default so sparse, debounced
+        # syncs still reuse an open TLS connection
+        self._http = httpx.Client(
+            http2=http2_available,
+            timeout=10,
+            limits=httpx.Limits(max_connections=64, max_keepalive_connections=32,
+                                keepalive_expiry=60)
+        )
+
         # Initialize Messenger Service for lead automation
         self.messenger_service = MessengerService()
 
@@ -71,56 +361,142 @@ class FacebookLeadCenterService:
             CustomerLabel.AL_MUHAFAZA: ["محافظه", "محافظة", "منين", "أين", "governorate", "location"]
         }
 
+        # Compile each keyword map once so a message is scanned in a single pass,
+        # or in one regex scan per category when pyahocorasick is missing
+        self._type_automaton = self._build_keyword_automaton(self.customer_type_keywords)
+        self._label_automaton = self._build_keyword_automaton(self.label_keywords)
+        self._type_patterns = self._compile_keyword_patterns(self.customer_type_keywords)
+        self._label_patterns = self._compile_keyword_patterns(self.label_keywords)
+
+    @staticmethod
+    def _build_keyword_automaton(keyword_map: Dict[Any, List[str]]) -> Optional[Any]:
+        """Compile a keyword map into an Aho-Corasick automaton (None if pyahocorasick is missing)
+
+        Each keyword carries (rank, category), rank being the category's position in
+        ``keyword_map``, so the lowest-ranked hit matches what a linear scan would return.
+        """
+        if not ahocorasick_available:
+            return None
+
+        automaton = ahocorasick.Automaton()
+        for rank, (category, keywords) in enumerate(keyword_map.items()):
+            for keyword in keywords:
+                # A keyword listed under several categories belongs to the first one
+                if keyword not in automaton:
+                    automaton.add_word(keyword, (rank, category))
+        automaton.make_automaton()
+        return automaton
+
+    @staticmethod
+    def _compile_keyword_patterns(
+            keyword_map: Dict[Any, List[str]]) -> Tuple[Tuple[Any, re.Pattern], ...]:
+        """Compile each category's keywords into one alternation
+
+        Empty when the automaton is used.
+        """
+        if ahocorasick_available:
+            return ()
+
+        return tuple(
+            (category, re.compile("|".join(re.escape(keyword) for keyword in keywords)))
+            for category, keywords in keyword_map.items()
+            if keywords
+        )
+
+    @staticmethod
+    def _match_keywords(automaton: Optional[Any], patterns: Tuple[Tuple[Any, re.Pattern], ...],
+                        message_lower: str) -> Optional[Any]:
+        """Return the first category, in keyword-map order, with a keyword found in the message"""
+        if automaton is not None:
+            best: Optional[Tuple[int, Any]] = None
+            for _end, hit in automaton.iter(message_lower):
+                if best is None or hit[0] < best[0]:
+                    best = hit
+                    if best[0] == 0:
+                        break
+            return best[1] if best else None
+
+        for category, pattern in patterns:
+            if pattern.search(message_lower):
+                return category
+        return None
+
     # ==================== CUSTOMER CLASSIFICATION METHODS ====================
 
     def classify_customer_type(self, message_text: str, user: User) -> Optional[CustomerType]:
         """Classify customer type based on message content and behavior patterns"""
-        try:
-            message_lower = message_text.lower()
+        return self._classify_customer_type(message_text.lower(), user)
 
+    def classify_customer_label(self, message_text: str, user: User) -> Optional[CustomerLabel]:
+        """Classify customer label based on message content"""
+        return self._classify_customer_label(message_text.lower(), user)
+
+    def _classify(self, message_lower: str, user: User,
+                  now: Optional[datetime] = None
+                  ) -> Tuple[Optional[CustomerType], Optional[CustomerLabel]]:
+        """Classify both customer type and label from an already-lowercased message"""
+        return (self._classify_customer_type(message_lower, user, now),
+                self._classify_customer_label(message_lower, user))
+
+    def _classify_customer_type(self, message_lower: str, user: User,
+                                now: Optional[datetime] = None) -> Optional[CustomerType]:
+        """Classify customer type from an already-lowercased message"""
+        try:
             # Check for explicit keywords
-            for customer_type, keywords in self.customer_type_keywords.items():
-                for keyword in keywords:
-                    if keyword in message_lower:
-                        return customer_type
+            customer_type = self._match_keywords(
+                self._type_automaton, self._type_patterns, message_lower
+            )
+            if customer_type is not None:
+                return customer_type
 
             # Analyze behavior patterns
-            return self._analyze_behavior_patterns(user)
+            return self._analyze_behavior_patterns(user, now)
 
         except Exception as e:
             logger.error(f"Error classifying customer type: {e}")
             return None
 
-    def _analyze_behavior_patterns(self, user: User) -> Optional[CustomerType]:
-        """Analyze user behavior patterns to determine customer type"""
+    def _analyze_behavior_patterns(self, user: User,
+                                   now: Optional[datetime] = None) -> Optional[CustomerType]:
+        """Analyze user behavior patterns to determine customer type
+
+        ``now`` defaults to the current time.
+        """
         try:
-            # Get user's message history
+            # Aggregate hesitation/question-word hits over the recent inbound
+            # history in the database instead of hydrating the rows
             with get_db_session() as db:
-                messages = db.query(Message).filter(
+                recent = db.query(Message.message_text.label("text")).filter(
                     Message.user_id == user.id,
                     Message.direction == MessageDirection.INBOUND
-                ).order_by(Message.timestamp.desc()).limit(10).all()
-
-                if not messages:
+                ).order_by(Message.timestamp.desc()).limit(10).subquery()
+                text = recent.c.text
+
+                message_count, hesitation_hits, question_count = db.query(
+                    func.count(),
+                    func.sum(case(
+                        (or_(*[text.like(f"%{word}%") for word in _HESITATION_WORDS]), 1),
+                        else_=0
+                    )),
+                    func.sum(sum(
+                        case((text.like(f"%{word}%"), 1), else_=0) for word in _QUESTION_WORDS
+                    ))
+                ).select_from(recent).one()
+
+                if not message_count:
                     return None
 
-                # Analyze patterns
-                message_texts = [msg.message_text.lower() for msg in messages if msg.message_text is not None]
-                combined_text = " ".join(message_texts)
-
                 # Check for hesitation patterns
-                hesitation_words = ["مش متأكد", "أفكر", "شوف", "أرجع", "أشوف"]
-                if any(word in combined_text for word in hesitation_words):
+                if hesitation_hits:
                     return CustomerType.HESITANT_BUYER
 
                 # Check for loyalty patterns
-                if user.created_at and (datetime.now(timezone.utc) - user.created_at).days > 7:
+                now = now or datetime.now(timezone.utc)
+                if user.created_at and (now - user.created_at).days > 7:
                     return CustomerType.LOYAL_BUYER
 
                 # Check for logical patterns (asking detailed questions)
-                question_words = ["إيه", "أيه", "كيف", "متى", "أين", "لماذا"]
-                question_count = sum(1 for text in message_texts for word in question_words if word in text)
-                if question_count >= 3:
+                if (question_count or 0) >= 3:
                     return CustomerType.LOGICAL_BUYER
 
                 # Default to emotional buyer for new users
@@ -130,21 +506,18 @@ class FacebookLeadCenterService:
             logger.error(f"Error analyzing behavior patterns: {e}")
             return None
 
-    def classify_customer_label(self, message_text: str, user: User) -> Optional[CustomerLabel]:
-        """Classify customer label based on message content"""
+    def _classify_customer_label(self, message_lower: str, user: User) -> Optional[CustomerLabel]:
+        """Classify customer label from an already-lowercased message"""
         try:
-            message_lower = message_text.lower()
-
             # Check for explicit keywords
-            for label, keywords in self.label_keywords.items():
-                for keyword in keywords:
-                    if keyword in message_lower:
-                        return label
+            label = self._match_keywords(self._label_automaton, self._label_patterns, message_lower)
+            if label is not None:
+                return label
 
             # Default classification based on user behavior
             if user.customer_label is None:
                 # Check if user asks about quantities (wholesale)
-                if any(word in message_lower for word in ["كمية", "كيلو", "جمله"]):
+                if _QUANTITY_RE.search(message_lower):
                     return CustomerLabel.JUMLA
                 else:
                     return CustomerLabel.QITAEI  # Default to retail
@@ -155,56 +528,18 @@ class FacebookLeadCenterService:
             logger.error(f"Error classifying customer label: {e}")
             return None
 
-    def calculate_lead_score(self, user: User) -> int:
-        """Calculate lead score based on various factors"""
+    def calculate_lead_score(self, user: User, now: Optional[datetime] = None) -> int:
+        """Calculate lead score based on various factors (``now`` defaults to the current time)"""
         try:
-            score = 0
-
-            # Base score for engagement
-            score += 10
-
-            # Customer type scoring
-            user_type = enum_to_value(user.customer_type)
-            if user_type == CustomerType.VALUE_SEEKER.value:
-                score += 25
-            elif user_type == CustomerType.LOYAL_BUYER.value:
-                score += 20
-            elif user_type == CustomerType.LOGICAL_BUYER.value:
-                score += 15
-            elif user_type == CustomerType.EMOTIONAL_BUYER.value:
-                score += 10
-            elif user_type == CustomerType.SCARCITY_BUYER.value:
-                score += 15
-            elif user_type == CustomerType.BARGAIN_HUNTER.value:
-                score += 5
-            elif user_type == CustomerType.HESITANT_BUYER.value:
-                score -= 5
-
-            # Label scoring
-            user_label = enum_to_value(user.customer_label)
-            if user_label == CustomerLabel.JUMLA.value:
-                score += 20  # Wholesale customers are high value
-            elif user_label == CustomerLabel.QITAEI.value:
-                score += 10  # Retail customers
-            elif user_label == CustomerLabel.NEW_CUSTOMER.value:
-                score += 5   # New customers need nurturing
-
-            # Activity scoring
+            # Base score for engagement, then type, label, activity and governorate
+            score = 10
+            score += _TYPE_SCORES.get(_coerce_enum(CustomerType, user.customer_type), 0)
+            score += _LABEL_SCORES.get(_coerce_enum(CustomerLabel, user.customer_label), 0)
             if user.last_message_at is not None:
-                days_since_last_message = (datetime.now(timezone.utc) - user.last_message_at).days
-                if days_since_last_message <= 1:
-                    score += 15  # Very recent activity
-                elif days_since_last_message <= 3:
-                    score += 10  # Recent activity
-                elif days_since_last_message <= 7:
-                    score += 5   # Somewhat recent
-
-            # Governorate scoring (some governorates might be higher value)
-            if user.governorate is not None:
-                high_value_governorates = ["Cairo", "Giza", "Alexandria"]
-                gov_value = enum_to_value(user.governorate)
-                if gov_value and gov_value in high_value_governorates:
-                    score += 5
+                now = now or datetime.now(timezone.utc)
+                score += _recency_score((now - user.last_message_at).days)
+            if _coerce_enum(Governorate, user.governorate) in _HIGH_VALUE_GOVERNORATES:
+                score += 5
 
             return max(0, min(100, score))  # Keep score between 0-100
 
@@ -218,14 +553,7 @@ class FacebookLeadCenterService:
             # Get integer value - SQLAlchemy will return the actual int value, not Column
             current_score: int = user.lead_score if user.lead_score else 0
 
-            if current_score >= 80:
-                return LeadStage.CONVERTED
-            elif current_score >= 60:
-                return LeadStage.IN_PROGRESS
-            elif current_score >= 40:
-                return LeadStage.QUALIFIED
-            else:
-                return LeadStage.INTAKE
+            return next(stage for min_score, stage in _STAGE_BY_SCORE if current_score >= min_score)
 
         except Exception as e:
             logger.error(f"Error determining next stage: {e}")
@@ -234,65 +562,47 @@ class FacebookLeadCenterService:
     def should_advance_stage(self, user: User) -> Tuple[bool, LeadStage]:
         """Check if user should advance to next stage"""
         try:
-            # Get actual values from SQLAlchemy columns
-            current_stage_value = enum_to_value(user.lead_stage)
-            if current_stage_value is None:
-                current_stage = LeadStage.INTAKE
-            else:
-                current_stage = LeadStage(current_stage_value)
-
-            current_score = user.lead_score
-            suggested_stage = self.determine_next_stage(user)
-
-            # Define stage progression rules
-            stage_progression: Dict[LeadStage, Dict[str, Any]] = {
-                LeadStage.INTAKE: {
-                    'min_score': 40,
-                    'next_stage': LeadStage.QUALIFIED
-                },
-                LeadStage.QUALIFIED: {
-                    'min_score': 60,
-                    'next_stage': LeadStage.IN_PROGRESS
-                },
-                LeadStage.IN_PROGRESS: {
-                    'min_score': 80,
-                    'next_stage': LeadStage.CONVERTED
-                },
-                LeadStage.CONVERTED: {
-                    'min_score': 80,
-                    'next_stage': LeadStage.CONVERTED  # Stay converted
-                }
-            }
-
-            rules = stage_progression.get(current_stage)
-            if not rules:
-                return False, current_stage
-
-            # Check if score meets minimum for next stage
-            if current_score >= rules['min_score'] and suggested_stage != current_stage:
-                return True, rules['next_stage']
-
-            return False, current_stage
+            # Resolve the stage member once; rules are keyed by member
+            current_stage = _coerce_enum(LeadStage, user.lead_stage) or LeadStage.INTAKE
+            return _advance_decision(current_stage, user.lead_score)
 
         except Exception as e:
             logger.error(f"Error checking stage advancement: {e}")
             # Return current stage as enum, not Column
-            stage_value = enum_to_value(user.lead_stage)
-            return False, LeadStage(stage_value) if stage_value else LeadStage.INTAKE
+            return False, _coerce_enum(LeadStage, user.lead_stage) or LeadStage.INTAKE
+
+    @staticmethod
+    def _lead_activity_row(user: User, activity_type: str, old_value: str, new_value: str,
+                           reason: str, automated: bool = True,
+                           now: Optional[datetime] = None) -> Dict[str, Any]:
+        """Build LeadActivity column values, timestamped ``now`` (default: the current time)"""
+        return {
+            "user_id": user.id,
+            "activity_type": activity_type,
+            "old_value": old_value,
+            "new_value": new_value,
+            "reason": reason,
+            "automated": automated,
+            "timestamp": now or datetime.now(timezone.utc),
+        }
+
+    @classmethod
+    def _build_lead_activity(cls, user: User, activity_type: str, old_value: str, new_value: str,
+                             reason: str, automated: bool = True,
+                             now: Optional[datetime] = None) -> LeadActivity:
+        """Build an unsaved LeadActivity record"""
+        return LeadActivity(**cls._lead_activity_row(
+            user, activity_type, old_value, new_value, reason, automated, now
+        ))
 
     def log_lead_activity(self, user: User, activity_type: str, old_value: str,
-                          new_value: str, reason: str, automated: bool = True):
+                          new_value: str, reason: str, automated: bool = True,
+                          now: Optional[datetime] = None):
         """Log lead activity changes"""
         try:
             with get_db_session() as db:
-                activity = LeadActivity(
-                    user_id=user.id,
-                    activity_type=activity_type,
-                    old_value=old_value,
-                    new_value=new_value,
-                    reason=reason,
-                    automated=automated,
-                    timestamp=datetime.now(timezone.utc)
+                activity = self._build_lead_activity(
+                    user, activity_type, old_value, new_value, reason, automated, now
                 )
 
                 db.add(activity)
@@ -303,10 +613,65 @@ class FacebookLeadCenterService:
         except Exception as e:
             logger.error(f"Error logging lead activity: {e}")
 
+    def log_lead_activities(self, user: User, activities: List[Tuple[str, str, str, str]],
+                            automated: bool = True, now: Optional[datetime] = None) -> None:
+        """Log several (activity_type, old_value, new_value, reason) changes with one INSERT"""
+        if not activities:
+            return
+        try:
+            with get_db_session() as db:
+                db.execute(insert(LeadActivity), [
+                    self._lead_activity_row(user, *activity, automated=automated, now=now)
+                    for activity in activities
+                ])
+                db.commit()
+
+                logger.info(f"Logged {len(activities)} lead activities for user {user.psid}")
+
+        except Exception as e:
+            logger.error(f"Error logging lead activities: {e}")
+
     # ==================== FACEBOOK LEAD CENTER API METHODS ====================
 
+    @retry_on_error(RetryConfig(max_retries=2, delay=1.0, max_delay=30.0),
+                    exceptions=(GraphAPIUnavailableError,))
+    @circuit_breaker("facebook_lead_center", CircuitBreakerConfig(
+        failure_threshold=5, recovery_timeout=60, expected_exception=GraphAPIUnavailableError))
+    def _graph_get(self, url: str, params: Dict[str, Any]) -> httpx.Response:
+        """GET a Graph API URL, retrying rate limits and transient failures with backoff
+
+        Repeated failures open the circuit breaker, after which calls fail fast
+        until the cool-down ends instead of hitting a refusing API per lead.
+        The backoff sleeps (up to 3s per call), so never call this, or anything
+        that reaches it, on the event loop: async routes go through the
+        ``*_async`` wrappers, and lead syncs run on the debounce timer thread.
+        """
+        try:
+            response = self._http.get(url, params=params)
+        except httpx.TransportError as e:
+            raise GraphAPIUnavailableError(f"Graph API request failed: {e}") from e
+
+        if response.status_code == 429 or response.status_code >= 500:
+            raise GraphAPIUnavailableError(f"Graph API unavailable: {response.status_code}")
+        if response.status_code != 200:
+            try:
+                error_code = _response_json(response).get("error", {}).get("code")
+            except ValueError:
+                error_code = None
+            if error_code in _GRAPH_RATE_LIMIT_CODES:
+                raise GraphAPIUnavailableError(f"Graph API rate limit reached (code {error_code})")
+
+        return response
+
     def get_leadgen_forms(self) -> Optional[List[Dict[str, Any]]]:
-        """Get all leadgen forms for the page"""
+        """Get all leadgen forms for the page
+
+        Successful results are cached for _FORMS_CACHE_TTL seconds.
+        """
+        cached_at, cached_forms = self._forms_cache
+        if cached_forms is not None and time.monotonic() - cached_at < _FORMS_CACHE_TTL:
+            return cached_forms
+
         try:
             url = f"{self.api_url}/{self.page_id}/leadgen_forms"
             # استخدام Page Access Token للـ Lead Center (مطلوب)
@@ -315,12 +680,13 @@ class FacebookLeadCenterService:
                 "fields": "id,name,status,leads_count,created_time,privacy_policy_url,terms_and_conditions_url"
             }
 
-            response = requests.get(url, params=params, timeout=10)
+            response = self._graph_get(url, params=params)
 
             if response.status_code == 200:
-                data = response.json()
+                data = _response_json(response)
                 forms = data.get('data', [])
                 logger.info(f"Retrieved {len(forms)} leadgen forms for page {self.page_id}")
+                self._forms_cache = (time.monotonic(), forms)
                 return forms
             else:
                 logger.error(f"Failed to get leadgen forms: {response.status_code} - {response.text}")
@@ -328,7 +694,8 @@ class FacebookLeadCenterService:
 
         except Exception as e:
             logger.error(f"Error getting leadgen forms: {e}")
-            return None
+            # Serve stale forms, if any, while the Graph API is refusing calls
+            return cached_forms
 
     def get_leads_from_form(self, form_id: str) -> Optional[List[Dict[str, Any]]]:
         """Get leads from a specific leadgen form"""
@@ -340,10 +707,10 @@ class FacebookLeadCenterService:
                 "fields": "id,created_time,field_data,ad_id,ad_name,adset_id,adset_name,campaign_id,campaign_name"
             }
 
-            response = requests.get(url, params=params, timeout=10)
+            response = self._graph_get(url, params=params)
 
             if response.status_code == 200:
-                data = response.json()
+                data = _response_json(response)
                 leads = data.get('data', [])
                 logger.info(f"Retrieved {len(leads)} leads from form {form_id}")
                 return leads
@@ -362,13 +729,13 @@ class FacebookLeadCenterService:
             # استخدام Page Access Token للـ Lead Center (مطلوب)
             params = {
                 "access_token": self.page_access_token,
-                "fields": "id,created_time,field_data,ad_id,ad_name,adset_id,adset_name,campaign_id,campaign_name,form_id"
+                "fields": _LEAD_DETAIL_FIELDS
             }
 
-            response = requests.get(url, params=params, timeout=10)
+            response = self._graph_get(url, params=params)
 
             if response.status_code == 200:
-                lead_data = response.json()
+                lead_data = _response_json(response)
                 logger.info(f"Retrieved lead details for {lead_id}")
                 return lead_data
             else:
@@ -379,6 +746,44 @@ class FacebookLeadCenterService:
             logger.error(f"Error getting lead details: {e}")
             return None
 
+    def get_lead_details_batch(self, lead_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Get details for many leads, up to _LEAD_BATCH_SIZE per Graph API request
+
+        Returns a mapping of lead id to lead details; leads that could not be
+        fetched are omitted.
+        """
+        details: Dict[str, Dict[str, Any]] = {}
+        for start in range(0, len(lead_ids), _LEAD_BATCH_SIZE):
+            chunk = lead_ids[start:start + _LEAD_BATCH_SIZE]
+            try:
+                params = {
+                    "ids": ",".join(chunk),
+                    "access_token": self.page_access_token,
+                    "fields": _LEAD_DETAIL_FIELDS
+                }
+
+                response = self._graph_get(f"{self.api_url}/", params=params)
+
+                if response.status_code == 200:
+                    details.update(_response_json(response))
+                    logger.info(f"Retrieved lead details for {len(chunk)} leads")
+                    continue
+
+                logger.error(
+                    f"Failed to get lead details batch: {response.status_code} - {response.text}"
+                )
+
+            except Exception as e:
+                logger.error(f"Error getting lead details batch: {e}")
+
+            # One bad id fails the whole ?ids= request, so retry this chunk per lead
+            for lead_id in chunk:
+                lead_details = self.get_lead_details(lead_id)
+                if lead_details:
+                    details[lead_id] = lead_details
+
+        return details
+
     def process_leadgen_webhook(self, webhook_data: Dict[str, Any]) -> Dict[str, Any]:
         """Process incoming leadgen webhook from Facebook"""
         try:
@@ -389,28 +794,61 @@ class FacebookLeadCenterService:
                 "errors": []
             }
 
-            # Process each entry in the webhook
+            # Collect lead ids from every entry in the webhook
+            lead_ids: List[str] = []
             for entry in webhook_data.get("entry", []):
                 for change in entry.get("changes", []):
                     if change.get("field") == "leadgen":
-                        lead_data = change.get("value", {})
-                        lead_id = lead_data.get("leadgen_id")
-
+                        lead_id = change.get("value", {}).get("leadgen_id")
                         if lead_id:
-                            # Get detailed lead information
-                            lead_details = self.get_lead_details(lead_id)
-                            if lead_details:
-                                # Process the lead
-                                result = self._process_facebook_lead(lead_details)
-                                results["processed_leads"] += 1
+                            lead_ids.append(lead_id)
 
-                                if result.get("created"):
-                                    results["created_users"] += 1
-                                elif result.get("updated"):
-                                    results["updated_users"] += 1
+            # Fetch detailed lead information in batched round trips
+            lead_details_by_id = self.get_lead_details_batch(list(dict.fromkeys(lead_ids)))
 
-                                if result.get("error"):
-                                    results["errors"].append(result["error"])
+            batch = [
+                (lead_details, self._extract_lead_info(lead_details.get("field_data", [])))
+                for lead_details in (lead_details_by_id.get(lead_id) for lead_id in lead_ids)
+                if lead_details
+            ]
+
+            # Process every lead in one transaction instead of one commit per lead
+            received: List[Tuple[User, str]] = []
+            # One timestamp for every user and activity touched by this webhook
+            now = datetime.now(timezone.utc)
+            with get_db_session() as db:
+                self._begin_outer_transaction(db)
+                # Resolve existing users for the whole batch with a single query
+                users_by_psid, users_by_phone = self._preload_lead_users(
+                    db, [info for _, info in batch]
+                )
+
+                for lead_details, lead_info in batch:
+                    # Process the lead
+                    result = self._process_facebook_lead(
+                        db, lead_details, lead_info, users_by_psid, users_by_phone, received, now
+                    )
+                    results["processed_leads"] += 1
+
+                    if result.get("created"):
+                        results["created_users"] += 1
+                    elif result.get("updated"):
+                        results["updated_users"] += 1
+
+                    if result.get("error"):
+                        results["errors"].append(result["error"])
+
+                # Log the lead activities as one executemany INSERT in the same commit
+                if received:
+                    db.execute(insert(LeadActivity), [
+                        self._lead_activity_row(
+                            user, "facebook_lead_received", "None",
+                            f"Lead ID: {lead_id}", "Received from Facebook Lead Center", now=now
+                        )
+                        for user, lead_id in received
+                    ])
+                db.commit()
+            _invalidate_analytics()
 
             logger.info(f"Processed leadgen webhook: {results}")
             return results
@@ -419,28 +857,72 @@ class FacebookLeadCenterService:
             logger.error(f"Error processing leadgen webhook: {e}")
             return {"error": str(e)}
 
-    def _process_facebook_lead(self, lead_details: Dict[str, Any]) -> Dict[str, Any]:
-        """Process a Facebook lead and create/update local user"""
+    @staticmethod
+    def _begin_outer_transaction(db: Session) -> None:
+        """Open the database transaction before the first per-lead savepoint
+
+        pysqlite only emits BEGIN ahead of DML, so a SAVEPOINT issued first would
+        start the transaction itself and its RELEASE would commit that lead on
+        its own, outside the batch.
+        """
+        connection = db.connection()
+        if getattr(connection.connection.dbapi_connection, "in_transaction", True) is False:
+            connection.exec_driver_sql("BEGIN")
+
+    @staticmethod
+    def _preload_lead_users(db: Session, lead_infos: List[Dict[str, Any]]
+                            ) -> Tuple[Dict[str, User], Dict[str, User]]:
+        """Load every existing user a batch of leads may refer to in one query
+
+        Returns:
+            (users by PSID, users by phone number); for a phone shared by several
+            users the lowest id wins
+        """
+        psids = {info["psid"] for info in lead_infos if info.get("psid")}
+        phones = {info["phone_number"] for info in lead_infos if info.get("phone_number")}
+
+        users_by_psid: Dict[str, User] = {}
+        users_by_phone: Dict[str, User] = {}
+        if not psids and not phones:
+            return users_by_psid, users_by_phone
+
+        users = db.query(User).filter(
+            or_(User.psid.in_(psids), User.phone_number.in_(phones))
+        ).order_by(User.id).all()
+        for user in users:
+            users_by_psid[user.psid] = user
+            if user.phone_number:
+                users_by_phone.setdefault(user.phone_number, user)
+        return users_by_psid, users_by_phone
+
+    def _process_facebook_lead(self, db: Session, lead_details: Dict[str, Any],
+                               lead_info: Dict[str, Any], users_by_psid: Dict[str, User],
+                               users_by_phone: Dict[str, User],
+                               received: List[Tuple[User, str]], now: datetime) -> Dict[str, Any]:
+        """Process a Facebook lead and create/update local user
+
+        Runs inside the caller's transaction under its own savepoint, so a failing
+        lead only rolls back itself. Existing users are resolved from the maps built
+        by _preload_lead_users, which are kept current as users are created or gain
+        a phone number. Successfully processed users are appended to ``received``
+        with their lead id for activity logging.
+        """
         try:
             lead_id = lead_details.get("id")
-            field_data = lead_details.get("field_data", [])
-
-            # Extract lead information
-            lead_info = self._extract_lead_info(field_data)
 
             if not lead_info:
                 return {"error": "No valid lead information found"}
 
             # Find or create user
-            with get_db_session() as db:
+            with db.begin_nested():
                 # Try to find existing user by PSID, phone, or email
                 user = None
 
                 if lead_info.get("psid"):
-                    user = db.query(User).filter(User.psid == lead_info["psid"]).first()
+                    user = users_by_psid.get(lead_info["psid"])
 
                 if not user and lead_info.get("phone_number"):
-                    user = db.query(User).filter(User.phone_number == lead_info["phone_number"]).first()
+                    user = users_by_phone.get(lead_info["phone_number"])
 
                 created = False
                 if not user:
@@ -454,8 +936,8 @@ class FacebookLeadCenterService:
                         customer_type=CustomerType.EMOTIONAL_BUYER,  # Default
                         customer_label=CustomerLabel.NEW_CUSTOMER,
                         lead_score=10,  # Base score for new leads
-                        created_at=datetime.now(timezone.utc),
-                        last_message_at=datetime.now(timezone.utc)
+                        created_at=now,
+                        last_message_at=now
                     )
                     db.add(user)
                     created = True
@@ -469,23 +951,23 @@ class FacebookLeadCenterService:
                     if lead_info.get("phone_number") and user.phone_number is None:
                         user.phone_number = lead_info["phone_number"]
 
-                    user.last_message_at = datetime.now(timezone.utc)
+                    user.last_message_at = now
                     logger.info(f"Updated existing user {user.psid} from Facebook lead {lead_id}")
 
-                # Log the lead activity
-                self.log_lead_activity(
-                    user, "facebook_lead_received", "None",
-                    f"Lead ID: {lead_id}", "Received from Facebook Lead Center"
-                )
+            # Later leads in the batch must see this user
+            users_by_psid[user.psid] = user
+            if user.phone_number:
+                users_by_phone.setdefault(user.phone_number, user)
 
-                db.commit()
+            # The savepoint flushed the user, so it has an id for activity logging
+            received.append((user, lead_id))
 
-                return {
-                    "created": created,
-                    "updated": not created,
-                    "user_id": user.id,
-                    "psid": user.psid
-                }
+            return {
+                "created": created,
+                "updated": not created,
+                "user_id": user.id,
+                "psid": user.psid
+            }
 
         except Exception as e:
             logger.error(f"Error processing Facebook lead: {e}")
@@ -504,33 +986,15 @@ class FacebookLeadCenterService:
                     value: str = field_values[0]  # Take first value
 
                     # Map Facebook fields to our user fields
-                    if field_name in ["full_name", "name"]:
+                    key = _FIELD_ALIAS.get(field_name)
+                    if key == _FULL_NAME:
                         # Split full name into first and last
                         name_parts: List[str] = value.split(" ", 1)
                         lead_info["first_name"] = name_parts[0]
                         if len(name_parts) > 1:
                             lead_info["last_name"] = name_parts[1]
-
-                    elif field_name in ["first_name", "given_name"]:
-                        lead_info["first_name"] = value
-
-                    elif field_name in ["last_name", "family_name", "surname"]:
-                        lead_info["last_name"] = value
-
-                    elif field_name in ["email", "email_address"]:
-                        lead_info["email"] = value
-
-                    elif field_name in ["phone_number", "phone", "mobile", "mobile_number"]:
-                        lead_info["phone_number"] = value
-
-                    elif field_name in ["psid", "user_id", "messenger_id"]:
-                        lead_info["psid"] = value
-
-                    elif field_name in ["city", "location"]:
-                        lead_info["city"] = value
-
-                    elif field_name in ["governorate", "state", "province"]:
-                        lead_info["governorate"] = value
+                    elif key:
+                        lead_info[key] = value
 
             return lead_info
 
@@ -556,77 +1020,195 @@ class FacebookLeadCenterService:
             logger.error(f"Error updating lead custom fields: {e}")
             return False
 
-    def sync_lead_to_facebook(self, user: User) -> bool:
-        """Sync local lead data to Facebook Lead Center - نعتمد على Facebook Lead Center الموجود"""
+    def _fetch_form_leads(self) -> Optional[Dict[str, Optional[List[Dict[str, Any]]]]]:
+        """Fetch the leads of every leadgen form, keyed by form id in form order
+
+        Returns None when the page has no leadgen forms.
+        """
+        # نحن نعتمد على Facebook Lead Center الموجود وليس إنشاء leads جديدة
+        forms = self.get_leadgen_forms()
+        if not forms:
+            logger.warning(
+                "No leadgen forms found for sync - نعتمد على Facebook Lead Center الموجود"
+            )
+            return None
+
+        # Fetch every form's leads concurrently over the pooled client
+        form_ids = [form['id'] for form in forms]
+        max_workers = min(_MAX_FORM_FETCH_WORKERS, len(form_ids))
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            return dict(zip(form_ids, executor.map(self.get_leads_from_form, form_ids)))
+
+    def _index_leads(self, form_leads: Dict[str, Optional[List[Dict[str, Any]]]]) -> LeadIndex:
+        """Index leads by PSID and by phone number
+
+        Every value of a PSID-like or phone-like field is indexed. Each entry keeps
+        the lead's position across all forms (form order, then lead order) so a
+        lookup can return the first matching lead, as a sequential scan would.
+        """
+        psid_index: Dict[str, Tuple[int, Dict[str, Any]]] = {}
+        phone_index: Dict[str, Tuple[int, Dict[str, Any]]] = {}
+
+        position = 0
+        for leads in form_leads.values():
+            for lead in leads or ():
+                for field in lead.get('field_data', []):
+                    field_name = field.get('name', '').lower()
+                    if field_name in _PSID_FIELDS:
+                        index = psid_index
+                    elif field_name in _PHONE_FIELDS:
+                        index = phone_index
+                    else:
+                        continue
+                    for value in field.get('values', []):
+                        index.setdefault(value, (position, lead))
+                position += 1
+
+        return psid_index, phone_index
+
+    @staticmethod
+    def _find_lead(lead_index: LeadIndex, psid: Any,
+                   phone_number: Optional[str]) -> Optional[Dict[str, Any]]:
+        """Return the first indexed lead matching a PSID or phone number"""
+        psid_index, phone_index = lead_index
+        hits = [psid_index.get(str(psid))]
+        if phone_number:
+            hits.append(phone_index.get(phone_number))
+        hits = [hit for hit in hits if hit is not None]
+        return min(hits, key=lambda hit: hit[0])[1] if hits else None
+
+    def sync_lead_to_facebook(self, user: User, lead_index: Optional[LeadIndex] = None) -> bool:
+        """Sync local lead data to Facebook Lead Center - نعتمد على Facebook Lead Center الموجود
+
+        Args:
+            user: Local user to sync
+            lead_index: Leads indexed by _index_leads(); fetched and built when omitted,
+                so batch callers can share one fetch and index across users
+
+        Returns:
+            True if the lead was synced or logged for manual processing
+        """
         try:
             # Prepare lead data
             lead_data = self._prepare_lead_data(user)
+        except Exception as e:
+            logger.error(f"Error syncing lead to Facebook: {e}")
+            return False
+
+        return self._sync_lead_data(lead_data, lead_index)
 
+    def _sync_lead_data(self, lead_data: Dict[str, Any],
+                        lead_index: Optional[LeadIndex] = None) -> bool:
+        """Sync prepared lead data (see _prepare_lead_data) to Facebook Lead Center"""
+        try:
             # Get leadgen forms to find the appropriate form
-            # نحن نعتمد على Facebook Lead Center الموجود وليس إنشاء leads جديدة
-            forms = self.get_leadgen_forms()
-            if not forms:
-                logger.warning("No leadgen forms found for sync - نعتمد على Facebook Lead Center الموجود")
-                return False
-
-            # For each form, check if this user's PSID matches any lead
-            for form in forms:
-                leads = self.get_leads_from_form(form['id'])
-                if leads:
-                    for lead in leads:
-                        # Check if this lead matches our user
-                        if self._lead_matches_user(lead, user):
-                            # Update the lead with our custom fields
-                            return self.update_lead_custom_fields(lead['id'], lead_data['custom_fields'])
+            if lead_index is None:
+                form_leads = self._fetch_form_leads()
+                if form_leads is None:
+                    return False
+                lead_index = self._index_leads(form_leads)
+
+            # Check if any lead matches our user
+            psid = lead_data["lead_id"]
+            lead = self._find_lead(lead_index, psid, lead_data.get("phone_number"))
+            if lead is not None:
+                # Update the lead with our custom fields
+                return self.update_lead_custom_fields(lead['id'], lead_data['custom_fields'])
 
             # If no matching lead found, log the data for manual processing
-            logger.info(f"No matching lead found for user {user.psid}, logging data: {lead_data} - نعتمد على Facebook Lead Center الموجود")
+            logger.info(
+                f"No matching lead found for user {psid}, logging data: {lead_data}"
+                " - نعتمد على Facebook Lead Center الموجود"
+            )
             return True
 
         except Exception as e:
             logger.error(f"Error syncing lead to Facebook: {e}")
             return False
 
-    def _lead_matches_user(self, lead: Dict[str, Any], user: User) -> bool:
-        """Check if a Facebook lead matches our local user - نعتمد على Facebook Lead Center الموجود"""
-        try:
-            # Extract field data from lead
-            field_data = lead.get('field_data', [])
-
-            for field in field_data:
-                field_name = field.get('name', '').lower()
-                field_value = field.get('values', [])
-
-                # Check for PSID match in various fields
-                if field_name in ['psid', 'user_id', 'messenger_id']:
-                    if str(user.psid) in field_value:
-                        return True
-
-                # Check for phone number match
-                if field_name in ['phone_number', 'phone', 'mobile']:
-                    if user.phone_number and user.phone_number in field_value:
-                        return True
-
-            return False
+    def queue_lead_sync(self, user: User) -> None:
+        """Queue a user for a debounced Facebook sync instead of syncing inline
+
+        The user's lead data is captured now. Updates to the same PSID within
+        _SYNC_DEBOUNCE_SECONDS are coalesced, and the whole batch is synced
+        against a single fetch of the leadgen forms.
+        """
+        lead_data = self._prepare_lead_data(user)
+        with self._sync_lock:
+            self._pending_syncs[str(user.psid)] = lead_data
+            if self._sync_timer is None:
+                self._sync_timer = threading.Timer(_SYNC_DEBOUNCE_SECONDS, self.flush_lead_syncs)
+                self._sync_timer.daemon = True
+                self._sync_timer.start()
+
+    def flush_lead_syncs(self, retry_failed: bool = True) -> int:
+        """Sync every queued lead now; returns how many synced successfully
+
+        Args:
+            retry_failed: Requeue the batch and retry it after _SYNC_RETRY_SECONDS
+                when the leadgen forms cannot be fetched, instead of dropping it
+        """
+        with self._sync_lock:
+            pending, self._pending_syncs = self._pending_syncs, {}
+            if self._sync_timer is not None:
+                self._sync_timer.cancel()
+                self._sync_timer = None
+
+        if not pending:
+            return 0
 
-        except Exception as e:
-            logger.error(f"Error checking lead match: {e}")
-            return False
+        form_leads = self._fetch_form_leads()
+        if form_leads is None:
+            if retry_failed:
+                self._requeue_lead_syncs(pending)
+            else:
+                logger.warning(
+                    f"Could not fetch leadgen forms; dropped {len(pending)} queued lead syncs"
+                )
+            return 0
+        lead_index = self._index_leads(form_leads)
+
+        return sum(self._sync_lead_data(lead_data, lead_index) for lead_data in pending.values())
+
+    def _requeue_lead_syncs(self, pending: Dict[str, Dict[str, Any]]) -> None:
+        """Put syncs that could not run back in the queue and schedule a retry
+
+        Lead data queued for the same PSID since the batch was taken is newer
+        and wins over the requeued data.
+        """
+        with self._sync_lock:
+            pending_syncs = {**pending, **self._pending_syncs}
+            excess = len(pending_syncs) - _MAX_PENDING_SYNCS
+            for psid in list(pending_syncs)[:max(0, excess)]:
+                del pending_syncs[psid]
+            self._pending_syncs = pending_syncs
+            if self._sync_timer is not None:
+                self._sync_timer.cancel()
+            self._sync_timer = threading.Timer(_SYNC_RETRY_SECONDS, self.flush_lead_syncs)
+            self._sync_timer.daemon = True
+            self._sync_timer.start()
+
+        logger.warning(
+            f"Could not fetch leadgen forms; retrying {len(pending_syncs)} queued lead syncs"
+            f" in {_SYNC_RETRY_SECONDS:g}s"
+        )
+        if excess > 0:
+            logger.error(f"Lead sync queue full; dropped {excess} oldest queued syncs")
 
     def _prepare_lead_data(self, user: User) -> Dict[str, Any]:
         """Prepare lead data for Facebook Lead Center API - نعتمد على Facebook Lead Center الموجود"""
         lead_data: Dict[str, Any] = {
             "lead_id": user.psid,  # Use PSID as lead ID
             "custom_fields": {
-                "lead_stage": user.lead_stage.value if user.lead_stage else "Intake",
-                "customer_type": user.customer_type.value if user.customer_type else "عميل المنطق",
-                "customer_label": user.customer_label.value if user.customer_label else "قطاعي",
-                "lead_score": str(user.lead_score) if user.lead_score else "0",
-                "governorate": user.governorate.value if user.governorate else None,
-                "last_message_at": user.last_message_at.isoformat() if user.last_message_at else None,
-                "last_stage_change": user.last_stage_change.isoformat() if user.last_stage_change else None,
-                "message_count": str(getattr(user, 'message_count', 0)) if hasattr(user, 'message_count') else "0",
-                "conversation_count": str(getattr(user, 'conversation_count', 0)) if hasattr(user, 'conversation_count') else "0"
+                "lead_stage": _enum_value(user.lead_stage, "Intake"),
+                "customer_type": _enum_value(user.customer_type, "عميل المنطق"),
+                "customer_label": _enum_value(user.customer_label, "قطاعي"),
+                "lead_score": str(user.lead_score or 0),
+                "governorate": _enum_value(user.governorate),
+                "last_message_at": _isoformat(user.last_message_at),
+                "last_stage_change": _isoformat(user.last_stage_change),
+                "message_count": str(getattr(user, 'message_count', 0) or 0),
+                "conversation_count": str(getattr(user, 'conversation_count', 0) or 0)
             }
         }
 
@@ -640,31 +1222,66 @@ class FacebookLeadCenterService:
 
         return lead_data
 
+    @staticmethod
+    def _iter_user_batches() -> Iterator[List[User]]:
+        """Yield users in id order, _USER_SYNC_CHUNK_SIZE at a time
+
+        Each batch is read in its own short session (keyset pagination on id), so
+        a long sync never holds one transaction open across the whole table.
+        """
+        last_id = 0
+        while True:
+            with get_db_session() as db:
+                batch = (
+                    db.query(User)
+                    .options(load_only(*_USER_SYNC_COLUMNS))
+                    .filter(User.id > last_id)
+                    .order_by(User.id)
+                    .limit(_USER_SYNC_CHUNK_SIZE)
+                    .all()
+                )
+            if not batch:
+                return
+            yield batch
+            last_id = batch[-1].id
+
     def sync_all_leads_to_facebook(self) -> Dict[str, Any]:
-        """Sync all local leads to Facebook Lead Center - نعتمد على Facebook Lead Center الموجود"""
+        """Sync all local leads to Facebook Lead Center - نعتمد على Facebook Lead Center الموجود
+
+        Users are synced batch by batch; ``processed_users`` reports how far the
+        sync got, including when it stops on an error.
+        """
+        results: Dict[str, Any] = {
+            "total_users": 0,
+            "processed_users": 0,
+            "successful_updates": 0,
+            "failed_updates": 0,
+            "errors": [],
+            "strategy": "نعتمد على Facebook Lead Center الموجود"
+        }
         try:
             with get_db_session() as db:
-                users = db.query(User).all()
-                results: Dict[str, Any] = {
-                    "total_users": len(users),
-                    "successful_updates": 0,
-                    "failed_updates": 0,
-                    "errors": [],
-                    "strategy": "نعتمد على Facebook Lead Center الموجود"
-                }
+                results["total_users"] = db.query(func.count(User.id)).scalar() or 0
+
+            # Fetch forms and their leads once for the whole batch, not per user
+            form_leads = self._fetch_form_leads()
+            lead_index = self._index_leads(form_leads) if form_leads is not None else None
 
+            for users in self._iter_user_batches():
                 for user in users:
-                    if self.sync_lead_to_facebook(user):
+                    if lead_index is not None and self.sync_lead_to_facebook(user, lead_index):
                         results["successful_updates"] += 1
                     else:
                         results["failed_updates"] += 1
                         results["errors"].append(f"Failed to sync user {user.psid}")
+                results["processed_users"] += len(users)
 
-                return results
+            return results
 
         except Exception as e:
             logger.error(f"Error syncing all leads to Facebook: {e}")
-            return {"error": str(e), "strategy": "نعتمد على Facebook Lead Center الموجود"}
+            results["error"] = str(e)
+            return results
 
     def create_lead_in_facebook(self, user: User) -> bool:
         """Create a new lead in Facebook Lead Center - نحن نعتمد على Facebook Lead Center الموجود"""
@@ -685,86 +1302,273 @@ class FacebookLeadCenterService:
 
     # ==================== LEAD MANAGEMENT UTILITIES ====================
 
-    def update_lead_stage(self, user: User, new_stage: LeadStage, reason: str = "Manual update") -> bool:
+    @_log_errors("Error updating lead stage", default=False)
+    def update_lead_stage(self, user: User, new_stage: LeadStage,
+                          reason: str = "Manual update") -> bool:
         """Update lead stage and sync to Facebook Lead Center"""
-        try:
-            old_stage = user.lead_stage
-            user.lead_stage = new_stage
-            user.last_stage_change = datetime.now(timezone.utc)
-
-            # Log the activity
-            self.log_lead_activity(
-                user, "stage_change",
-                old_stage.value if old_stage else "None",
-                new_stage.value, reason, automated=False
-            )
-
-            # Sync to Facebook Lead Center
-            self.sync_lead_to_facebook(user)
+        old_stage = user.lead_stage
+        if new_stage == old_stage:
+            return True
 
-            logger.info(f"Updated lead stage for {user.psid}: {old_stage.value if old_stage else 'None'} → {new_stage.value}")
+        now = datetime.now(timezone.utc)
+        user.lead_stage = new_stage
+        user.last_stage_change = now
+        self._queue_direct_update(user, {"lead_stage": new_stage, "last_stage_change": now})
+
+        # Log the activity
+        self.log_lead_activity(
+            user, "stage_change",
+            old_stage.value if old_stage else "None",
+            new_stage.value, reason, automated=False, now=now
+        )
+
+        _invalidate_analytics()
+
+        # Sync to Facebook Lead Center in the background
+        self.queue_lead_sync(user)
+
+        logger.info(
+            f"Updated lead stage for {user.psid}: "
+            f"{old_stage.value if old_stage else 'None'} → {new_stage.value}"
+        )
+        return True
+
+    @_log_errors("Error updating customer classification", default=False)
+    def update_customer_classification(self, user: User, new_type: Optional[CustomerType] = None,
+                                       new_label: Optional[CustomerLabel] = None,
+                                       reason: str = "Manual update") -> bool:
+        """Update customer type and/or label, rescoring and syncing once for both
+
+        Values equal to the current ones are ignored; when nothing changes the
+        score, activity log and Facebook sync are skipped entirely.
+        """
+        # (column, old value, new value) for each field that actually changes
+        changes: List[Tuple[str, Optional[Enum], Enum]] = []
+        if new_type is not None and new_type != user.customer_type:
+            changes.append(("customer_type", user.customer_type, new_type))
+        if new_label is not None and new_label != user.customer_label:
+            changes.append(("customer_label", user.customer_label, new_label))
+        if not changes:
             return True
 
-        except Exception as e:
-            logger.error(f"Error updating lead stage: {e}")
-            return False
+        for column, _old_value, new_value in changes:
+            setattr(user, column, new_value)
 
-    def update_customer_type(self, user: User, new_type: CustomerType, reason: str = "Manual update") -> bool:
-        """Update customer type and sync to Facebook Lead Center"""
-        try:
-            old_type = user.customer_type
-            user.customer_type = new_type
-
-            # Recalculate lead score
-            new_score = self.calculate_lead_score(user)
-            user.lead_score = new_score
-
-            # Log the activity
-            self.log_lead_activity(
-                user, "customer_type_change",
-                old_type.value if old_type else "None",
-                new_type.value, reason, automated=False
-            )
+        # Recalculate lead score
+        now = datetime.now(timezone.utc)
+        user.lead_score = self.calculate_lead_score(user, now)
+        self._queue_direct_update(user, {
+            **{column: new_value for column, _old_value, new_value in changes},
+            "lead_score": user.lead_score,
+        })
 
-            # Sync to Facebook Lead Center
-            self.sync_lead_to_facebook(user)
+        # Log the activities
+        self.log_lead_activities(user, [
+            (f"{column}_change", _enum_value(old_value, "None"), new_value.value, reason)
+            for column, old_value, new_value in changes
+        ], automated=False, now=now)
 
-            logger.info(f"Updated customer type for {user.psid}: {old_type.value if old_type else 'None'} → {new_type.value}")
-            return True
+        _invalidate_analytics()
 
-        except Exception as e:
-            logger.error(f"Error updating customer type: {e}")
-            return False
+        # Sync to Facebook Lead Center in the background
+        self.queue_lead_sync(user)
 
-    def update_customer_label(self, user: User, new_label: CustomerLabel, reason: str = "Manual update") -> bool:
-        """Update customer label and sync to Facebook Lead Center"""
-        try:
-            old_label = user.customer_label
-            user.customer_label = new_label
-
-            # Recalculate lead score
-            new_score = self.calculate_lead_score(user)
-            user.lead_score = new_score
-
-            # Log the activity
-            self.log_lead_activity(
-                user, "customer_label_change",
-                old_label.value if old_label else "None",
-                new_label.value, reason, automated=False
+        for column, old_value, new_value in changes:
+            logger.info(
+                f"Updated {column.replace('_', ' ')} for {user.psid}: "
+                f"{_enum_value(old_value, 'None')} → {new_value.value}"
             )
+        return True
 
-            # Sync to Facebook Lead Center
-            self.sync_lead_to_facebook(user)
-
-            logger.info(f"Updated customer label for {user.psid}: {old_label.value if old_label else 'None'} → {new_label.value}")
-            return True
+    def update_customer_type(self, user: User, new_type: CustomerType,
+                             reason: str = "Manual update") -> bool:
+        """Update customer type and sync to Facebook Lead Center"""
+        return self.update_customer_classification(user, new_type=new_type, reason=reason)
 
-        except Exception as e:
-            logger.error(f"Error updating customer label: {e}")
-            return False
+    def update_customer_label(self, user: User, new_label: CustomerLabel,
+                              reason: str = "Manual update") -> bool:
+        """Update customer label and sync to Facebook Lead Center"""
+        return self.update_customer_classification(user, new_label=new_label, reason=reason)
 
     # ==================== COMPREHENSIVE LEAD MANAGEMENT ====================
 
+    @staticmethod
+    def _new_user_values(user: User) -> Dict[str, Any]:
+        """Column values to insert an unsaved user with; unset columns keep their defaults"""
+        values = ((attr.key, getattr(user, attr.key)) for attr in User.__mapper__.column_attrs)
+        return {key: value for key, value in values if key != "id" and value is not None}
+
+    def _queue_lead_writes(self, user: User, changes: Dict[str, Any],
+                           activity_rows: List[Dict[str, Any]]) -> None:
+        """Buffer changed user columns and activity rows for the writer thread
+
+        A user without an id is buffered by PSID and inserted by the flush. The
+        writer commits the buffer once _WRITE_FLUSH_ROWS rows are pending or the
+        oldest has waited _WRITE_FLUSH_SECONDS; the caller never commits.
+        """
+        new_user_values = self._new_user_values(user) if user.id is None else None
+        with self._write_ready:
+            if new_user_values is not None:
+                values, rows = self._pending_new_users.setdefault(str(user.psid), ({}, []))
+                values.update(new_user_values)
+                rows.extend(activity_rows)
+            else:
+                if changes:
+                    self._pending_user_writes.setdefault(user.id, {}).update(changes)
+                self._pending_activity_rows.extend(activity_rows)
+            if self._pending_since is None:
+                self._pending_since = time.monotonic()
+            if self._writer is None and not self._writer_stopped:
+                self._writer = threading.Thread(target=self._run_writer,
+                                                name="lead-writer", daemon=True)
+                self._writer.start()
+            self._write_ready.notify()
+
+    def _pending_write_rows(self) -> int:
+        """Rows buffered for the next flush; call with _write_lock held"""
+        return (len(self._pending_user_writes) + len(self._pending_activity_rows)
+                + len(self._pending_new_users))
+
+    def _run_writer(self) -> None:
+        """Writer thread: commit the buffer at every flush boundary until shutdown
+
+        Commits go through get_writer_db_session(), a connection of its own:
+        the request sessions share one StaticPool connection, and committing
+        on it here would also commit whatever a request had flushed.
+        """
+        while True:
+            with self._write_ready:
+                while not self._writer_stopped:
+                    if self._pending_since is None:
+                        self._write_ready.wait()
+                        continue
+                    now = time.monotonic()
+                    remaining = self._pending_since + _WRITE_FLUSH_SECONDS - now
+                    if self._pending_write_rows() >= _WRITE_FLUSH_ROWS:
+                        remaining = 0.0
+                    remaining = max(remaining, self._write_retry_at - now)
+                    if remaining <= 0:
+                        break
+                    self._write_ready.wait(remaining)
+                if self._writer_stopped:
+                    return
+            self.flush_lead_writes()
+
+    def _queue_direct_update(self, user: User, changes: Dict[str, Any]) -> None:
+        """Buffer the columns of a direct lead update alongside the caller's own commit
+
+        Buffered writes carry absolute values; merging the update into them
+        keeps a pending automation flush from later restoring older values.
+        """
+        if user.id is not None:
+            self._queue_lead_writes(user, changes, [])
+
+    def flush_lead_writes(self) -> int:
+        """Commit buffered lead writes in one transaction now; returns users written
+
+        Normally called by the writer thread; safe from any thread, since the
+        commit uses the writer connection rather than a request's.
+        """
+        with self._flush_lock:
+            with self._write_lock:
+                user_rows = [
+                    {"id": user_id, **values}
+                    for user_id, values in self._pending_user_writes.items()
+                ]
+                activity_rows = self._pending_activity_rows
+                new_users = self._pending_new_users
+                self._pending_user_writes, self._pending_activity_rows = {}, []
+                self._pending_new_users = {}
+                self._pending_since = None
+
+            if not user_rows and not activity_rows and not new_users:
+                return 0
+
+            try:
+                self._commit_lead_writes(user_rows, activity_rows, new_users)
+            except Exception as e:
+                logger.error(f"Error flushing lead automation writes: {e}")
+                self._requeue_lead_writes(user_rows, activity_rows, new_users)
+                return 0
+
+            with self._write_lock:
+                self._write_failures, self._write_retry_at = 0, 0.0
+
+        _invalidate_analytics()
+        return len(user_rows) + len(new_users)
+
+    def _requeue_lead_writes(self, user_rows: List[Dict[str, Any]],
+                             activity_rows: List[Dict[str, Any]], new_users: NewUserWrites) -> None:
+        """Put a batch that failed to commit back in front of the buffer
+
+        The writer retries it with exponential backoff. Values buffered for
+        the same user since the batch was taken are newer and win over the
+        requeued ones.
+        """
+        with self._write_lock:
+            delay = min(_WRITE_RETRY_SECONDS * 2 ** self._write_failures, _MAX_WRITE_RETRY_SECONDS)
+            self._write_failures += 1
+            self._write_retry_at = time.monotonic() + delay
+
+            user_writes = {row["id"]: {key: value for key, value in row.items() if key != "id"}
+                           for row in user_rows}
+            for user_id, values in self._pending_user_writes.items():
+                user_writes[user_id] = user_writes.get(user_id, {}) | values
+            pending_new_users = dict(new_users)
+            for psid, (values, rows) in self._pending_new_users.items():
+                older_values, older_rows = pending_new_users.get(psid, ({}, []))
+                pending_new_users[psid] = (older_values | values, older_rows + rows)
+            self._pending_user_writes = user_writes
+            self._pending_new_users = pending_new_users
+            self._pending_activity_rows = activity_rows + self._pending_activity_rows
+
+            dropped = self._trim_pending_writes()
+            if self._pending_since is None:
+                self._pending_since = time.monotonic()
+
+        if dropped:
+            logger.error(f"Lead write buffer full; dropped {dropped} oldest pending writes")
+
+    def _trim_pending_writes(self) -> int:
+        """Drop buffered writes beyond _MAX_PENDING_WRITES, oldest first; returns the count"""
+        dropped = 0
+        for pending in (self._pending_user_writes, self._pending_new_users):
+            for key in list(pending)[:max(0, len(pending) - _MAX_PENDING_WRITES)]:
+                del pending[key]
+                dropped += 1
+        excess = len(self._pending_activity_rows) - _MAX_PENDING_WRITES
+        if excess > 0:
+            del self._pending_activity_rows[:excess]
+            dropped += excess
+        return dropped
+
+    @staticmethod
+    def _commit_lead_writes(user_rows: List[Dict[str, Any]], activity_rows: List[Dict[str, Any]],
+                            new_users: NewUserWrites) -> None:
+        """Write one batch of user column updates and activity rows in a single transaction
+
+        Users in ``new_users`` are inserted unless their PSID already exists, in
+        which case their values are applied as an update.
+        """
+        with get_writer_db_session() as db:
+            if new_users:
+                user_rows, activity_rows = list(user_rows), list(activity_rows)
+                user_ids = dict(
+                    db.query(User.psid, User.id).filter(User.psid.in_(list(new_users))).all()
+                )
+                for psid, (values, rows) in new_users.items():
+                    if psid in user_ids:
+                        user_rows.append({"id": user_ids[psid], **values})
+                    else:
+                        inserted = db.execute(insert(User).values(values).returning(User.id))
+                        user_ids[psid] = inserted.scalar_one()
+                    activity_rows.extend({**row, "user_id": user_ids[psid]} for row in rows)
+            if user_rows:
+                db.execute(update(User), user_rows)
+            if activity_rows:
+                db.execute(insert(LeadActivity), activity_rows)
+            db.commit()
+
     def process_lead_automation(self, user: User, message_text: str) -> Dict[str, Any]:
         """Process comprehensive lead automation including classification and Facebook sync"""
         try:
@@ -777,67 +1581,73 @@ class FacebookLeadCenterService:
                 "activities_logged": []
             }
 
-            # Classify customer type
-            new_customer_type = self.classify_customer_type(message_text, user)
+            # One timestamp for the whole pass
+            now = datetime.now(timezone.utc)
+            # Changed user columns, and (activity_type, old_value, new_value, reason)
+            # entries, written together once the pass is done
+            changes: Dict[str, Any] = {}
+            activities: List[Tuple[str, str, str, str]] = []
+
+            # Classify customer type and label from a single lowercased copy
+            new_customer_type, new_customer_label = self._classify(message_text.lower(), user, now)
             if new_customer_type and new_customer_type != user.customer_type:
                 old_type = user.customer_type.value if user.customer_type else "None"
-                user.customer_type = new_customer_type
+                user.customer_type = changes["customer_type"] = new_customer_type
                 automation_results["customer_type_updated"] = True
-                self.log_lead_activity(
-                    user, "customer_type_change", old_type,
+                activities.append((
+                    "customer_type_change", old_type,
                     new_customer_type.value, "Automated classification from message"
-                )
+                ))
                 automation_results["activities_logged"].append("customer_type_change")
 
-            # Classify customer label
-            new_customer_label = self.classify_customer_label(message_text, user)
             if new_customer_label and new_customer_label != user.customer_label:
                 old_label = user.customer_label.value if user.customer_label else "None"
-                user.customer_label = new_customer_label
+                user.customer_label = changes["customer_label"] = new_customer_label
                 automation_results["customer_label_updated"] = True
-                self.log_lead_activity(
-                    user, "customer_label_change", old_label,
+                activities.append((
+                    "customer_label_change", old_label,
                     new_customer_label.value, "Automated classification from message"
-                )
+                ))
                 automation_results["activities_logged"].append("customer_label_change")
 
             # Calculate and update lead score
-            new_lead_score = self.calculate_lead_score(user)
+            new_lead_score = self.calculate_lead_score(user, now)
             if new_lead_score != user.lead_score:
                 old_score = str(user.lead_score) if user.lead_score else "0"
-                user.lead_score = new_lead_score
+                user.lead_score = changes["lead_score"] = new_lead_score
                 automation_results["lead_score_updated"] = True
-                self.log_lead_activity(
-                    user, "lead_score_change", old_score,
+                activities.append((
+                    "lead_score_change", old_score,
                     str(new_lead_score), "Automated score calculation"
-                )
+                ))
                 automation_results["activities_logged"].append("lead_score_change")
 
             # Check for stage advancement
             should_advance, next_stage = self.should_advance_stage(user)
             if should_advance:
                 old_stage = user.lead_stage.value if user.lead_stage else "None"
-                user.lead_stage = next_stage
-                user.last_stage_change = datetime.now(timezone.utc)
+                user.lead_stage = changes["lead_stage"] = next_stage
+                user.last_stage_change = changes["last_stage_change"] = now
                 automation_results["stage_advancement"] = True
-                self.log_lead_activity(
-                    user, "stage_advancement", old_stage,
+                activities.append((
+                    "stage_advancement", old_stage,
                     next_stage.value, f"Automated advancement based on score {new_lead_score}"
-                )
+                ))
                 automation_results["activities_logged"].append("stage_advancement")
 
             # Sync to Facebook Lead Center
             if automation_results["customer_type_updated"] or automation_results["customer_label_updated"] or automation_results["lead_score_updated"]:
-                facebook_sync_success = self.sync_lead_to_facebook(user)
-                automation_results["facebook_sync"] = facebook_sync_success
-                if facebook_sync_success:
-                    automation_results["activities_logged"].append("facebook_sync")
-
-            # Commit changes to database
-            with get_db_session() as db:
-                db.add(user)
-                db.commit()
-                logger.info(f"Lead automation completed for user {user.psid}: {automation_results}")
+                # Only queued here; the debounced flush performs the actual sync
+                self.queue_lead_sync(user)
+                automation_results["facebook_sync"] = "queued"
+
+            # Persist the changes through the batched write buffer, which also
+            # inserts a user that has no id yet
+            if changes or activities or user.id is None:
+                self._queue_lead_writes(user, changes, [
+                    self._lead_activity_row(user, *activity, now=now) for activity in activities
+                ])
+            logger.info(f"Lead automation completed for user {user.psid}: {automation_results}")
 
             return automation_results
 
@@ -845,41 +1655,44 @@ class FacebookLeadCenterService:
             logger.error(f"Error in lead automation: {e}")
             return {"error": str(e)}
 
+    @staticmethod
+    def _count_users_by(db: Session, column: Any, enum_cls: Type[Enum]) -> Dict[str, int]:
+        """Count users per enum value of ``column``; every member is present, unused ones as 0"""
+        grouped = ((_coerce_enum(enum_cls, value), count)
+                   for value, count in db.query(column, func.count()).group_by(column))
+        return ({member.value: 0 for member in enum_cls}
+                | {member.value: count for member, count in grouped if member is not None})
+
     def get_lead_analytics(self) -> Dict[str, Any]:
-        """Get comprehensive lead analytics"""
+        """Get comprehensive lead analytics (cached for _ANALYTICS_CACHE_TTL seconds)
+
+        Every call returns its own copy, so callers may modify the result.
+        """
+        global _analytics_cache
+        cached = _analytics_cache
+        if cached is not None and time.monotonic() - cached[0] < _ANALYTICS_CACHE_TTL:
+            return copy.deepcopy(cached[1])
+
         try:
             with get_db_session() as db:
-                # Get total counts
-                total_users = db.query(User).count()
-                total_messages = db.query(Message).count()
-
-                # Get stage distribution
-                stage_counts = {}
-                for stage in LeadStage:
-                    count = db.query(User).filter(User.lead_stage == stage).count()
-                    stage_counts[stage.value] = count
-
-                # Get customer type distribution
-                type_counts = {}
-                for customer_type in CustomerType:
-                    count = db.query(User).filter(User.customer_type == customer_type).count()
-                    type_counts[customer_type.value] = count
-
-                # Get customer label distribution
-                label_counts = {}
-                for label in CustomerLabel:
-                    count = db.query(User).filter(User.customer_label == label).count()
-                    label_counts[label.value] = count
-
-                # Get average lead score
-                avg_score = db.query(User).filter(User.lead_score.isnot(None)).with_entities(
-                    func.avg(User.lead_score)
-                ).scalar() or 0
-
-                # Get recent activity
-                recent_activities = db.query(LeadActivity).order_by(
-                    LeadActivity.timestamp.desc()
-                ).limit(10).all()
+                # Get total counts and average lead score (AVG skips NULL scores)
+                total_users, avg_score = db.query(
+                    func.count(User.id), func.avg(User.lead_score)
+                ).one()
+                avg_score = avg_score or 0
+                total_messages = db.query(func.count(Message.id)).scalar() or 0
+
+                # Get stage, customer type and label distributions, one GROUP BY each
+                stage_counts = self._count_users_by(db, User.lead_stage, LeadStage)
+                type_counts = self._count_users_by(db, User.customer_type, CustomerType)
+                label_counts = self._count_users_by(db, User.customer_label, CustomerLabel)
+
+                # Get recent activity as plain rows of the reported columns
+                recent_activities = db.query(
+                    LeadActivity.user_id, LeadActivity.activity_type, LeadActivity.old_value,
+                    LeadActivity.new_value, LeadActivity.reason, LeadActivity.timestamp,
+                    LeadActivity.automated
+                ).order_by(LeadActivity.timestamp.desc()).limit(10).all()
 
                 analytics: Dict[str, Any] = {
                     "total_users": total_users,
@@ -904,7 +1717,8 @@ class FacebookLeadCenterService:
                     ]
                 }
 
-                return analytics
+                _analytics_cache = (time.monotonic(), analytics)
+                return copy.deepcopy(analytics)
 
         except Exception as e:
             logger.error(f"Error getting lead analytics: {e}")
@@ -920,229 +1734,103 @@ class FacebookLeadCenterService:
                 "recent_activities": []
             }
 
-    # ==================== ASYNC WRAPPER METHODS (for backward compatibility) ====================
-
-    async def process_lead_automation_async(self, user: User, message_text: str) -> Dict[str, Any]:
-        """Async wrapper for process_lead_automation"""
-        try:
-            return self.process_lead_automation(user, message_text)
-        except Exception as e:
-            logger.error(f"Error in async lead automation: {e}")
-            return {"error": str(e)}
-
-    async def classify_customer_async(self, user: User, message_text: str) -> Dict[str, Any]:
-        """Async wrapper for customer classification"""
-        try:
-            customer_type = self.classify_customer_type(message_text, user)
-            customer_label = self.classify_customer_label(message_text, user)
-
-            return {
-                "customer_type": customer_type.value if customer_type else None,
-                "customer_label": customer_label.value if customer_label else None
-            }
-        except Exception as e:
-            logger.error(f"Error classifying customer: {e}")
-            return {"error": str(e)}
-
-    async def calculate_lead_score_async(self, user: User) -> int:
-        """Async wrapper for calculate_lead_score"""
-        try:
-            return self.calculate_lead_score(user)
-        except Exception as e:
-            logger.error(f"Error calculating lead score: {e}")
-            return 0
-
-    async def determine_next_stage_async(self, user: User) -> LeadStage:
-        """Async wrapper for determine_next_stage"""
-        try:
-            return self.determine_next_stage(user)
-        except Exception as e:
-            logger.error(f"Error determining next stage: {e}")
-            return LeadStage.INTAKE
-
-    async def should_advance_stage_async(self, user: User) -> Tuple[bool, LeadStage]:
-        """Async wrapper for should_advance_stage"""
-        try:
-            return self.should_advance_stage(user)
-        except Exception as e:
-            logger.error(f"Error checking stage advancement: {e}")
-            return False, user.lead_stage
+    # ==================== ASYNC WRAPPER METHODS ====================
+    # Entry points for async routes: the work blocks on the database and the
+    # Graph API (including retry backoff), so it runs in a worker thread
 
+    @_log_errors("Error syncing leads to Facebook", default_factory=_error_result)
     async def sync_all_leads_to_facebook_async(self) -> Dict[str, Any]:
         """Async wrapper for sync_all_leads_to_facebook"""
-        try:
-            logger.info("Starting sync of all leads to Facebook Lead Center")
-            results = self.sync_all_leads_to_facebook()
-            logger.info(f"Lead sync completed: {results}")
-            return results
-        except Exception as e:
-            logger.error(f"Error syncing leads to Facebook: {e}")
-            return {"error": str(e)}
-
-    async def create_lead_in_facebook_async(self, user: User) -> bool:
-        """Async wrapper for create_lead_in_facebook"""
-        try:
-            logger.info(f"Creating lead {user.psid} in Facebook Lead Center")
-            success = self.create_lead_in_facebook(user)
-            if success:
-                logger.info(f"Successfully created lead {user.psid} in Facebook Lead Center")
-            else:
-                logger.warning(f"Failed to create lead {user.psid} in Facebook Lead Center")
-            return success
-        except Exception as e:
-            logger.error(f"Error creating lead in Facebook Lead Center: {e}")
-            return False
-
-    async def sync_lead_to_facebook_async(self, user: User) -> bool:
-        """Async wrapper for sync_lead_to_facebook"""
-        try:
-            logger.info(f"Syncing lead {user.psid} to Facebook Lead Center")
-            success = self.sync_lead_to_facebook(user)
-            if success:
-                logger.info(f"Successfully synced lead {user.psid} to Facebook Lead Center")
-            else:
-                logger.warning(f"Failed to sync lead {user.psid} to Facebook Lead Center")
-            return success
-        except Exception as e:
-            logger.error(f"Error syncing lead to Facebook Lead Center: {e}")
-            return False
-
-    async def get_leadgen_forms_async(self) -> Optional[List[Dict[str, Any]]]:
-        """Async wrapper for get_leadgen_forms"""
-        try:
-            forms = self.get_leadgen_forms()
-            logger.info(f"Retrieved {len(forms) if forms else 0} leadgen forms")
-            return forms
-        except Exception as e:
-            logger.error(f"Error getting leadgen forms: {e}")
-            return None
-
-    async def get_leads_from_form_async(self, form_id: str) -> Optional[List[Dict[str, Any]]]:
-        """Async wrapper for get_leads_from_form"""
-        try:
-            leads = self.get_leads_from_form(form_id)
-            logger.info(f"Retrieved {len(leads) if leads else 0} leads from form {form_id}")
-            return leads
-        except Exception as e:
-            logger.error(f"Error getting leads from form: {e}")
-            return None
+        logger.info("Starting sync of all leads to Facebook Lead Center")
+        results = await asyncio.to_thread(self.sync_all_leads_to_facebook)
+        logger.info(f"Lead sync completed: {results}")
+        return results
 
+    @_log_errors("Error processing leadgen webhook", default_factory=_error_result)
     async def process_leadgen_webhook_async(self, webhook_data: Dict[str, Any]) -> Dict[str, Any]:
         """Async wrapper for process_leadgen_webhook"""
-        try:
-            logger.info("Processing leadgen webhook from Facebook")
-            results = self.process_leadgen_webhook(webhook_data)
-            logger.info(f"Leadgen webhook processed: {results}")
-            return results
-        except Exception as e:
-            logger.error(f"Error processing leadgen webhook: {e}")
-            return {"error": str(e)}
+        logger.info("Processing leadgen webhook from Facebook")
+        results = await asyncio.to_thread(self.process_leadgen_webhook, webhook_data)
+        logger.info(f"Leadgen webhook processed: {results}")
+        return results
+
+    def shutdown(self) -> None:
+        """Stop the writer, flush queued lead writes and syncs, then close Graph API connections"""
+        with self._write_ready:
+            self._writer_stopped = True
+            self._write_ready.notify()
+        if self._writer is not None:
+            self._writer.join(timeout=_WRITER_JOIN_SECONDS)
+        self.flush_lead_writes()
+        self.flush_lead_syncs(retry_failed=False)
+        self._http.close()
 
-    async def get_lead_analytics_async(self) -> Dict[str, Any]:
-        """Async wrapper for get_lead_analytics"""
-        try:
-            return self.get_lead_analytics()
-        except Exception as e:
-            logger.error(f"Error getting lead analytics: {e}")
-            return {}
+    # ==================== HEALTH CHECK ====================
 
-    async def get_facebook_lead_center_status_async(self) -> Dict[str, Any]:
-        """Async wrapper for Facebook Lead Center status"""
+    def _check_facebook_lead_center(self, checked_at: str) -> Dict[str, Any]:
+        """Health of the Facebook Lead Center connection, stamped with ``checked_at``"""
         try:
-            forms = await self.get_leadgen_forms_async()
+            forms = self.get_leadgen_forms()
             return {
-                "connected": forms is not None,
+                "status": "healthy" if forms is not None else "inactive",
                 "forms_count": len(forms) if forms else 0,
-                "last_check": datetime.now(timezone.utc).isoformat(),
-                "status": "active" if forms else "inactive"
+                "last_check": checked_at,
+                "strategy": "نعتمد على Facebook Lead Center الموجود"
             }
         except Exception as e:
-            logger.error(f"Error checking Facebook Lead Center status: {e}")
             return {
-                "connected": False,
-                "forms_count": 0,
-                "last_check": datetime.now(timezone.utc).isoformat(),
                 "status": "error",
-                "error": str(e)
+                "error": str(e),
+                "strategy": "نعتمد على Facebook Lead Center الموجود"
             }
 
-    async def update_lead_stage_async(self, user: User, new_stage: LeadStage, reason: str = "Manual update") -> bool:
-        """Async wrapper for update_lead_stage"""
-        try:
-            return self.update_lead_stage(user, new_stage, reason)
-        except Exception as e:
-            logger.error(f"Error updating lead stage: {e}")
-            return False
-
-    async def update_customer_type_async(self, user: User, new_type: CustomerType, reason: str = "Manual update") -> bool:
-        """Async wrapper for update_customer_type"""
-        try:
-            return self.update_customer_type(user, new_type, reason)
-        except Exception as e:
-            logger.error(f"Error updating customer type: {e}")
-            return False
+    @staticmethod
+    def _check_database() -> Dict[str, Any]:
+        """Health of the database connection
 
-    async def update_customer_label_async(self, user: User, new_label: CustomerLabel, reason: str = "Manual update") -> bool:
-        """Async wrapper for update_customer_label"""
+        Runs on the calling thread. sqlite3 has no statement timeout, so a
+        progress handler interrupts the query once _HEALTH_QUERY_TIMEOUT passes.
+        """
         try:
-            return self.update_customer_label(user, new_label, reason)
-        except Exception as e:
-            logger.error(f"Error updating customer label: {e}")
-            return False
-
-    async def health_check_async(self) -> Dict[str, Any]:
-        """Async wrapper for health_check"""
-        try:
-            return self.health_check()
+            with get_db_session() as db:
+                dbapi_connection = db.connection().connection.dbapi_connection
+                set_progress_handler = getattr(dbapi_connection, "set_progress_handler", None)
+                if set_progress_handler is not None:
+                    deadline = time.monotonic() + _HEALTH_QUERY_TIMEOUT
+                    set_progress_handler(lambda: time.monotonic() > deadline,
+                                         _HEALTH_QUERY_CHECK_INTERVAL)
+                try:
+                    user_count = db.query(func.count(User.id)).scalar() or 0
+                finally:
+                    if set_progress_handler is not None:
+                        set_progress_handler(None, 0)
+                return {
+                    "status": "healthy",
+                    "user_count": user_count
+                }
         except Exception as e:
-            logger.error(f"Error in async health check: {e}")
             return {
-                "timestamp": datetime.now(timezone.utc).isoformat(),
-                "overall_status": "error",
+                "status": "error",
                 "error": str(e)
             }
 
-    # ==================== HEALTH CHECK ====================
-
     def health_check(self) -> Dict[str, Any]:
         """Comprehensive health check for Facebook Lead Center system - نعتمد على Facebook Lead Center الموجود"""
+        now_iso = datetime.now(timezone.utc).isoformat()
         try:
             health_status: Dict[str, Any] = {
-                "timestamp": datetime.now(timezone.utc).isoformat(),
+                "timestamp": now_iso,
                 "services": {},
                 "overall_status": "healthy",
                 "strategy": "نعتمد على Facebook Lead Center الموجود"
             }
 
-            # Check Facebook Lead Center service
-            try:
-                forms = self.get_leadgen_forms()
-                health_status["services"]["facebook_lead_center"] = {
-                    "status": "healthy" if forms is not None else "inactive",
-                    "forms_count": len(forms) if forms else 0,
-                    "last_check": datetime.now(timezone.utc).isoformat(),
-                    "strategy": "نعتمد على Facebook Lead Center الموجود"
-                }
-            except Exception as e:
-                health_status["services"]["facebook_lead_center"] = {
-                    "status": "error",
-                    "error": str(e),
-                    "strategy": "نعتمد على Facebook Lead Center الموجود"
-                }
-
-            # Check database connection
-            try:
-                with get_db_session() as db:
-                    user_count = db.query(User).count()
-                    health_status["services"]["database"] = {
-                        "status": "healthy",
-                        "user_count": user_count
-                    }
-            except Exception as e:
-                health_status["services"]["database"] = {
-                    "status": "error",
-                    "error": str(e)
-                }
+            # Check the Graph API, then the database on this thread: a probe on
+            # another thread would share the request's StaticPool connection
+            health_status["services"]["facebook_lead_center"] = (
+                self._check_facebook_lead_center(now_iso)
+            )
+            health_status["services"]["database"] = self._check_database()
 
             # Check messenger service
             try:
@@ -1169,7 +1857,7 @@ class FacebookLeadCenterService:
         except Exception as e:
             logger.error(f"Error in health check: {e}")
             return {
-                "timestamp": datetime.now(timezone.utc).isoformat(),
+                "timestamp": now_iso,
                 "overall_status": "error",
                 "error": str(e),
                 "strategy": "نعتمد على Facebook Lead Center الموجود"
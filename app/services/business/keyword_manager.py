@@ -3,21 +3,110 @@ Keyword Manager for BWW Assistant Chatbot
 Centralized keyword management and NLP processing
 """
 
+import functools
 import logging
+import sys
 import unicodedata
-from typing import Dict, List, Optional, Tuple, Any
-from difflib import SequenceMatcher
+from types import MappingProxyType
+from typing import Dict, Iterable, List, Mapping, Optional, Tuple, Any
+
+try:
+    from rapidfuzz.distance import Indel, Levenshtein
+    rapidfuzz_available = True
+except ImportError:
+    Indel = None
+    Levenshtein = None
+    rapidfuzz_available = False
+
+try:
+    import ahocorasick
+    ahocorasick_available = True
+except ImportError:
+    ahocorasick = None
+    ahocorasick_available = False
 
 logger = logging.getLogger(__name__)
 
+# Bound for the normalization and category-detection caches
+_CACHE_SIZE = 4096
+
+# Returned for categories that have no keywords
+_NO_KEYWORDS: Mapping[str, Tuple[str, ...]] = MappingProxyType({})
+
+# Fuzzy score a keyword variation needs for detect_category to pick its category
+_DETECT_THRESHOLD = 0.7
+
+# Arabic letter variants folded to one spelling
+_ARABIC_REPLACEMENTS: Dict[str, str] = {
+    'أ': 'ا', 'إ': 'ا', 'آ': 'ا', 'ة': 'ه',
+    'ى': 'ي', 'ؤ': 'و', 'ئ': 'ي'
+}
+
+
+def _bitparallel_lcs(text: str, pattern: str) -> int:
+    """Length of the longest common subsequence via bit vectors, one pass over ``text``
+
+    The DP column over ``pattern`` is packed into an int whose zero bits mark
+    where the LCS grew, so the cost is O(len(text)) big-int operations.
+    """
+    # Bit i of peq[c] is set where pattern[i] == c
+    peq: Dict[str, int] = {}
+    bit = 1
+    for char in pattern:
+        peq[char] = peq.get(char, 0) | bit
+        bit <<= 1
+    mask = bit - 1
+
+    row = mask
+    for char in text:
+        matches = row & peq.get(char, 0)
+        row = ((row + matches) | (row - matches)) & mask
+    return len(pattern) - row.bit_count()
+
+
+@functools.lru_cache(maxsize=_CACHE_SIZE)
+def _normalize_arabic_text(text: str) -> str:
+    """Remove diacritics and standardize Arabic characters (pure, so results are cached)"""
+    # ASCII is unchanged by decomposition and has no diacritics or Arabic letters
+    if text.isascii():
+        return text.lower().strip()
+
+    # Remove diacritics; normalize() returns already-decomposed text as is, and
+    # text without marks (e.g. typed without hamza or tashkeel) is not rebuilt
+    text = unicodedata.normalize('NFKD', text)
+    if any(map(unicodedata.combining, text)):
+        text = ''.join([c for c in text if not unicodedata.combining(c)])
+
+    # Standardize Arabic characters
+    for old, new in _ARABIC_REPLACEMENTS.items():
+        text = text.replace(old, new)
+
+    return text.lower().strip()
+
 
 class KeywordManager:
     """Centralized keyword management"""
 
     def __init__(self) -> None:
-        self.keywords: Dict[str, Dict[str, List[str]]] = {}
+        # Read-only views all the way down (variations are tuples): changes go
+        # through add_keywords so the indexes below stay in step
+        self._keywords: Dict[str, Dict[str, Tuple[str, ...]]] = {}
+        self._keyword_views: Dict[str, Mapping[str, Tuple[str, ...]]] = {}
+        self.keywords: Mapping[str, Mapping[str, Tuple[str, ...]]] = MappingProxyType(
+            self._keyword_views
+        )
+        # category -> keyword -> [(variation, normalized variation)], kept in step with keywords
+        self._normalized_keywords: Dict[str, Dict[str, List[Tuple[str, str]]]] = {}
+        # normalized variation -> (category, keyword), first registration wins
+        self._exact_index: Dict[str, Tuple[str, str]] = {}
+        # Substring search over all normalized variations, when pyahocorasick is installed
+        self._automaton: Optional[Any] = None
         self._initialized = False
         self.logger = logging.getLogger(__name__)
+        # Categories of recently seen normalized texts; cleared whenever keywords change
+        self._detect_normalized = functools.lru_cache(maxsize=_CACHE_SIZE)(
+            self._detect_category_normalized
+        )
 
     def initialize(self) -> bool:
         """Initialize keyword manager"""
@@ -39,7 +128,7 @@ class KeywordManager:
     def _load_keyword_categories(self) -> None:
         """Load all keyword categories"""
         # Basic greeting keywords
-        self.keywords["greeting"] = {
+        self._keywords["greeting"] = {
             "مرحبا": ["مرحبا", "مرحباً", "مرحبا بك", "مرحبا بيك", "أهلا وسهلا", "أهلاً وسهلاً", "مرحبا يا"],
             "هلا": ["هلا", "هلا بك", "هلا بيك", "هلا وسهلا", "هلاً وسهلاً", "هلا يا", "هلا ومرحبا"],
             "السلام": ["السلام", "السلام عليكم", "سلام", "سلام عليكم", "السلام عليك", "وعليكم السلام", "سلام ورحمة"],
@@ -49,14 +138,14 @@ class KeywordManager:
         }
 
         # Help keywords
-        self.keywords["help"] = {
+        self._keywords["help"] = {
             "مساعدة": ["مساعدة", "المساعدة", "ساعدني", "ساعدوني", "أحتاج مساعدة", "أريد مساعدة", "مساعدة من فضلك"],
             "ساعد": ["ساعد", "ساعدني", "ساعدوني", "ساعدني من فضلك", "ساعدني لو سمحت", "ساعدني يا", "ساعدني في"],
             "help": ["help", "support", "assistance", "aid", "guidance", "help me", "can you help"]
         }
 
         # Product keywords
-        self.keywords["products"] = {
+        self._keywords["products"] = {
             "فستان": ["فستان", "فستان طويل", "فستان قصير", "فستان سهرة", "فستان عمل", "فستان صيفي", "فستان شتوي"],
             "قميص": ["قميص", "قميص نسائي", "قميص قطني", "قميص حرير", "قميص عمل", "قميص رسمي", "قميص كاجوال"],
             "بلوزة": ["بلوزة", "بلوزة نسائية", "بلوزة قطنية", "بلوزة حريرية", "بلوزة عمل", "بلوزة رسمية", "بلوزة كاجوال"],
@@ -68,7 +157,7 @@ class KeywordManager:
         }
 
         # Price keywords
-        self.keywords["price"] = {
+        self._keywords["price"] = {
             "سعر": ["سعر", "السعر", "بكام", "كم يكلف", "تكلفة", "ثمن", "قيمة", "فلوس", "سعره", "السعر كام"],
             "كم": ["كم", "كام", "إيه السعر", "إزاي السعر", "السعر إيه", "بكام ده", "كم السعر", "السعر كام", "إيه الثمن"],
             "بكام": ["بكام", "بكام", "كم السعر", "السعر كام", "بكام ده", "كم تكلف", "السعر إيه", "إيه السعر", "كم يكلف"],
@@ -79,7 +168,7 @@ class KeywordManager:
         }
 
         # Size keywords
-        self.keywords["size"] = {
+        self._keywords["size"] = {
             "مقاس": ["مقاس", "المقاس", "مقاسات", "المقاسات", "إيه المقاس", "مقاس إيه", "مقاس كام", "المقاس إيه", "إيه المقاسات"],
             "حجم": ["حجم", "الحجم", "أحجام", "الأحجام", "إيه الحجم", "حجم إيه", "حجم كام", "الحجم إيه", "إيه الأحجام"],
             "صغير": ["صغير", "صغيرة", "مقاس صغير", "حجم صغير", "صغير أوي", "مش كبير", "صغير جداً", "مقاس صغير", "حجم صغير"],
@@ -93,7 +182,7 @@ class KeywordManager:
         }
 
         # Location keywords
-        self.keywords["location"] = {
+        self._keywords["location"] = {
             "موقع": ["موقع", "الموقع", "مكان", "المكان", "أين موقعكم", "أين متجركم", "عنوان المتجر"],
             "أين": ["أين", "أين أنتم", "أين متجركم", "أين موقعكم", "أين العنوان", "أين المكان", "أين الفرع"],
             "عنوان": ["عنوان", "العنوان", "عنوان المتجر", "عنوان الفرع", "العنوان كام", "العنوان إيه", "عنوانكم إيه"],
@@ -102,7 +191,7 @@ class KeywordManager:
         }
 
         # Thank you keywords
-        self.keywords["thank"] = {
+        self._keywords["thank"] = {
             "شكرا": ["شكرا", "شكراً", "شكرا لك", "شكراً لك", "شكرا ليك", "شكراً ليك", "شكرا جزيلا"],
             "شكراً": ["شكراً", "شكراً لك", "شكراً ليك", "شكراً جزيلاً", "شكراً كثيراً", "شكراً أوي", "شكراً جداً"],
             "متشكر": ["متشكر", "متشكر أوي", "متشكر جداً", "متشكر ليك", "متشكر لك", "متشكر أوي أوي", "متشكر من القلب"],
@@ -110,38 +199,107 @@ class KeywordManager:
         }
 
         # Goodbye keywords
-        self.keywords["goodbye"] = {
+        self._keywords["goodbye"] = {
             "وداع": ["وداع", "وداعاً", "وداع يا", "وداع بيك", "وداع لك", "وداعاً يا", "وداعاً بيك"],
             "مع السلامة": ["مع السلامة", "مع السلامة يا", "مع السلامة بيك", "مع السلامة لك", "مع السلامة يا", "مع السلامة بيك", "مع السلامة"],
             "باي": ["باي", "باي باي", "باي يا", "باي بيك", "باي لك", "باي باي يا", "باي باي بيك"],
             "bye": ["bye", "goodbye", "see you", "farewell", "take care", "see you later", "good night"]
         }
 
+        # Normalize every variation once so matching only normalizes the input text
+        for category, keywords_dict in list(self._keywords.items()):
+            self._store_keywords(category, keywords_dict)
+        self._build_automaton()
+
+    def _store_keywords(self, category: str, keywords: Mapping[str, Iterable[str]]) -> None:
+        """Copy ``keywords`` into ``category`` as tuples and index their normalized forms"""
+        stored = self._keywords.setdefault(category, {})
+        if category not in self._keyword_views:
+            self._keyword_views[category] = MappingProxyType(stored)
+        copies = {
+            keyword: tuple(map(sys.intern, variations))
+            for keyword, variations in keywords.items()
+        }
+        stored.update(copies)
+        self._index_keywords(category, copies)
+
+    def _index_keywords(self, category: str, keywords: Mapping[str, Tuple[str, ...]]) -> None:
+        """Add normalized variations of ``keywords`` to the fuzzy table and exact-match index"""
+        normalized = self._normalized_keywords.setdefault(category, {})
+        for keyword, variations in keywords.items():
+            normalized[keyword] = self._normalize_variations(variations)
+            for _, normalized_variation in normalized[keyword]:
+                self._exact_index.setdefault(normalized_variation, (category, keyword))
+
+    def _build_automaton(self) -> None:
+        """Compile every normalized variation into one Aho-Corasick automaton
+
+        Each variation maps to (category rank, length) for the first category
+        listing it. Without pyahocorasick detection simply skips the bound.
+        """
+        self._automaton = None
+        if not ahocorasick_available:
+            return
+
+        automaton = ahocorasick.Automaton()
+        for rank, keywords_dict in enumerate(self._normalized_keywords.values()):
+            for variations in keywords_dict.values():
+                for _, normalized_variation in variations:
+                    if normalized_variation and normalized_variation not in automaton:
+                        automaton.add_word(normalized_variation, (rank, len(normalized_variation)))
+        if len(automaton):
+            automaton.make_automaton()
+            self._automaton = automaton
+
+    def _matched_category_rank(self, normalized_text: str) -> Optional[int]:
+        """Rank of the first category certain to fuzzy-match the text, found in one scan
+
+        A variation occurring in the text as a substring shares at least its
+        own length with it, so its Indel ratio is at least 2L / (n + L). When
+        that bound reaches the detection threshold, the fuzzy scan would match
+        that variation's category; earlier categories still need scoring.
+        """
+        if self._automaton is None:
+            return None
+        text_length = len(normalized_text)
+        best = None
+        for _, (rank, length) in self._automaton.iter(normalized_text):
+            if best is not None and rank >= best:
+                continue
+            if 2 * length / (text_length + length) >= _DETECT_THRESHOLD + 1e-9:
+                best = rank
+        return best
+
+    def _normalize_variations(self, variations: Iterable[str]) -> List[Tuple[str, str]]:
+        """Pair each keyword variation with its normalized form
+
+        Both are interned: variations repeat across keywords and categories, and
+        the normalized forms double as exact-index keys.
+        """
+        return [
+            (sys.intern(variation), sys.intern(self.normalize_arabic_text(variation)))
+            for variation in variations
+        ]
+
     def normalize_arabic_text(self, text: str) -> str:
         """Normalize Arabic text by removing diacritics and standardizing characters"""
         try:
-            # Remove diacritics
-            text = unicodedata.normalize('NFKD', text)
-            text = ''.join([c for c in text if not unicodedata.combining(c)])
-
-            # Standardize Arabic characters
-            replacements = {
-                'أ': 'ا', 'إ': 'ا', 'آ': 'ا', 'ة': 'ه',
-                'ى': 'ي', 'ؤ': 'و', 'ئ': 'ي'
-            }
-
-            for old, new in replacements.items():
-                text = text.replace(old, new)
-
-            return text.lower().strip()
+            return _normalize_arabic_text(text)
 
         except Exception as e:
             self.logger.error(f"Error normalizing Arabic text: {e}")
             return text.lower().strip()
 
     def levenshtein_distance(self, s1: str, s2: str) -> int:
-        """Calculate Levenshtein distance between two strings"""
+        """Calculate Levenshtein distance between two strings
+
+        Not used by the matcher itself (fuzzy scoring uses _sequence_ratio);
+        kept as public API.
+        """
         try:
+            if rapidfuzz_available:
+                return Levenshtein.distance(s1, s2)
+
             if len(s1) < len(s2):
                 return self.levenshtein_distance(s2, s1)
 
@@ -164,34 +322,43 @@ class KeywordManager:
             self.logger.error(f"Error calculating Levenshtein distance: {e}")
             return len(s1) + len(s2)
 
+    @staticmethod
+    def _sequence_ratio(s1: str, s2: str) -> float:
+        """Indel (LCS) similarity ratio of two strings, ``fuzz.ratio / 100``"""
+        if rapidfuzz_available:
+            return Indel.normalized_similarity(s1, s2)
+        total = len(s1) + len(s2)
+        if total == 0:
+            return 1.0
+        return 2 * _bitparallel_lcs(s1, s2) / total
+
     def fuzzy_match(self, text: str, keywords: List[str], threshold: float = 0.8) -> Optional[str]:
         """Find fuzzy match for text in keywords list"""
-        try:
-            normalized_text = self.normalize_arabic_text(text)
+        return self._fuzzy_match_normalized(
+            self.normalize_arabic_text(text), self._normalize_variations(keywords), threshold
+        )
 
+    def _fuzzy_match_normalized(self, normalized_text: str, keywords: List[Tuple[str, str]],
+                                threshold: float = 0.8) -> Optional[str]:
+        """Find fuzzy match for already-normalized text among (keyword, normalized keyword) pairs"""
+        try:
             best_match = None
             best_score = 0
 
-            for keyword in keywords:
-                normalized_keyword = self.normalize_arabic_text(keyword)
-
+            for keyword, normalized_keyword in keywords:
                 # Exact match
                 if normalized_text == normalized_keyword:
                     return keyword
 
-                # SequenceMatcher ratio
-                ratio = SequenceMatcher(None, normalized_text, normalized_keyword).ratio()
-
-                # Levenshtein distance
-                distance = self.levenshtein_distance(normalized_text, normalized_keyword)
-                max_len = max(len(normalized_text), len(normalized_keyword))
-                levenshtein_score = 1 - (distance / max_len) if max_len > 0 else 0
-
-                # Combined score
-                combined_score = (ratio + levenshtein_score) / 2
+                # Length gate: the LCS is at most the shorter string, so skip
+                # keywords whose ratio cannot reach the threshold
+                shorter, longer = sorted((len(normalized_text), len(normalized_keyword)))
+                if 2 * shorter / (shorter + longer) < threshold - 1e-9:
+                    continue
 
-                if combined_score > best_score and combined_score >= threshold:
-                    best_score = combined_score
+                score = self._sequence_ratio(normalized_text, normalized_keyword)
+                if score > best_score and score >= threshold:
+                    best_score = score
                     best_match = keyword
 
             return best_match
@@ -206,30 +373,43 @@ class KeywordManager:
             if not self._initialized:
                 self.initialize()
 
-            normalized_text = self.normalize_arabic_text(text)
-
-            # Check each category
-            for category, keywords_dict in self.keywords.items():
-                for _, variations in keywords_dict.items():
-                    if self.fuzzy_match(normalized_text, variations, threshold=0.7):
-                        return category
-
-            return None
+            return self._detect_normalized(self.normalize_arabic_text(text))
 
         except Exception as e:
             self.logger.error(f"Error detecting category: {e}")
             return None
 
-    def get_keywords_for_category(self, category: str) -> Dict[str, List[str]]:
-        """Get keywords for a specific category"""
-        return self.keywords.get(category, {})
+    def _detect_category_normalized(self, normalized_text: str) -> Optional[str]:
+        """Detect the category of already-normalized text (memoized via _detect_normalized)"""
+        # Exact variation match: a single lookup, no fuzzy scoring
+        exact = self._exact_index.get(normalized_text)
+        if exact is not None:
+            return exact[0]
+
+        # A long enough substring hit settles the scan at its category, so only
+        # the categories before it need fuzzy scoring
+        matched_rank = self._matched_category_rank(normalized_text)
+
+        # Check each category
+        for rank, (category, keywords_dict) in enumerate(self._normalized_keywords.items()):
+            if rank == matched_rank:
+                return category
+            for variations in keywords_dict.values():
+                if self._fuzzy_match_normalized(normalized_text, variations,
+                                                threshold=_DETECT_THRESHOLD):
+                    return category
+
+        return None
+
+    def get_keywords_for_category(self, category: str) -> Mapping[str, Tuple[str, ...]]:
+        """Get a read-only view of the keywords for a specific category"""
+        return self.keywords.get(category, _NO_KEYWORDS)
 
     def add_keywords(self, category: str, keywords: Dict[str, List[str]]) -> None:
         """Add keywords to a category"""
-        if category not in self.keywords:
-            self.keywords[category] = {}
-
-        self.keywords[category].update(keywords)
+        self._store_keywords(category, keywords)
+        self._build_automaton()
+        self._detect_normalized.cache_clear()
 
     def get_all_categories(self) -> List[str]:
         """Get all available categories"""
@@ -240,15 +420,19 @@ class KeywordManager:
         try:
             results: List[Tuple[str, str, float]] = []
             categories_to_search = [category] if category else self.keywords.keys()
+            normalized_query = self.normalize_arabic_text(query)
+            query_lower = query.lower()
 
             for cat in categories_to_search:
-                if cat not in self.keywords:
+                if cat not in self._normalized_keywords:
                     continue
 
-                for keyword, variations in self.keywords[cat].items():
-                    match = self.fuzzy_match(query, variations, threshold=0.6)
+                for keyword, variations in self._normalized_keywords[cat].items():
+                    match = self._fuzzy_match_normalized(
+                        normalized_query, variations, threshold=0.6
+                    )
                     if match:
-                        score = SequenceMatcher(None, query.lower(), match.lower()).ratio()
+                        score = self._sequence_ratio(query_lower, match.lower())
                         results.append((cat, keyword, score))
 
             # Sort by score
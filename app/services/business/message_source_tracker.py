@@ -1,26 +1,114 @@
+import copy
 import logging
-from typing import Dict, Optional, Any
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Any, Tuple
+from sqlalchemy import case, func
 from database import Message, MessageSource, PostType, Post, AdCampaign, MessageDirection
 from database.context import get_db_session
 from datetime import datetime, timedelta, timezone
 import json
 
+try:
+    import orjson
+    orjson_available = True
+except ImportError:
+    orjson = None
+    orjson_available = False
+
 logger = logging.getLogger(__name__)
 
+# Post/ad lookups repeat for every message referencing the same post or ad
+_INFO_CACHE_SIZE = 1024
+_INFO_CACHE_TTL = 300
+# Unknown ids are cached only briefly, posts and ads may be saved by another process
+_INFO_MISS_TTL = 5
+
+_MISSING = object()
+
+
+def _json_loads(text: str) -> Any:
+    """Decode a stored JSON column, with orjson when it is installed"""
+    if orjson_available:
+        return orjson.loads(text)
+    return json.loads(text)
+
+
+def _json_dumps(value: Any) -> str:
+    """Encode a value for a JSON column, with orjson when it is installed"""
+    if orjson_available:
+        return orjson.dumps(value, option=orjson.OPT_NON_STR_KEYS).decode()
+    return json.dumps(value)
+
+
+class _TTLCache:
+    """Thread-safe LRU cache whose entries expire ``ttl`` seconds after being stored
+
+    Values are deep-copied on the way out, so callers may mutate what they get.
+    """
+
+    def __init__(self, maxsize: int, ttl: float) -> None:
+        # key -> (expiry time, value)
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._maxsize = maxsize
+        self._ttl = ttl
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Any:
+        """Cached value for ``key``, or _MISSING if absent or expired"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return _MISSING
+            if time.monotonic() >= entry[0]:
+                del self._entries[key]
+                return _MISSING
+            self._entries.move_to_end(key)
+            value = entry[1]
+        return copy.deepcopy(value)
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        """Store a copy of ``value``, expiring after ``ttl`` seconds (default: the cache TTL)"""
+        expires_at = time.monotonic() + (self._ttl if ttl is None else ttl)
+        value = copy.deepcopy(value)
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            if len(self._entries) > self._maxsize:
+                self._entries.popitem(last=False)
+
+    def discard(self, key: str) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
 
 class MessageSourceTracker:
     def __init__(self) -> None:
-        pass
+        # Post/ad info by Facebook id (None for unknown ids, kept for
+        # _INFO_MISS_TTL seconds), refreshed on create
+        self._post_cache = _TTLCache(_INFO_CACHE_SIZE, _INFO_CACHE_TTL)
+        self._ad_cache = _TTLCache(_INFO_CACHE_SIZE, _INFO_CACHE_TTL)
 
     def detect_message_source(self, webhook_data: Dict[str, Any], psid: str) -> MessageSource:
         """Detect the source of incoming message"""
+        return self._source_from_scan(self._scan_webhook(webhook_data), psid)
+
+    def detect_source_and_post_data(self, webhook_data: Dict[str, Any],
+                                    psid: str) -> Tuple[MessageSource, Dict[str, Any]]:
+        """Detect the message source and extract post data from a single pass over the webhook"""
+        scan = self._scan_webhook(webhook_data)
+        return self._source_from_scan(scan, psid), scan["post_data"]
+
+    def _source_from_scan(self, scan: Dict[str, Any], psid: str) -> MessageSource:
+        """Message source from a _scan_webhook result"""
         try:
             # Check if message is from an ad
-            if self._is_from_ad(webhook_data):
+            if scan["is_ad"]:
                 return MessageSource.AD
 
             # Check if message is from a comment conversion
-            if self._is_from_comment(webhook_data):
+            if scan["is_comment"]:
                 return MessageSource.COMMENT
 
             # Check if user is existing customer
@@ -34,58 +122,65 @@ class MessageSourceTracker:
             logger.error(f"Error detecting message source: {e}")
             return MessageSource.DIRECT_MESSAGE
 
-    def _is_from_ad(self, webhook_data: Dict[str, Any]) -> bool:
-        """Check if message originated from an advertisement"""
+    def _scan_webhook(self, webhook_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Walk the webhook's messaging events once, collecting ad/comment flags and post data"""
+        is_ad = False
+        is_comment = False
         try:
+            post_data: Dict[str, Any] = {
+                "post_id": None,
+                "post_type": None,
+                "post_price": None,
+                "post_data": None,
+                "comment_id": None,
+                "ad_id": None
+            }
+
             for entry in webhook_data.get("entry", []):
                 for event in entry.get("messaging", []):
-                    # Check for ad referral data
+                    # Referral data: ad or comment source, post/comment/ad ids
                     if "referral" in event:
                         referral = event["referral"]
-                        if referral.get("source") == "ADS":
-                            return True
-
-                    # Check for ad_id in metadata
-                    if "message" in event and "ad_id" in event["message"]:
-                        return True
+                        source = referral.get("source")
+                        is_ad = is_ad or source == "ADS"
+                        is_comment = is_comment or source == "COMMENT"
+                        post_data["post_id"] = referral.get("ref")
+                        post_data["comment_id"] = referral.get("comment_id")
+                        post_data["ad_id"] = referral.get("ad_id")
 
-            return False
+                    # Message metadata: ad_id marks an ad, post_id a comment conversion
+                    if "message" in event:
+                        message = event["message"]
+                        is_ad = is_ad or "ad_id" in message
+                        is_comment = is_comment or "post_id" in message
+                        post_data["post_id"] = message.get("post_id")
+                        post_data["comment_id"] = message.get("comment_id")
+                        post_data["ad_id"] = message.get("ad_id")
 
         except Exception as e:
-            logger.error(f"Error checking ad source: {e}")
-            return False
-
-    def _is_from_comment(self, webhook_data: Dict[str, Any]) -> bool:
-        """Check if message originated from a comment"""
-        try:
-            for entry in webhook_data.get("entry", []):
-                for event in entry.get("messaging", []):
-                    # Check for comment referral
-                    if "referral" in event:
-                        referral = event["referral"]
-                        if referral.get("source") == "COMMENT":
-                            return True
+            logger.error(f"Error scanning webhook data: {e}")
+            post_data = {}
 
-                    # Check for post_id indicating comment conversion
-                    if "message" in event and "post_id" in event["message"]:
-                        return True
+        return {"is_ad": is_ad, "is_comment": is_comment, "post_data": post_data}
 
-            return False
+    def _is_from_ad(self, webhook_data: Dict[str, Any]) -> bool:
+        """Check if message originated from an advertisement"""
+        return self._scan_webhook(webhook_data)["is_ad"]
 
-        except Exception as e:
-            logger.error(f"Error checking comment source: {e}")
-            return False
+    def _is_from_comment(self, webhook_data: Dict[str, Any]) -> bool:
+        """Check if message originated from a comment"""
+        return self._scan_webhook(webhook_data)["is_comment"]
 
     def _is_existing_customer(self, psid: str) -> bool:
         """Check if user is an existing customer"""
         try:
             # Check if user has previous messages
             with get_db_session() as db:
-                # Query messages directly using user PSID
-                previous_messages = db.query(Message).filter(
+                # Query messages directly using user PSID; two rows are enough to decide
+                previous_messages = db.query(Message.id).filter(
                     Message.sender_id == psid,
                     Message.direction == MessageDirection.INBOUND
-                ).count()
+                ).limit(2).count()
 
                 return previous_messages > 1  # More than just the current message
 
@@ -95,74 +190,56 @@ class MessageSourceTracker:
 
     def extract_post_data(self, webhook_data: Dict[str, Any]) -> Dict[str, Any]:
         """Extract post-related data from webhook"""
-        try:
-            post_data = {
-                "post_id": None,
-                "post_type": None,
-                "post_price": None,
-                "post_data": None,
-                "comment_id": None,
-                "ad_id": None
-            }
-
-            for entry in webhook_data.get("entry", []):
-                for event in entry.get("messaging", []):
-                    # Extract referral data
-                    if "referral" in event:
-                        referral = event["referral"]
-                        post_data["post_id"] = referral.get("ref")
-                        post_data["comment_id"] = referral.get("comment_id")
-                        post_data["ad_id"] = referral.get("ad_id")
-
-                    # Extract message metadata
-                    if "message" in event:
-                        message = event["message"]
-                        post_data["post_id"] = message.get("post_id")
-                        post_data["comment_id"] = message.get("comment_id")
-                        post_data["ad_id"] = message.get("ad_id")
-
-            return post_data
-
-        except Exception as e:
-            logger.error(f"Error extracting post data: {e}")
-            return {}
+        return self._scan_webhook(webhook_data)["post_data"]
 
     def get_post_info(self, post_id: str) -> Optional[Dict[str, Any]]:
-        """Get post information from database"""
+        """Get post information from database (cached for _INFO_CACHE_TTL seconds)"""
+        cached = self._post_cache.get(post_id)
+        if cached is not _MISSING:
+            return cached
+
         try:
             with get_db_session() as db:
                 post = db.query(Post).filter(Post.facebook_post_id == post_id).first()
-                if post:
-                    return {
-                        "post_id": post.facebook_post_id,
-                        "post_type": post.post_type.value if post.post_type else None,
-                        "post_content": post.post_content,
-                        "post_price": post.post_price,
-                        "post_data": json.loads(post.post_data) if post.post_data else None,
-                        "created_at": post.created_at.isoformat()
-                    }
-                return None
+                info = {
+                    "post_id": post.facebook_post_id,
+                    "post_type": post.post_type.value if post.post_type else None,
+                    "post_content": post.post_content,
+                    "post_price": post.post_price,
+                    "post_data": _json_loads(post.post_data) if post.post_data else None,
+                    "created_at": post.created_at.isoformat()
+                } if post else None
+
+            self._post_cache.set(post_id, info, None if info else _INFO_MISS_TTL)
+            return info
 
         except Exception as e:
             logger.error(f"Error getting post info: {e}")
             return None
 
     def get_ad_info(self, ad_id: str) -> Optional[Dict[str, Any]]:
-        """Get ad campaign information from database"""
+        """Get ad campaign information from database (cached for _INFO_CACHE_TTL seconds)"""
+        cached = self._ad_cache.get(ad_id)
+        if cached is not _MISSING:
+            return cached
+
         try:
             with get_db_session() as db:
                 ad = db.query(AdCampaign).filter(AdCampaign.facebook_ad_id == ad_id).first()
-                if ad:
-                    return {
-                        "ad_id": ad.facebook_ad_id,
-                        "campaign_name": ad.campaign_name,
-                        "ad_content": ad.ad_content,
-                        "target_audience": json.loads(ad.target_audience) if ad.target_audience else None,
-                        "budget": ad.budget,
-                        "status": ad.status,
-                        "created_at": ad.created_at.isoformat()
-                    }
-                return None
+                info = {
+                    "ad_id": ad.facebook_ad_id,
+                    "campaign_name": ad.campaign_name,
+                    "ad_content": ad.ad_content,
+                    "target_audience": (
+                        _json_loads(ad.target_audience) if ad.target_audience else None
+                    ),
+                    "budget": ad.budget,
+                    "status": ad.status,
+                    "created_at": ad.created_at.isoformat()
+                } if ad else None
+
+            self._ad_cache.set(ad_id, info, None if info else _INFO_MISS_TTL)
+            return info
 
         except Exception as e:
             logger.error(f"Error getting ad info: {e}")
@@ -179,13 +256,14 @@ class MessageSourceTracker:
                     post_type=post_type,
                     post_content=content,
                     post_price=price,
-                    post_data=json.dumps(data) if data else None,
+                    post_data=_json_dumps(data) if data else None,
                     created_at=datetime.now(timezone.utc)
                 )
 
                 db.add(post)
                 db.commit()
                 db.refresh(post)
+                self._post_cache.discard(facebook_post_id)
 
                 logger.info(f"Created post record: {facebook_post_id}")
                 return post
@@ -204,7 +282,7 @@ class MessageSourceTracker:
                     facebook_ad_id=facebook_ad_id,
                     campaign_name=campaign_name,
                     ad_content=content,
-                    target_audience=json.dumps(target_audience) if target_audience else None,
+                    target_audience=_json_dumps(target_audience) if target_audience else None,
                     budget=budget,
                     created_at=datetime.now(timezone.utc)
                 )
@@ -212,6 +290,7 @@ class MessageSourceTracker:
                 db.add(ad)
                 db.commit()
                 db.refresh(ad)
+                self._ad_cache.discard(facebook_ad_id)
 
                 logger.info(f"Created ad campaign record: {facebook_ad_id}")
                 return ad
@@ -224,33 +303,37 @@ class MessageSourceTracker:
         """Get analytics for message sources"""
         try:
             with get_db_session() as db:
-                # Count messages by source
-                source_counts: Dict[str, int] = {}
-                for source in MessageSource:
-                    count = db.query(Message).filter(Message.message_source == source).count()
-                    source_counts[source.value] = count
+                # Count messages by source, overall and in the last 24 hours, in one
+                # GROUP BY; the groups (including messages without a source) add up
+                # to the total
+                yesterday = datetime.now(timezone.utc) - timedelta(days=1)
+                source_counts: Dict[str, int] = {source.value: 0 for source in MessageSource}
+                recent_by_source: Dict[str, int] = {source.value: 0 for source in MessageSource}
+                total_messages = 0
+                for source, count, recent in db.query(
+                    Message.message_source,
+                    func.count(),
+                    func.sum(case((Message.timestamp >= yesterday, 1), else_=0))
+                ).group_by(Message.message_source):
+                    total_messages += count
+                    if source is not None:
+                        source_counts[source.value] = count
+                        recent_by_source[source.value] = recent or 0
 
                 # Count messages by post type
-                post_type_counts: Dict[str, int] = {}
-                for post_type in PostType:
-                    count = db.query(Message).filter(Message.post_type == post_type).count()
-                    post_type_counts[post_type.value] = count
-
-                # Recent activity by source (last 24 hours)
-                yesterday = datetime.now(timezone.utc) - timedelta(days=1)
-                recent_by_source: Dict[str, int] = {}
-                for source in MessageSource:
-                    count = db.query(Message).filter(
-                        Message.message_source == source,
-                        Message.timestamp >= yesterday
-                    ).count()
-                    recent_by_source[source.value] = count
+                post_type_counts: Dict[str, int] = {post_type.value: 0 for post_type in PostType}
+                post_type_rows = db.query(Message.post_type, func.count()).group_by(
+                    Message.post_type
+                )
+                for post_type, count in post_type_rows:
+                    if post_type is not None:
+                        post_type_counts[post_type.value] = count
 
                 return {
                     "source_distribution": source_counts,
                     "post_type_distribution": post_type_counts,
                     "recent_activity": recent_by_source,
-                    "total_messages": db.query(Message).count()
+                    "total_messages": total_messages
                 }
 
         except Exception as e:
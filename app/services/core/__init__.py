@@ -11,6 +11,7 @@ This module provides:
 All other service modules depend on this core foundation.
 """
 
+from importlib import import_module
 from typing import TYPE_CHECKING, Any
 
 # Lazy imports for better performance
@@ -78,84 +79,50 @@ __all__ = [
 ]
 
 
+# Public name -> (submodule, attribute) that defines it
+_LAZY_IMPORTS = {
+    # Interfaces
+    "ServiceInterface": (".interfaces", "ServiceInterface"),
+    "AIServiceInterface": (".interfaces", "AIServiceInterface"),
+    "MessageServiceInterface": (".interfaces", "MessageServiceInterface"),
+    "APIServiceInterface": (".interfaces", "APIServiceInterface"),
+    "LeadServiceInterface": (".interfaces", "LeadServiceInterface"),
+    "ProductServiceInterface": (".interfaces", "ProductServiceInterface"),
+    "NotificationServiceInterface": (".interfaces", "NotificationServiceInterface"),
+    "AnalyticsServiceInterface": (".interfaces", "AnalyticsServiceInterface"),
+    "CacheServiceInterface": (".interfaces", "CacheServiceInterface"),
+    "SecurityServiceInterface": (".interfaces", "SecurityServiceInterface"),
+    "ConfigurationServiceInterface": (".interfaces", "ConfigurationServiceInterface"),
+    "LoggingServiceInterface": (".interfaces", "LoggingServiceInterface"),
+    "ServiceRegistryInterface": (".interfaces", "ServiceRegistryInterface"),
+    "ServiceFactoryInterface": (".interfaces", "ServiceFactoryInterface"),
+    "ServiceLifecycleInterface": (".interfaces", "ServiceLifecycleInterface"),
+    "ServiceHealth": (".interfaces", "ServiceHealth"),
+    "ServiceStatus": (".interfaces", "ServiceStatus"),
+    "ServiceConfig": (".interfaces", "ServiceConfig"),
+    # Base Classes
+    "BaseService": (".base_service", "BaseService"),
+    "DatabaseService": (".base_service", "DatabaseService"),
+    "APIService": (".base_service", "APIService"),
+    "MessageService": (".base_service", "MessageService"),
+    "BaseAIService": (".base_service", "AIService"),
+    "LeadService": (".base_service", "LeadService"),
+    "ProductService": (".base_service", "ProductService"),
+    "ServiceState": (".base_service", "ServiceState"),
+}
+
+
 def __getattr__(name: str) -> Any:
-    """Lazy import mechanism for better performance."""
-    if name in __all__:
-        # Import from interfaces
-        if name in [
-            "ServiceInterface", "AIServiceInterface", "MessageServiceInterface",
-            "APIServiceInterface", "LeadServiceInterface", "ProductServiceInterface",
-            "NotificationServiceInterface", "AnalyticsServiceInterface",
-            "CacheServiceInterface", "SecurityServiceInterface",
-            "ConfigurationServiceInterface", "LoggingServiceInterface",
-            "ServiceRegistryInterface", "ServiceFactoryInterface",
-            "ServiceLifecycleInterface", "ServiceHealth", "ServiceStatus", "ServiceConfig"
-        ]:
-            from .interfaces import (
-                ServiceInterface,
-                AIServiceInterface,
-                MessageServiceInterface,
-                APIServiceInterface,
-                LeadServiceInterface,
-                ProductServiceInterface,
-                NotificationServiceInterface,
-                AnalyticsServiceInterface,
-                CacheServiceInterface,
-                SecurityServiceInterface,
-                ConfigurationServiceInterface,
-                LoggingServiceInterface,
-                ServiceRegistryInterface,
-                ServiceFactoryInterface,
-                ServiceLifecycleInterface,
-                ServiceHealth,
-                ServiceStatus,
-                ServiceConfig,
-            )
-            return {
-                "ServiceInterface": ServiceInterface,
-                "AIServiceInterface": AIServiceInterface,
-                "MessageServiceInterface": MessageServiceInterface,
-                "APIServiceInterface": APIServiceInterface,
-                "LeadServiceInterface": LeadServiceInterface,
-                "ProductServiceInterface": ProductServiceInterface,
-                "NotificationServiceInterface": NotificationServiceInterface,
-                "AnalyticsServiceInterface": AnalyticsServiceInterface,
-                "CacheServiceInterface": CacheServiceInterface,
-                "SecurityServiceInterface": SecurityServiceInterface,
-                "ConfigurationServiceInterface": ConfigurationServiceInterface,
-                "LoggingServiceInterface": LoggingServiceInterface,
-                "ServiceRegistryInterface": ServiceRegistryInterface,
-                "ServiceFactoryInterface": ServiceFactoryInterface,
-                "ServiceLifecycleInterface": ServiceLifecycleInterface,
-                "ServiceHealth": ServiceHealth,
-                "ServiceStatus": ServiceStatus,
-                "ServiceConfig": ServiceConfig,
-            }[name]
+    """Lazy import mechanism for better performance.
 
-        # Import from base_service
-        if name in [
-            "BaseService", "DatabaseService", "APIService", "MessageService",
-            "BaseAIService", "LeadService", "ProductService", "ServiceState"
-        ]:
-            from .base_service import (
-                BaseService,
-                DatabaseService,
-                APIService,
-                MessageService,
-                AIService as BaseAIService,
-                LeadService,
-                ProductService,
-                ServiceState,
-            )
-            return {
-                "BaseService": BaseService,
-                "DatabaseService": DatabaseService,
-                "APIService": APIService,
-                "MessageService": MessageService,
-                "BaseAIService": BaseAIService,
-                "LeadService": LeadService,
-                "ProductService": ProductService,
-                "ServiceState": ServiceState,
-            }[name]
+    Only the submodule defining ``name`` is imported, and the resolved object is
+    stored in the module globals, so later lookups bypass this hook entirely.
+    """
+    try:
+        module_name, attribute = _LAZY_IMPORTS[name]
+    except KeyError:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}") from None
 
-    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(import_module(module_name, __name__), attribute)
+    globals()[name] = value
+    return value
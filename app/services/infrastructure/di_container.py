@@ -34,6 +34,7 @@ class ServiceRegistration:
     scope: ServiceScope = ServiceScope.SINGLETON
     config: Optional[ServiceConfig] = None
     dependencies: Optional[List[str]] = None
+    implementation_factory: Optional[Callable[[], Type[ServiceInterface]]] = None
 
 
 class DependencyInjectionContainer:
@@ -48,44 +49,57 @@ class DependencyInjectionContainer:
     def register_singleton(self, name: str, service_type: Type[T],
                            implementation: Optional[Type[T]] = None,
                            factory: Optional[Callable[[], T]] = None,
-                           config: Optional[ServiceConfig] = None) -> 'DependencyInjectionContainer':
+                           config: Optional[ServiceConfig] = None,
+                           implementation_factory: Optional[Callable[[], Type[T]]] = None
+                           ) -> 'DependencyInjectionContainer':
         """Register singleton service"""
         return self._register_service(name, service_type, implementation, factory,
-                                      ServiceScope.SINGLETON, config)
+                                      ServiceScope.SINGLETON, config, implementation_factory)
 
     def register_transient(self, name: str, service_type: Type[T],
                            implementation: Optional[Type[T]] = None,
                            factory: Optional[Callable[[], T]] = None,
-                           config: Optional[ServiceConfig] = None) -> 'DependencyInjectionContainer':
+                           config: Optional[ServiceConfig] = None,
+                           implementation_factory: Optional[Callable[[], Type[T]]] = None
+                           ) -> 'DependencyInjectionContainer':
         """Register transient service"""
         return self._register_service(name, service_type, implementation, factory,
-                                      ServiceScope.TRANSIENT, config)
+                                      ServiceScope.TRANSIENT, config, implementation_factory)
 
     def register_scoped(self, name: str, service_type: Type[T],
                         implementation: Optional[Type[T]] = None,
                         factory: Optional[Callable[[], T]] = None,
-                        config: Optional[ServiceConfig] = None) -> 'DependencyInjectionContainer':
+                        config: Optional[ServiceConfig] = None,
+                        implementation_factory: Optional[Callable[[], Type[T]]] = None
+                        ) -> 'DependencyInjectionContainer':
         """Register scoped service"""
         return self._register_service(name, service_type, implementation, factory,
-                                      ServiceScope.SCOPED, config)
+                                      ServiceScope.SCOPED, config, implementation_factory)
 
     def _register_service(self, name: str, service_type: Type[T],
                           implementation: Optional[Type[T]] = None,
                           factory: Optional[Callable[[], T]] = None,
                           scope: ServiceScope = ServiceScope.SINGLETON,
-                          config: Optional[ServiceConfig] = None) -> 'DependencyInjectionContainer':
+                          config: Optional[ServiceConfig] = None,
+                          implementation_factory: Optional[Callable[[], Type[T]]] = None
+                          ) -> 'DependencyInjectionContainer':
         """Internal service registration"""
         with self._lock:
             if name in self._services:
                 self._logger.warning(f"Service '{name}' is already registered. Overwriting.")
 
+            # With an implementation factory the class is resolved on first use instead
+            if implementation is None and implementation_factory is None:
+                implementation = service_type
+
             self._services[name] = ServiceRegistration(
                 service_type=service_type,
-                implementation=implementation or service_type,
+                implementation=implementation,
                 factory=factory,
                 scope=scope,
                 config=config,
-                dependencies=[]
+                dependencies=[],
+                implementation_factory=implementation_factory
             )
 
             self._logger.info(f"Registered service '{name}' with scope '{scope.value}'")
@@ -130,12 +144,19 @@ class DependencyInjectionContainer:
                         return service  # Type-safe: verified by isinstance
             return None
 
+    def _resolve_implementation(self, registration: ServiceRegistration
+                                ) -> Optional[Type[ServiceInterface]]:
+        """Resolve the implementation class, importing it lazily on first use"""
+        if registration.implementation is None and registration.implementation_factory is not None:
+            registration.implementation = registration.implementation_factory()
+        return registration.implementation
+
     def _create_service_instance(self, registration: ServiceRegistration) -> Optional[ServiceInterface]:
         """Create service instance"""
         try:
             if registration.factory:
                 instance = registration.factory()
-            elif registration.implementation:
+            elif self._resolve_implementation(registration):
                 # Resolve dependencies
                 dependencies = self._resolve_dependencies(registration)
                 instance = registration.implementation(**dependencies)
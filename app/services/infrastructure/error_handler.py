@@ -100,6 +100,7 @@ class CircuitBreaker:
         self.last_failure_time = None
         self.logger = logging.getLogger(f"{__name__}.CircuitBreaker.{name}")
         self._lock = threading.Lock()
+        self._trial_in_flight = False
 
     def call(self, func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
         """Execute function with circuit breaker protection"""
@@ -112,13 +113,37 @@ class CircuitBreaker:
                 else:
                     raise Exception(f"Circuit breaker '{self.name}' is OPEN")
 
-            try:
-                result = func(*args, **kwargs)
-                self._on_success()
-                return result
-            except self.config.expected_exception as e:
+            # While HALF_OPEN only one trial call may be in flight at a time
+            trial = self.state == CircuitBreakerState.HALF_OPEN
+            if trial:
+                if self._trial_in_flight:
+                    raise Exception(
+                        f"Circuit breaker '{self.name}' is HALF_OPEN (trial in progress)"
+                    )
+                self._trial_in_flight = True
+
+        # Run the call outside the lock so concurrent callers aren't serialized
+        try:
+            result = func(*args, **kwargs)
+        except self.config.expected_exception as e:
+            with self._lock:
+                self._end_trial(trial)
                 self._on_failure()
-                raise e
+            raise e
+        except BaseException:
+            with self._lock:
+                self._end_trial(trial)
+            raise
+
+        with self._lock:
+            self._end_trial(trial)
+            self._on_success()
+        return result
+
+    def _end_trial(self, trial: bool) -> None:
+        """Let the next HALF_OPEN trial through once this one has finished"""
+        if trial:
+            self._trial_in_flight = False
 
     def _should_attempt_reset(self) -> bool:
         """Check if circuit breaker should attempt reset"""
@@ -5,7 +5,7 @@ Professional service management and factory pattern implementation
 
 import logging
 import threading
-from typing import Dict, Any, Optional, Type, List, Callable, Set
+from typing import Dict, Any, Optional, Type, List, Callable, Set, Tuple
 from dataclasses import dataclass
 from enum import Enum
 
@@ -26,17 +26,18 @@ class ServicePriority(Enum):
     LOW = 4
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class ServiceDefinition:
-    """Service definition with metadata"""
+    """Service definition with metadata (immutable once registered)"""
     name: str
     service_type: Type[ServiceInterface]
     implementation: Optional[Type[ServiceInterface]] = None
     factory: Optional[Callable[[], ServiceInterface]] = None
+    implementation_factory: Optional[Callable[[], Type[ServiceInterface]]] = None
     scope: ServiceScope = ServiceScope.SINGLETON
     priority: ServicePriority = ServicePriority.NORMAL
     config: Optional[ServiceConfig] = None
-    dependencies: Optional[List[str]] = None
+    dependencies: Tuple[str, ...] = ()
     auto_start: bool = True
     health_check_interval: int = 30
     retry_count: int = 3
@@ -52,8 +53,9 @@ class ServiceRegistry(ServiceRegistryInterface):
         self._lock = threading.RLock()
         self._logger = logging.getLogger(__name__)
         self._container = DependencyInjectionContainer()
-        self._startup_order: List[str] = []
-        self._shutdown_order: List[str] = []
+        # Cached orderings, recomputed lazily after any registration change
+        self._startup_order: Optional[Tuple[str, ...]] = None
+        self._shutdown_order: Optional[Tuple[str, ...]] = None
 
     def register_service(self, name: str, service: ServiceInterface) -> None:
         """Register service instance"""
@@ -73,8 +75,8 @@ class ServiceRegistry(ServiceRegistryInterface):
             self._services[name] = definition
             self._instances[name] = service
 
-            # Update startup/shutdown order
-            self._update_service_order()
+            # Startup/shutdown order is recomputed on next access
+            self._invalidate_service_order()
 
             self._logger.info(f"Registered service instance '{name}'")
 
@@ -93,7 +95,8 @@ class ServiceRegistry(ServiceRegistryInterface):
                     definition.service_type,
                     definition.implementation,
                     definition.factory,
-                    definition.config
+                    definition.config,
+                    definition.implementation_factory
                 )
             elif definition.scope == ServiceScope.TRANSIENT:
                 self._container.register_transient(
@@ -101,7 +104,8 @@ class ServiceRegistry(ServiceRegistryInterface):
                     definition.service_type,
                     definition.implementation,
                     definition.factory,
-                    definition.config
+                    definition.config,
+                    definition.implementation_factory
                 )
             elif definition.scope == ServiceScope.SCOPED:
                 self._container.register_scoped(
@@ -109,11 +113,12 @@ class ServiceRegistry(ServiceRegistryInterface):
                     definition.service_type,
                     definition.implementation,
                     definition.factory,
-                    definition.config
+                    definition.config,
+                    definition.implementation_factory
                 )
 
-            # Update startup/shutdown order
-            self._update_service_order()
+            # Startup/shutdown order is recomputed on next access
+            self._invalidate_service_order()
 
             self._logger.info(f"Registered service definition '{definition.name}'")
 
@@ -159,8 +164,8 @@ class ServiceRegistry(ServiceRegistryInterface):
             # Remove definition
             del self._services[name]
 
-            # Update startup/shutdown order
-            self._update_service_order()
+            # Startup/shutdown order is recomputed on next access
+            self._invalidate_service_order()
 
             self._logger.info(f"Unregistered service '{name}'")
             return True
@@ -177,7 +182,7 @@ class ServiceRegistry(ServiceRegistryInterface):
                 return []
 
             definition = self._services[name]
-            return definition.dependencies or []
+            return list(definition.dependencies)
 
     def get_service_info(self, name: str) -> Optional[Dict[str, Any]]:
         """Get detailed service information"""
@@ -188,17 +193,20 @@ class ServiceRegistry(ServiceRegistryInterface):
             definition = self._services[name]
             instance = self._instances.get(name)
 
+            # Lazily-imported implementations are only known once an instance exists
+            implementation = definition.implementation or (type(instance) if instance else None)
+
             info: Dict[str, Any] = {
                 "name": name,
                 "service_type": definition.service_type.__name__,
-                "implementation": definition.implementation.__name__ if definition.implementation else None,
+                "implementation": implementation.__name__ if implementation else None,
                 "scope": definition.scope.value,
                 "priority": definition.priority.value,
                 "auto_start": definition.auto_start,
                 "health_check_interval": definition.health_check_interval,
                 "retry_count": definition.retry_count,
                 "timeout": definition.timeout,
-                "dependencies": definition.dependencies or [],
+                "dependencies": list(definition.dependencies),
                 "has_instance": name in self._instances,
                 "has_config": definition.config is not None
             }
@@ -221,20 +229,26 @@ class ServiceRegistry(ServiceRegistryInterface):
                     result[name] = info
             return result
 
+    def _invalidate_service_order(self) -> None:
+        """Drop cached orderings; they are rebuilt on next access"""
+        self._startup_order = None
+        self._shutdown_order = None
+
     def _update_service_order(self) -> None:
         """Update startup and shutdown order based on dependencies and priority"""
         # Create dependency graph
-        graph: Dict[str, List[str]] = {}
+        graph: Dict[str, Tuple[str, ...]] = {}
         for name, definition in self._services.items():
-            graph[name] = definition.dependencies or []
+            graph[name] = definition.dependencies
 
         # Topological sort for startup order
-        self._startup_order = self._topological_sort(graph)
+        startup_order = tuple(self._topological_sort(graph))
 
         # Reverse for shutdown order
-        self._shutdown_order = list(reversed(self._startup_order))
+        self._shutdown_order = startup_order[::-1]
+        self._startup_order = startup_order
 
-    def _topological_sort(self, graph: Dict[str, List[str]]) -> List[str]:
+    def _topological_sort(self, graph: Dict[str, Tuple[str, ...]]) -> List[str]:
         """Topological sort of service dependencies"""
         visited: Set[str] = set()
         temp_visited: Set[str] = set()
@@ -249,7 +263,7 @@ class ServiceRegistry(ServiceRegistryInterface):
             temp_visited.add(node)
 
             # Visit dependencies first
-            for dep in graph.get(node, []):
+            for dep in graph.get(node, ()):
                 if dep in self._services:  # Only visit registered services
                     visit(dep)
 
@@ -264,13 +278,19 @@ class ServiceRegistry(ServiceRegistryInterface):
 
         return result
 
-    def get_startup_order(self) -> List[str]:
+    def get_startup_order(self) -> Tuple[str, ...]:
         """Get service startup order"""
-        return self._startup_order.copy()
+        with self._lock:
+            if self._startup_order is None:
+                self._update_service_order()
+            return self._startup_order
 
-    def get_shutdown_order(self) -> List[str]:
+    def get_shutdown_order(self) -> Tuple[str, ...]:
         """Get service shutdown order"""
-        return self._shutdown_order.copy()
+        with self._lock:
+            if self._shutdown_order is None:
+                self._update_service_order()
+            return self._shutdown_order
 
 
 class ServiceFactory(ServiceFactoryInterface):
@@ -120,7 +120,7 @@ class MessageHandler(MessageService):
             # Check for recommendations request
             if self.product_recommender and any(keyword in message_text.lower() for keyword in ["توصيات", "اقتراحات", "recommendations", "suggest"]):
                 try:
-                    recommendations = await self.product_recommender.get_recommendations(str(user_id), message_text)
+                    recommendations = self.product_recommender.get_recommendations(str(user_id))
 
                     if recommendations.get("has_recommendations"):
                         response_parts = ["💡 توصيات مخصصة لك:\n"]
@@ -29,7 +29,9 @@ from database.models import (
 from database.engine import (
     get_engine,
     get_session,
+    get_writer_engine,
     create_all_tables,
+    create_missing_indexes,
     drop_all_tables,
     database_exists,
     get_database_path
@@ -45,6 +47,7 @@ from database.manager import (
 from database.context import (
     get_db_session,
     get_db_session_with_commit,
+    get_writer_db_session,
     DatabaseSessionManager,
     get_safe_session,
     execute_db_operation
@@ -78,7 +81,9 @@ __all__ = [
     # Engine
     "get_engine",
     "get_session",
+    "get_writer_engine",
     "create_all_tables",
+    "create_missing_indexes",
     "drop_all_tables",
     "database_exists",
     "get_database_path",
@@ -90,6 +95,7 @@ __all__ = [
     # Context
     "get_db_session",
     "get_db_session_with_commit",
+    "get_writer_db_session",
     "DatabaseSessionManager",
     "get_safe_session",
     "execute_db_operation",
@@ -4,6 +4,7 @@ BWW Assistant - Database Management CLI
 Professional database management utility
 """
 import argparse
+import sys
 import logging
 from pathlib import Path
 
@@ -16,6 +17,7 @@ logger = logging.getLogger(__name__)
 from database.scripts.rebuild import rebuild_database_cli
 from database.scripts.backup import backup_database_cli
 from database.scripts.health import health_check_cli
+from database.scripts.indexes import create_indexes_cli
 
 
 def show_banner():
@@ -38,12 +40,13 @@ Examples:
   %(prog)s backup           Create database backup
   %(prog)s health           Check database health
   %(prog)s stats            Show database statistics
+  %(prog)s indexes          Create indexes missing from an existing database
         """
     )
 
     parser.add_argument(
         "command",
-        choices=["rebuild", "backup", "health", "stats"],
+        choices=["rebuild", "backup", "health", "stats", "indexes"],
         help="Command to execute"
     )
 
@@ -73,6 +76,9 @@ Examples:
     elif args.command == "stats":
         success = health_check_cli()  # Stats are included in health check
 
+    elif args.command == "indexes":
+        success = create_indexes_cli()
+
     # Exit with appropriate code
     print()
     if success:
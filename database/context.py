@@ -8,7 +8,7 @@ from typing import Any, Callable, Generator
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import SQLAlchemyError
 
-from database.engine import get_session
+from database.engine import get_session, get_writer_session
 
 logger = logging.getLogger(__name__)
 
@@ -49,6 +49,33 @@ def get_db_session() -> Generator[Session, None, None]:
             session.close()
 
 
+@contextmanager
+def get_writer_db_session() -> Generator[Session, None, None]:
+    """
+    Context manager for sessions on the background writer connection
+
+    For commits made off the request thread; see get_writer_engine().
+
+    Yields:
+        Session: SQLAlchemy session
+    """
+    session = None
+
+    try:
+        session = get_writer_session()
+        yield session
+
+    except Exception as e:
+        if session:
+            session.rollback()
+        logger.error(f"Error in writer session: {e}", exc_info=True)
+        raise
+
+    finally:
+        if session:
+            session.close()
+
+
 @contextmanager
 def get_db_session_with_commit() -> Generator[Session, None, None]:
     """
@@ -4,7 +4,8 @@ SQLAlchemy engine and session management
 """
 import logging
 from pathlib import Path
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event, inspect
+from sqlalchemy.schema import CreateIndex
 from sqlalchemy.orm import sessionmaker, Session
 from sqlalchemy.pool import StaticPool
 
@@ -21,6 +22,12 @@ DATABASE_URL = f"sqlite:///{DATABASE_FILE}"
 _engine = None
 _SessionLocal = None
 
+# Engine and session factory with a connection of their own for background writers
+_writer_engine = None
+_WriterSessionLocal = None
+# Seconds a background writer waits for a request's write lock before failing
+WRITER_BUSY_TIMEOUT = 30
+
 
 def get_engine():
     """Get or create database engine (singleton)"""
@@ -77,6 +84,60 @@ def get_session() -> Session:
     return SessionLocal()
 
 
+def _enable_wal(dbapi_connection, connection_record):
+    """Switch the database file to WAL so the writer can commit while requests read"""
+    cursor = dbapi_connection.cursor()
+    try:
+        cursor.execute("PRAGMA journal_mode=WAL")
+    finally:
+        cursor.close()
+
+
+def get_writer_engine():
+    """
+    Get or create the engine background writers commit through (singleton)
+
+    Every session of the application engine shares one connection
+    (StaticPool), so a commit from a background thread would also commit, or
+    a rollback undo, whatever a request session has open on it. Background
+    writers use this engine instead: one connection of its own to the same
+    database file, with SQLite's file locking keeping the two apart.
+    """
+    global _writer_engine
+
+    if _writer_engine is None:
+        DATABASE_DIR.mkdir(parents=True, exist_ok=True)
+        _writer_engine = create_engine(
+            DATABASE_URL,
+            connect_args={"check_same_thread": False, "timeout": WRITER_BUSY_TIMEOUT},
+            pool_size=1,
+            max_overflow=0,
+            echo=False
+        )
+        event.listen(_writer_engine, "connect", _enable_wal)
+        logger.info("Database writer engine created successfully")
+
+    return _writer_engine
+
+
+def get_writer_session() -> Session:
+    """
+    Get a new session on the background writer connection
+
+    Returns:
+        Session: SQLAlchemy session object bound to get_writer_engine()
+    """
+    global _WriterSessionLocal
+
+    if _WriterSessionLocal is None:
+        _WriterSessionLocal = sessionmaker(
+            autocommit=False,
+            autoflush=False,
+            bind=get_writer_engine()
+        )
+    return _WriterSessionLocal()
+
+
 def create_all_tables():
     """
     Create all database tables
@@ -95,6 +156,37 @@ def create_all_tables():
         return False
 
 
+def create_missing_indexes(engine=None):
+    """
+    Create model indexes missing from existing tables
+
+    create_all() only adds indexes together with a new table, so indexes added
+    to models.py later never reach an existing database. This issues
+    CREATE INDEX IF NOT EXISTS for every index of every existing table, so it
+    is safe to run repeatedly.
+
+    Args:
+        engine: Engine to upgrade (defaults to the application engine)
+
+    Returns:
+        bool: True if successful, False otherwise
+    """
+    try:
+        engine = engine or get_engine()
+        with engine.begin() as conn:
+            existing_tables = set(inspect(conn).get_table_names())
+            for table in Base.metadata.sorted_tables:
+                if table.name not in existing_tables:
+                    continue
+                for index in table.indexes:
+                    conn.execute(CreateIndex(index, if_not_exists=True))
+        logger.info("✅ Database indexes are up to date")
+        return True
+    except Exception as e:
+        logger.error(f"❌ Error creating database indexes: {e}", exc_info=True)
+        return False
+
+
 def drop_all_tables():
     """
     Drop all database tables (DANGEROUS!)
@@ -115,7 +207,7 @@ def drop_all_tables():
 
 def close_engine():
     """Close database engine and dispose of connections"""
-    global _engine, _SessionLocal
+    global _engine, _SessionLocal, _writer_engine, _WriterSessionLocal
 
     if _engine is not None:
         logger.info("Closing database engine...")
@@ -124,6 +216,11 @@ def close_engine():
         _SessionLocal = None
         logger.info("Database engine closed")
 
+    if _writer_engine is not None:
+        _writer_engine.dispose()
+        _writer_engine = None
+        _WriterSessionLocal = None
+
 
 def get_database_path() -> Path:
     """Get the path to the database file"""
@@ -9,6 +9,7 @@ from sqlalchemy import text
 from database.engine import (
     get_engine,
     create_all_tables,
+    create_missing_indexes,
     drop_all_tables,
     get_database_path,
     database_exists
@@ -48,6 +49,8 @@ class DatabaseManager:
                 create_all_tables()
             else:
                 self.logger.info(f"Database exists at: {get_database_path()}")
+                # Bring indexes added since the database was created up to date
+                create_missing_indexes()
 
             # Test connection
             with engine.connect() as conn:
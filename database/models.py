@@ -3,7 +3,7 @@ Database Models Module
 SQLAlchemy ORM models for the application
 """
 from typing import Optional
-from sqlalchemy import String, Text, DateTime, Boolean, ForeignKey, Enum as SQLEnum
+from sqlalchemy import String, Text, DateTime, Boolean, ForeignKey, Index, Enum as SQLEnum
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship
 from datetime import datetime, timezone
 
@@ -27,6 +27,11 @@ class Base(DeclarativeBase):
 class User(Base):
     """User model - represents customers/leads"""
     __tablename__ = "users"
+    __table_args__ = (
+        # Serves stage filters ordered by score (lead listings) and the
+        # per-stage GROUP BY in lead analytics, which reads its prefix
+        Index("ix_users_stage_score", "lead_stage", "lead_score"),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True, index=True)
     psid: Mapped[str] = mapped_column(String(50), unique=True, index=True)  # Page-Scoped ID
@@ -42,9 +47,11 @@ class User(Base):
 
     # Lead Management Fields
     lead_stage: Mapped[LeadStage] = mapped_column(SQLEnum(LeadStage), default=LeadStage.INTAKE)
-    customer_label: Mapped[Optional[CustomerLabel]] = mapped_column(SQLEnum(CustomerLabel))
-    customer_type: Mapped[Optional[CustomerType]] = mapped_column(SQLEnum(CustomerType))
-    lead_score: Mapped[int] = mapped_column(default=0)
+    customer_label: Mapped[Optional[CustomerLabel]] = mapped_column(
+        SQLEnum(CustomerLabel), index=True
+    )
+    customer_type: Mapped[Optional[CustomerType]] = mapped_column(SQLEnum(CustomerType), index=True)
+    lead_score: Mapped[int] = mapped_column(default=0, index=True)
     last_stage_change: Mapped[datetime] = mapped_column(DateTime, default=lambda: datetime.now(timezone.utc))
 
     # Relationships
@@ -55,6 +62,12 @@ class User(Base):
 class Message(Base):
     """Message model - stores all messages"""
     __tablename__ = "messages"
+    __table_args__ = (
+        # Serves per-user history lookups ordered by recency
+        Index("ix_messages_user_direction_timestamp", "user_id", "direction", "timestamp"),
+        # Serves returning-customer checks by sender PSID
+        Index("ix_messages_sender_direction", "sender_id", "direction"),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True, index=True)
     user_id: Mapped[int] = mapped_column(ForeignKey("users.id"))
@@ -108,7 +121,10 @@ class LeadActivity(Base):
     old_value: Mapped[Optional[str]] = mapped_column(String(100))
     new_value: Mapped[Optional[str]] = mapped_column(String(100))
     reason: Mapped[Optional[str]] = mapped_column(Text)
-    timestamp: Mapped[datetime] = mapped_column(DateTime, default=lambda: datetime.now(timezone.utc))
+    # Indexed for recent-activity feeds
+    timestamp: Mapped[datetime] = mapped_column(
+        DateTime, default=lambda: datetime.now(timezone.utc), index=True
+    )
     automated: Mapped[bool] = mapped_column(Boolean, default=False)
 
     # Relationships
@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+"""
+Database Index Upgrade Script
+Create indexes added to the models since the database was built
+"""
+import sys
+import logging
+
+from database.engine import get_database_path, database_exists, create_missing_indexes
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+
+def create_indexes_cli():
+    """Create missing database indexes from command line (safe to re-run)"""
+    logger.info("=" * 60)
+    logger.info("🗂️  BWW Assistant - Database Index Upgrade")
+    logger.info("=" * 60)
+
+    # Check if database exists
+    db_path = get_database_path()
+    if not database_exists():
+        logger.error(f"\n❌ Database not found at: {db_path}")
+        logger.info("\n💡 Run rebuild script to create database:")
+        logger.info("   python database/scripts/rebuild.py")
+        return False
+
+    logger.info(f"\n📁 Database: {db_path}")
+    logger.info("\n🔨 Creating missing indexes...")
+
+    if create_missing_indexes():
+        logger.info("\n✅ Index upgrade completed successfully!")
+        return True
+    else:
+        logger.error("\n❌ Index upgrade failed")
+        return False
+
+
+if __name__ == "__main__":
+    success = create_indexes_cli()
+    sys.exit(0 if success else 1)
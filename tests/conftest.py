@@ -7,8 +7,9 @@ import pytest
 import os
 import sys
 import uuid
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Generator, Dict, Any, Callable
+from typing import Generator, Dict, Any, Callable, List, Tuple
 from sqlalchemy import create_engine, Engine
 from sqlalchemy.orm import sessionmaker, Session
 from fastapi.testclient import TestClient
@@ -55,6 +56,46 @@ def db_session(test_db_engine: Engine) -> Generator[Session, None, None]:
         session.close()
 
 
+@pytest.fixture(scope="function")
+def db_session_targets() -> List[Tuple[Any, str]]:
+    """(module, attribute) session context managers that session_factory redirects
+
+    Override in a test module to name the get_db_session-style functions the
+    code under test opens its sessions through.
+    """
+    return []
+
+
+@pytest.fixture(scope="function")
+def session_factory(
+    tmp_path: Path,
+    monkeypatch: pytest.MonkeyPatch,
+    db_session_targets: List[Tuple[Any, str]],
+) -> Generator[sessionmaker, None, None]:
+    """File-backed SQLite database shared by the test and the code under test
+
+    Unlike db_session, a file database can be opened from other threads and
+    connections. Every target in db_session_targets is patched to open its
+    sessions on it.
+    """
+    engine = create_engine(f"sqlite:///{tmp_path / 'test.db'}")
+    Base.metadata.create_all(bind=engine)
+    factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+    @contextmanager
+    def get_db_session() -> Generator[Session, None, None]:
+        session = factory()
+        try:
+            yield session
+        finally:
+            session.close()
+
+    for module, attribute in db_session_targets:
+        monkeypatch.setattr(module, attribute, get_db_session)
+    yield factory
+    engine.dispose()
+
+
 @pytest.fixture(scope="function")
 def client(test_db_engine: Engine) -> Generator[TestClient, None, None]:
     """Create FastAPI test client with test database"""
@@ -0,0 +1,152 @@
+"""
+Tests for the global service bootstrap accessors
+"""
+import threading
+import time
+
+import pytest
+
+from app.services import bootstrap as bootstrap_module
+
+
+@pytest.fixture(autouse=True)
+def reset_global_bootstrap():
+    """Start and finish every test without a global bootstrap instance"""
+    bootstrap_module.shutdown_services()
+    yield
+    bootstrap_module.shutdown_services()
+
+
+class TestGetServiceBootstrap:
+    """Test the global bootstrap singleton"""
+
+    def test_config_dir_does_not_create_second_instance(self, tmp_path):
+        """Test a later call with another config dir returns the same instance"""
+        first = bootstrap_module.get_service_bootstrap(str(tmp_path / "a"))
+        assert bootstrap_module.get_service_bootstrap() is first
+        assert bootstrap_module.get_service_bootstrap(str(tmp_path / "b")) is first
+        assert first.config_dir == tmp_path / "a"
+        assert not (tmp_path / "b").exists()
+
+    def test_concurrent_first_calls_build_one_instance(self, monkeypatch, tmp_path):
+        """Test racing first calls construct a single bootstrap"""
+        created = []
+
+        class SlowBootstrap:
+            def __init__(self, config_dir=None):
+                time.sleep(0.05)
+                self.config_dir = tmp_path
+                created.append(self)
+
+            def shutdown(self):
+                pass
+
+        monkeypatch.setattr(bootstrap_module, "ServiceBootstrap", SlowBootstrap)
+        results = []
+
+        def get_bootstrap():
+            results.append(bootstrap_module.get_service_bootstrap())
+
+        threads = [threading.Thread(target=get_bootstrap) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert len(created) == 1
+        assert all(result is created[0] for result in results)
+
+
+class TestShutdownServices:
+    """Test shutting down the global bootstrap"""
+
+    def test_shutdown_without_instance_creates_nothing(self, monkeypatch):
+        """Test shutdown does not build a bootstrap just to shut it down"""
+        def fail(*args, **kwargs):
+            raise AssertionError("bootstrap constructed during shutdown")
+
+        monkeypatch.setattr(bootstrap_module, "ServiceBootstrap", fail)
+        bootstrap_module.shutdown_services()
+
+    def test_shutdown_stops_existing_instance(self, tmp_path, monkeypatch):
+        """Test shutdown stops the instance created with a config dir"""
+        bootstrap = bootstrap_module.get_service_bootstrap(str(tmp_path))
+        calls = []
+        monkeypatch.setattr(bootstrap, "shutdown", lambda: calls.append(True))
+
+        bootstrap_module.shutdown_services()
+
+        assert calls == [True]
+        assert bootstrap_module._service_bootstrap is None
+
+
+class TestGetService:
+    """Test the memoized module-level service lookup"""
+
+    @staticmethod
+    def _stub_initialization(bootstrap, monkeypatch):
+        """Make initialize() publish a fresh service object each time it runs"""
+        def initialize_services():
+            bootstrap._initialized_services["keyword_manager"] = object()
+            bootstrap._service_caps["keyword_manager"] = 0
+            bootstrap._init_order.append("keyword_manager")
+            bootstrap._service_count = 1
+            return True
+
+        monkeypatch.setattr(bootstrap, "_prewarm_imports", lambda: None)
+        monkeypatch.setattr(bootstrap, "_initialize_core_components", lambda: True)
+        monkeypatch.setattr(bootstrap, "_register_service_definitions", lambda: True)
+        monkeypatch.setattr(bootstrap, "_initialize_services", initialize_services)
+
+    def test_reinitialize_serves_new_services(self, tmp_path, monkeypatch):
+        """Test instance shutdown and re-initialize drops memoized services"""
+        bootstrap = bootstrap_module.get_service_bootstrap(str(tmp_path))
+        self._stub_initialization(bootstrap, monkeypatch)
+
+        assert bootstrap.initialize()
+        first = bootstrap_module.get_service("keyword_manager")
+        assert first is not None
+        assert bootstrap_module.get_service("keyword_manager") is first
+
+        bootstrap.shutdown()
+        assert bootstrap_module.get_service("keyword_manager") is None
+
+        assert bootstrap.initialize()
+        second = bootstrap_module.get_service("keyword_manager")
+        assert second is not None
+        assert second is not first
+
+
+class TestHealthCheck:
+    """Test concurrent service health probes"""
+
+    def test_hung_probes_share_one_deadline(self, tmp_path, monkeypatch):
+        """Test slow probes are timed out together and not resubmitted while running"""
+        bootstrap = bootstrap_module.get_service_bootstrap(str(tmp_path))
+        release = threading.Event()
+        calls = []
+
+        class HungService:
+            def health_check(self):
+                calls.append(True)
+                release.wait()
+
+        names = ("first", "second", "third")
+        for name in names:
+            bootstrap._initialized_services[name] = HungService()
+            bootstrap._service_caps[name] = bootstrap_module._CAP_HEALTH_CHECK
+        bootstrap._startup_order = names
+        monkeypatch.setattr(bootstrap_module, "_HEALTH_PROBE_TIMEOUT", 0.1)
+
+        try:
+            started = time.monotonic()
+            report = bootstrap.health_check()
+            assert time.monotonic() - started < 0.3
+            assert report["unhealthy_services"] == 3
+            assert all(report["service_health"][name]["message"] == "Health check timed out"
+                       for name in names)
+
+            bootstrap.health_check()
+            assert len(calls) == 3
+        finally:
+            release.set()
@@ -0,0 +1,69 @@
+"""
+Tests for database engine helpers
+"""
+import pytest
+from sqlalchemy import create_engine, inspect, text
+
+from database.engine import create_missing_indexes
+from database.models import Base
+
+
+@pytest.fixture
+def engine(tmp_path):
+    """Fresh SQLite database with every table created"""
+    engine = create_engine(f"sqlite:///{tmp_path / 'indexes.db'}")
+    Base.metadata.create_all(bind=engine)
+    yield engine
+    engine.dispose()
+
+
+def _index_names(engine, table):
+    return {index["name"] for index in inspect(engine).get_indexes(table)}
+
+
+class TestCreateMissingIndexes:
+    """Test upgrading indexes on an existing database"""
+
+    def test_creates_indexes_dropped_from_existing_tables(self, engine):
+        """Test indexes absent from an older database are created"""
+        with engine.begin() as conn:
+            conn.execute(text("DROP INDEX ix_messages_user_direction_timestamp"))
+            conn.execute(text("DROP INDEX ix_users_stage_score"))
+
+        assert create_missing_indexes(engine)
+
+        assert "ix_messages_user_direction_timestamp" in _index_names(engine, "messages")
+        assert "ix_users_stage_score" in _index_names(engine, "users")
+
+    def test_is_idempotent(self, engine):
+        """Test running the upgrade repeatedly succeeds and changes nothing"""
+        before = _index_names(engine, "users")
+
+        assert create_missing_indexes(engine)
+        assert create_missing_indexes(engine)
+
+        assert _index_names(engine, "users") == before
+
+    def test_skips_missing_tables(self, engine):
+        """Test tables not created yet are left to create_all"""
+        with engine.begin() as conn:
+            conn.execute(text("DROP TABLE lead_activities"))
+
+        assert create_missing_indexes(engine)
+        assert not inspect(engine).has_table("lead_activities")
+
+
+class TestLeadIndexes:
+    """Test the indexes behind lead queries"""
+
+    def test_stage_filter_sorted_by_score_uses_composite_index(self, engine):
+        """Test the lead listing query (stage filter, score order) is served by one index"""
+        with engine.connect() as conn:
+            plan = conn.execute(text(
+                "EXPLAIN QUERY PLAN SELECT id FROM users WHERE lead_stage = 'QUALIFIED' "
+                "ORDER BY lead_score DESC"
+            )).all()
+
+        details = " ".join(row[-1] for row in plan)
+        assert "ix_users_stage_score" in details
+        assert "TEMP B-TREE" not in details
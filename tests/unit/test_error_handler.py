@@ -0,0 +1,86 @@
+"""
+Tests for the circuit breaker
+"""
+import threading
+
+import pytest
+
+from app.services.infrastructure.error_handler import (
+    CircuitBreaker, CircuitBreakerConfig, CircuitBreakerState
+)
+
+
+def _half_open_breaker(success_threshold=1):
+    """Open breaker whose recovery timeout has already elapsed"""
+    config = CircuitBreakerConfig(failure_threshold=1, recovery_timeout=0,
+                                  expected_exception=ValueError,
+                                  success_threshold=success_threshold)
+    breaker = CircuitBreaker("test", config)
+    breaker.state = CircuitBreakerState.OPEN
+    return breaker
+
+
+class TestHalfOpenTrial:
+    """Test trial calls while the breaker is recovering"""
+
+    def test_concurrent_callers_rejected_during_trial(self):
+        """Test only one call passes through while a HALF_OPEN trial is in flight"""
+        breaker = _half_open_breaker()
+        started = threading.Event()
+        release = threading.Event()
+        results = []
+
+        def slow_trial():
+            started.set()
+            release.wait(5)
+            return "trial"
+
+        thread = threading.Thread(target=lambda: results.append(breaker.call(slow_trial)))
+        thread.start()
+        assert started.wait(5)
+
+        with pytest.raises(Exception, match="HALF_OPEN"):
+            breaker.call(lambda: "second")
+
+        release.set()
+        thread.join()
+
+        assert results == ["trial"]
+        assert breaker.state == CircuitBreakerState.CLOSED
+        assert breaker.call(lambda: "after") == "after"
+
+    def test_next_trial_allowed_after_success(self):
+        """Test sequential trials proceed until the success threshold closes the breaker"""
+        breaker = _half_open_breaker(success_threshold=2)
+
+        assert breaker.call(lambda: 1) == 1
+        assert breaker.state == CircuitBreakerState.HALF_OPEN
+        assert breaker.call(lambda: 2) == 2
+        assert breaker.state == CircuitBreakerState.CLOSED
+
+    def test_failed_trial_reopens_and_frees_slot(self):
+        """Test a failing trial reopens the breaker and a later trial can run"""
+        breaker = _half_open_breaker()
+
+        def fail():
+            raise ValueError("still down")
+
+        with pytest.raises(ValueError):
+            breaker.call(fail)
+        assert breaker.state == CircuitBreakerState.OPEN
+
+        assert breaker.call(lambda: "recovered") == "recovered"
+        assert breaker.state == CircuitBreakerState.CLOSED
+
+    def test_unexpected_exception_frees_slot(self):
+        """Test an exception outside expected_exception still ends the trial"""
+        breaker = _half_open_breaker()
+
+        def crash():
+            raise KeyError("bug")
+
+        with pytest.raises(KeyError):
+            breaker.call(crash)
+        assert breaker.state == CircuitBreakerState.HALF_OPEN
+
+        assert breaker.call(lambda: "ok") == "ok"
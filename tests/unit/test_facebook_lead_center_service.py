@@ -0,0 +1,512 @@
+"""
+Tests for FacebookLeadCenterService lead write buffering
+"""
+import asyncio
+import threading
+import time
+from contextlib import contextmanager
+from unittest.mock import MagicMock
+
+import pytest
+from sqlalchemy import insert
+from sqlalchemy.exc import OperationalError
+
+from database import User, LeadActivity, LeadStage, CustomerType
+from app.services.business import facebook_lead_center_service as lead_center_module
+from app.services.business.facebook_lead_center_service import FacebookLeadCenterService
+
+
+@pytest.fixture
+def db_session_targets():
+    """Point the service's request and writer sessions at the session_factory database"""
+    return [
+        (lead_center_module, "get_db_session"),
+        (lead_center_module, "get_writer_db_session"),
+    ]
+
+
+@pytest.fixture
+def service(session_factory, monkeypatch):
+    """Lead center service with timed flushes disabled and no Graph API access"""
+    monkeypatch.setattr(lead_center_module, "MessengerService", MagicMock)
+    monkeypatch.setattr(lead_center_module, "_WRITE_FLUSH_SECONDS", 60)
+    monkeypatch.setattr(lead_center_module, "_SYNC_DEBOUNCE_SECONDS", 60)
+    monkeypatch.setattr(lead_center_module, "_analytics_cache", None)
+    lead_center = FacebookLeadCenterService()
+    monkeypatch.setattr(lead_center, "_fetch_form_leads", lambda: None)
+    yield lead_center
+    lead_center.shutdown()
+
+
+def _lead(lead_id, **fields):
+    """Graph API lead with one field_data entry per keyword argument"""
+    return {
+        "id": lead_id,
+        "field_data": [{"name": name, "values": [value]} for name, value in fields.items()],
+    }
+
+
+def _wait_for(condition, timeout=5.0):
+    """Poll ``condition`` until it holds or ``timeout`` seconds pass"""
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+def _add_user(session_factory, psid="lead_1", **columns):
+    """Insert a user and return its id"""
+    with session_factory() as db:
+        user = User(psid=psid, **columns)
+        db.add(user)
+        db.commit()
+        return user.id
+
+
+class TestLeadWriteBuffer:
+    """Test batched lead writes"""
+
+    def test_direct_update_is_not_overwritten_by_pending_flush(self, service, session_factory):
+        """Test a stage change committed by the caller survives an older buffered write"""
+        user_id = _add_user(session_factory, lead_stage=LeadStage.INTAKE, lead_score=0)
+
+        with session_factory() as db:
+            # Automation pass buffers its values first...
+            user = db.get(User, user_id)
+            automation_changes = {"lead_stage": LeadStage.QUALIFIED, "lead_score": 40}
+            service._queue_lead_writes(user, automation_changes, [])
+
+            # ...then a manual update lands and the caller commits it straight away
+            assert service.update_lead_stage(user, LeadStage.HOT, reason="Manual")
+            db.commit()
+
+        assert service.flush_lead_writes() == 1
+
+        with session_factory() as db:
+            user = db.get(User, user_id)
+            assert user.lead_stage == LeadStage.HOT
+            assert user.lead_score == 40
+
+    def test_classification_update_is_not_overwritten(self, service, session_factory):
+        """Test a customer type change survives an older buffered automation write"""
+        user_id = _add_user(session_factory)
+
+        with session_factory() as db:
+            user = db.get(User, user_id)
+            service._queue_lead_writes(user, {"customer_type": CustomerType.HESITANT_BUYER}, [])
+            assert service.update_customer_type(user, CustomerType.LOYAL_BUYER)
+            db.commit()
+
+        service.flush_lead_writes()
+
+        with session_factory() as db:
+            assert db.get(User, user_id).customer_type == CustomerType.LOYAL_BUYER
+
+    def test_unsaved_user_is_inserted_by_flush(self, service, session_factory):
+        """Test lead automation on a user without an id defers the insert to the flush"""
+        user = User(psid="new_lead", first_name="New")
+
+        result = service.process_lead_automation(user, "عايز اعرف السعر")
+
+        assert "error" not in result
+        assert user.id is None
+        with session_factory() as db:
+            assert db.query(User).filter(User.psid == "new_lead").count() == 0
+
+        assert service.flush_lead_writes() == 1
+
+        with session_factory() as db:
+            saved = db.query(User).filter(User.psid == "new_lead").one()
+            assert saved.first_name == "New"
+            assert saved.lead_score == user.lead_score
+            activities = db.query(LeadActivity).filter(LeadActivity.user_id == saved.id).count()
+            assert activities == len(result["activities_logged"])
+
+    def test_lone_write_is_persisted_within_bound(self, service, session_factory, monkeypatch):
+        """Test a single buffered write is committed once it has waited the flush interval"""
+        monkeypatch.setattr(lead_center_module, "_WRITE_FLUSH_SECONDS", 0.05)
+        user_id = _add_user(session_factory, lead_score=0)
+
+        with session_factory() as db:
+            service._queue_lead_writes(db.get(User, user_id), {"lead_score": 40}, [])
+
+        def persisted():
+            with session_factory() as db:
+                return db.get(User, user_id).lead_score == 40
+
+        assert _wait_for(persisted)
+        assert service._pending_since is None
+
+    def test_full_buffer_is_flushed_by_the_writer(self, service, session_factory, monkeypatch):
+        """Test the write reaching the row boundary is committed without the caller committing"""
+        monkeypatch.setattr(lead_center_module, "_WRITE_FLUSH_ROWS", 1)
+        user_id = _add_user(session_factory, lead_score=0)
+
+        with session_factory() as db:
+            user = db.get(User, user_id)
+            commits = []
+            real_commit = db.commit
+            monkeypatch.setattr(db, "commit", lambda: commits.append(True) or real_commit())
+
+            result = service.process_lead_automation(user, "عايز اعرف السعر")
+
+            assert result["lead_score_updated"]
+            assert commits == []
+
+        def persisted():
+            with session_factory() as db:
+                return db.query(LeadActivity).filter(LeadActivity.user_id == user_id).count() > 0
+
+        assert _wait_for(persisted)
+        with session_factory() as db:
+            assert db.get(User, user_id).lead_score == user.lead_score
+
+    def test_shutdown_stops_the_writer_and_flushes(self, service, session_factory):
+        """Test shutdown commits what is still buffered and ends the writer thread"""
+        user_id = _add_user(session_factory, lead_score=0)
+        with session_factory() as db:
+            service._queue_lead_writes(db.get(User, user_id), {"lead_score": 40}, [])
+        writer = service._writer
+
+        service.shutdown()
+
+        assert not writer.is_alive()
+        with session_factory() as db:
+            assert db.get(User, user_id).lead_score == 40
+
+
+class TestLeadWriteRetry:
+    """Test batches that fail to commit"""
+
+    @pytest.fixture
+    def failing_database(self, session_factory, monkeypatch):
+        """Make every writer session fail on execute while ``failing[0]`` is set"""
+        failing = [True]
+        real_get_db_session = lead_center_module.get_writer_db_session
+
+        @contextmanager
+        def get_writer_db_session():
+            with real_get_db_session() as db:
+                if failing[0]:
+                    error = OperationalError("UPDATE users", {}, Exception("database is locked"))
+                    monkeypatch.setattr(db, "execute", MagicMock(side_effect=error))
+                yield db
+
+        monkeypatch.setattr(lead_center_module, "get_writer_db_session", get_writer_db_session)
+        yield failing
+        failing[0] = False
+
+    def test_failed_batch_is_requeued(self, service, session_factory, failing_database):
+        """Test a failed commit stays buffered, with no extra retry thread, until a later flush"""
+        user_id = _add_user(session_factory, lead_score=0)
+        with session_factory() as db:
+            user = db.get(User, user_id)
+            activity = service._lead_activity_row(user, "lead_score_change", "0", "40", "Automated")
+            changes = {"lead_score": 40, "lead_stage": LeadStage.QUALIFIED}
+            service._queue_lead_writes(user, changes, [activity])
+
+        threads_before = threading.active_count()
+        assert service.flush_lead_writes() == 0
+        assert service._pending_user_writes[user_id]["lead_score"] == 40
+        assert service._pending_since is not None
+        assert threading.active_count() == threads_before
+
+        # A newer value buffered after the failure wins over the requeued one
+        with session_factory() as db:
+            service._queue_lead_writes(db.get(User, user_id), {"lead_score": 55}, [])
+
+        failing_database[0] = False
+        assert service.flush_lead_writes() == 1
+
+        with session_factory() as db:
+            user = db.get(User, user_id)
+            assert user.lead_score == 55
+            assert user.lead_stage == LeadStage.QUALIFIED
+            assert db.query(LeadActivity).filter(LeadActivity.user_id == user_id).count() == 1
+
+    def test_writer_retries_with_backoff(self, service, session_factory, failing_database,
+                                         monkeypatch):
+        """Test the writer retries a failed batch after growing delays until it commits"""
+        monkeypatch.setattr(lead_center_module, "_WRITE_FLUSH_SECONDS", 0.01)
+        monkeypatch.setattr(lead_center_module, "_WRITE_RETRY_SECONDS", 0.05)
+        user_id = _add_user(session_factory, lead_score=0)
+        with session_factory() as db:
+            service._queue_lead_writes(db.get(User, user_id), {"lead_score": 40}, [])
+
+        # Without backoff the writer would retry every 10ms; with it, 0.05s, 0.1s, 0.2s...
+        assert _wait_for(lambda: service._write_failures >= 1)
+        time.sleep(0.3)
+        assert 1 <= service._write_failures <= 5
+
+        failing_database[0] = False
+
+        def persisted():
+            with session_factory() as db:
+                return db.get(User, user_id).lead_score == 40
+
+        assert _wait_for(persisted)
+        assert _wait_for(lambda: service._write_failures == 0)
+
+    def test_requeued_writes_are_bounded(self, service, session_factory, failing_database,
+                                         monkeypatch):
+        """Test the buffer keeps only the newest rows while the database is down"""
+        monkeypatch.setattr(lead_center_module, "_MAX_PENDING_WRITES", 3)
+        user_id = _add_user(session_factory)
+        with session_factory() as db:
+            user = db.get(User, user_id)
+            rows = [service._lead_activity_row(user, "note", str(i), str(i), "test")
+                    for i in range(5)]
+            service._queue_lead_writes(user, {}, rows)
+
+        service.flush_lead_writes()
+
+        assert [row["old_value"] for row in service._pending_activity_rows] == ["2", "3", "4"]
+
+
+class TestAsyncWrappers:
+    """Test the async entry points used by routes"""
+
+    def test_blocking_work_runs_off_the_event_loop(self, service, monkeypatch):
+        """Test the webhook and full sync run in a worker thread, not the loop's"""
+        threads = []
+
+        def record(*args):
+            threads.append(threading.get_ident())
+            return {"processed_leads": 0}
+
+        monkeypatch.setattr(service, "process_leadgen_webhook", record)
+        monkeypatch.setattr(service, "sync_all_leads_to_facebook", record)
+
+        async def call_both():
+            await service.process_leadgen_webhook_async({"entry": []})
+            await service.sync_all_leads_to_facebook_async()
+            return threading.get_ident()
+
+        loop_thread = asyncio.run(call_both())
+
+        assert len(threads) == 2
+        assert loop_thread not in threads
+
+
+class TestLeadSyncDebounce:
+    """Test debounced Facebook syncs"""
+
+    @pytest.fixture
+    def synced(self, service, monkeypatch):
+        """Record form fetches and the custom fields synced per Facebook lead id"""
+        fetches = []
+        updates = {}
+
+        def fetch_form_leads():
+            fetches.append(True)
+            return {"form_1": [_lead("fb_1", psid="lead_1"), _lead("fb_2", phone="0100")]}
+
+        def update_lead_custom_fields(lead_id, custom_fields):
+            updates[lead_id] = custom_fields
+            return True
+
+        monkeypatch.setattr(service, "_fetch_form_leads", fetch_form_leads)
+        monkeypatch.setattr(service, "update_lead_custom_fields", update_lead_custom_fields)
+        return fetches, updates
+
+    def test_updates_are_coalesced_into_one_batch(self, service, synced):
+        """Test repeated updates to a lead sync once, with its latest data"""
+        fetches, updates = synced
+        first = User(psid="lead_1", lead_stage=LeadStage.INTAKE)
+        second = User(psid="lead_2", phone_number="0100")
+
+        service.queue_lead_sync(first)
+        first.lead_stage = LeadStage.HOT
+        service.queue_lead_sync(first)
+        service.queue_lead_sync(second)
+
+        assert service._sync_timer is not None
+        assert not fetches
+
+        assert service.flush_lead_syncs() == 2
+        assert len(fetches) == 1
+        assert updates["fb_1"]["lead_stage"] == LeadStage.HOT.value
+        assert "fb_2" in updates
+        assert service._sync_timer is None
+
+    def test_empty_flush_skips_fetch(self, service, synced):
+        """Test flushing with nothing queued makes no Graph API call"""
+        fetches, _ = synced
+
+        assert service.flush_lead_syncs() == 0
+        assert not fetches
+
+    def test_unavailable_forms_requeue_the_batch(self, service, monkeypatch):
+        """Test a failed form fetch keeps the queued syncs for a retry, newest data winning"""
+        monkeypatch.setattr(lead_center_module, "_SYNC_RETRY_SECONDS", 60)
+        lead = User(psid="lead_1", lead_stage=LeadStage.INTAKE)
+        service.queue_lead_sync(lead)
+
+        assert service.flush_lead_syncs() == 0
+        assert set(service._pending_syncs) == {"lead_1"}
+        assert service._sync_timer is not None
+
+        lead.lead_stage = LeadStage.HOT
+        service.queue_lead_sync(lead)
+        pending = service._pending_syncs["lead_1"]
+        assert pending["custom_fields"]["lead_stage"] == LeadStage.HOT.value
+
+    def test_shutdown_does_not_retry(self, service):
+        """Test syncs that cannot run at shutdown are dropped, not rescheduled"""
+        service.queue_lead_sync(User(psid="lead_1"))
+
+        service.shutdown()
+
+        assert service._pending_syncs == {}
+        assert service._sync_timer is None
+
+    def test_automation_reports_sync_as_queued(self, service):
+        """Test lead automation says the sync was queued, not that it happened"""
+        result = service.process_lead_automation(User(psid="lead_1"), "عايز اعرف السعر")
+
+        assert result["facebook_sync"] == "queued"
+        assert "facebook_sync" not in result["activities_logged"]
+        assert "lead_1" in service._pending_syncs
+
+
+class TestLeadIndex:
+    """Test lead lookup by PSID and phone number"""
+
+    def test_first_lead_across_forms_wins(self, service):
+        """Test the lead found first in form order is returned, as a scan would"""
+        index = service._index_leads({
+            "form_1": [_lead("fb_1", phone="0100"), _lead("fb_2", user_id="lead_1")],
+            "form_2": None,
+            "form_3": [_lead("fb_3", psid="lead_1", mobile="0200")],
+        })
+
+        assert service._find_lead(index, "lead_1", None)["id"] == "fb_2"
+        assert service._find_lead(index, "lead_1", "0100")["id"] == "fb_1"
+        assert service._find_lead(index, "lead_9", "0200")["id"] == "fb_3"
+
+    def test_unknown_lead_is_not_found(self, service):
+        """Test a PSID and phone missing from every form find nothing"""
+        index = service._index_leads({"form_1": [_lead("fb_1", psid="lead_1")]})
+
+        assert service._find_lead(index, "lead_2", "0300") is None
+        assert service._find_lead(index, "lead_2", None) is None
+
+
+class TestLeadgenWebhook:
+    """Test processing a batch of leads from a leadgen webhook"""
+
+    @staticmethod
+    def _webhook(*lead_ids):
+        changes = [{"field": "leadgen", "value": {"leadgen_id": lead_id}} for lead_id in lead_ids]
+        return {"entry": [{"changes": changes}]}
+
+    def test_batch_creates_and_updates_users(self, service, session_factory, monkeypatch):
+        """Test a webhook resolves new and existing users and logs one activity per lead"""
+        existing_id = _add_user(session_factory, psid="existing", phone_number="0100")
+        details = {
+            "fb_1": _lead("fb_1", psid="new_lead", full_name="Mona Ali"),
+            "fb_2": _lead("fb_2", phone="0100", first_name="Sara"),
+            # Same PSID as fb_1: must update the user created earlier in the batch
+            "fb_3": _lead("fb_3", psid="new_lead", phone="0111"),
+        }
+        monkeypatch.setattr(service, "get_lead_details_batch",
+                            lambda lead_ids: {lead_id: details[lead_id] for lead_id in lead_ids})
+
+        result = service.process_leadgen_webhook(self._webhook("fb_1", "fb_2", "fb_3"))
+
+        assert result["processed_leads"] == 3
+        assert result["created_users"] == 1
+        assert result["updated_users"] == 2
+        assert result["errors"] == []
+        with session_factory() as db:
+            new_user = db.query(User).filter(User.psid == "new_lead").one()
+            assert (new_user.first_name, new_user.last_name) == ("Mona", "Ali")
+            assert new_user.phone_number == "0111"
+            assert db.get(User, existing_id).first_name == "Sara"
+            assert db.query(LeadActivity).count() == 3
+
+    def test_failing_lead_rolls_back_alone(self, service, session_factory, monkeypatch):
+        """Test a lead that fails to insert does not undo the rest of the batch"""
+        _add_user(session_factory, psid="lead_fb_2")
+        details = {
+            "fb_1": _lead("fb_1", psid="good_lead"),
+            # No PSID or phone: inserted as "lead_fb_2", which already exists
+            "fb_2": _lead("fb_2", first_name="Clash"),
+        }
+        monkeypatch.setattr(service, "get_lead_details_batch",
+                            lambda lead_ids: {lead_id: details[lead_id] for lead_id in lead_ids})
+
+        result = service.process_leadgen_webhook(self._webhook("fb_1", "fb_2"))
+
+        assert result["created_users"] == 1
+        assert len(result["errors"]) == 1
+        with session_factory() as db:
+            assert db.query(User).filter(User.psid == "good_lead").count() == 1
+            assert db.query(LeadActivity).count() == 1
+
+    def test_activity_failure_rolls_back_whole_batch(self, service, session_factory,
+                                                     monkeypatch):
+        """Test users and activities are committed together or not at all"""
+        details = {"fb_1": _lead("fb_1", psid="new_lead")}
+        monkeypatch.setattr(service, "get_lead_details_batch",
+                            lambda lead_ids: {lead_id: details[lead_id] for lead_id in lead_ids})
+
+        def fail(*args, **kwargs):
+            raise RuntimeError("activity insert failed")
+
+        monkeypatch.setattr(service, "_lead_activity_row", fail)
+
+        result = service.process_leadgen_webhook(self._webhook("fb_1"))
+
+        assert "error" in result
+        with session_factory() as db:
+            assert db.query(User).filter(User.psid == "new_lead").count() == 0
+
+
+class TestLeadAnalytics:
+    """Test cached lead analytics"""
+
+    def test_cached_result_is_a_copy(self, service, session_factory):
+        """Test changing a returned result does not change later results"""
+        _add_user(session_factory, lead_stage=LeadStage.INTAKE)
+
+        first = service.get_lead_analytics()
+        first["stage_distribution"]["Intake"] = 99
+        first["total_users"] = 99
+
+        second = service.get_lead_analytics()
+        assert second["stage_distribution"]["Intake"] == 1
+        assert second["total_users"] == 1
+
+    def test_write_through_one_instance_invalidates_all(self, service, session_factory):
+        """Test a lead write through one service instance refreshes another's analytics"""
+        user_id = _add_user(session_factory, lead_stage=LeadStage.INTAKE)
+        other = FacebookLeadCenterService()
+        try:
+            assert other.get_lead_analytics()["stage_distribution"]["Hot"] == 0
+
+            with session_factory() as db:
+                assert service.update_lead_stage(db.get(User, user_id), LeadStage.HOT)
+                db.commit()
+
+            assert other.get_lead_analytics()["stage_distribution"]["Hot"] == 1
+        finally:
+            other.shutdown()
+
+
+class TestHealthCheck:
+    """Test the database health probe"""
+
+    def test_slow_database_probe_is_interrupted(self, service, session_factory, monkeypatch):
+        """Test the count query is cut off at the deadline and later queries still run"""
+        with session_factory() as db:
+            db.execute(insert(User), [{"psid": f"lead_{i}"} for i in range(2000)])
+            db.commit()
+
+        monkeypatch.setattr(lead_center_module, "_HEALTH_QUERY_TIMEOUT", -1)
+        assert service._check_database()["status"] == "error"
+
+        monkeypatch.setattr(lead_center_module, "_HEALTH_QUERY_TIMEOUT", 2.0)
+        assert service._check_database() == {"status": "healthy", "user_count": 2000}
@@ -0,0 +1,151 @@
+"""
+Tests for KeywordManager category detection
+"""
+import pytest
+
+from app.services.business import keyword_manager as keyword_manager_module
+from app.services.business.keyword_manager import KeywordManager
+
+
+@pytest.fixture(params=[False, True], ids=["fuzzy-scan", "ahocorasick"])
+def manager(request, monkeypatch):
+    """Initialized keyword manager with and without the substring automaton"""
+    if request.param and not keyword_manager_module.ahocorasick_available:
+        pytest.skip("pyahocorasick not installed")
+    monkeypatch.setattr(keyword_manager_module, "ahocorasick_available", request.param)
+    keyword_manager = KeywordManager()
+    keyword_manager.initialize()
+    return keyword_manager
+
+
+def _full_scan(manager, text):
+    """detect_category without the automaton: exact lookup, then every category in order"""
+    normalized_text = manager.normalize_arabic_text(text)
+    exact = manager._exact_index.get(normalized_text)
+    if exact is not None:
+        return exact[0]
+    for category, keywords_dict in manager._normalized_keywords.items():
+        for variations in keywords_dict.values():
+            if manager._fuzzy_match_normalized(normalized_text, variations, threshold=0.7):
+                return category
+    return None
+
+
+_MESSAGES = [
+    "مرحبا", "السلام عليكم", "صباح الخير يا جماعة", "مع السلامة", "شكرا جزيلا ليك",
+    "شكرا، بكام", "مرحبا، بكام القميص", "مرحبا عايز مقاس xl", "انا و ام محمد جينا",
+    "ال محل قريب من البيت", "اس ما يكون", "ام", "xl", "فستان سهرة احمر", "عايز فستان",
+    "عايز بنطلون جينز", "بكام الفستان ده", "حجم كبير", "فستن", "مقسات",
+    "how much is this", "where is your store", "thanks a lot!", "help me please", "",
+]
+
+
+class TestCategoryDetection:
+    """Test the automaton only shortens the fuzzy scan, never changes its answer"""
+
+    @pytest.mark.parametrize("text", _MESSAGES)
+    def test_matches_full_fuzzy_scan(self, manager, text):
+        """Test detection agrees with scoring every category in order"""
+        assert manager.detect_category(text) == _full_scan(manager, text)
+
+    def test_substring_hit_skips_later_categories(self, monkeypatch):
+        """Test categories after a certain substring hit are not fuzzy scored"""
+        if not keyword_manager_module.ahocorasick_available:
+            pytest.skip("pyahocorasick not installed")
+        keyword_manager = KeywordManager()
+        keyword_manager.initialize()
+        scored = []
+        real_fuzzy_match = keyword_manager._fuzzy_match_normalized
+
+        def fuzzy_match(normalized_text, variations, threshold=0.8):
+            scored.append(variations)
+            return real_fuzzy_match(normalized_text, variations, threshold)
+
+        monkeypatch.setattr(keyword_manager, "_fuzzy_match_normalized", fuzzy_match)
+
+        assert keyword_manager.detect_category("فستان سهرة احمر") == "products"
+        # Only greeting and help, the categories before products, were scored
+        keywords = keyword_manager._normalized_keywords
+        assert len(scored) == len(keywords["greeting"]) + len(keywords["help"])
+
+    def test_added_keywords_are_searched(self, manager):
+        """Test add_keywords rebuilds the automaton and clears cached detections"""
+        assert manager.detect_category("عايز شراب صوف") is None
+
+        manager.add_keywords("socks", {"شراب": ["شراب صوف"]})
+
+        assert manager.detect_category("عايز شراب صوف") == "socks"
+
+
+class TestReadOnlyKeywords:
+    """Test keywords can only change through add_keywords"""
+
+    def test_inner_keywords_are_read_only(self, manager):
+        """Test category mappings and variation lists cannot be edited in place"""
+        products = manager.get_keywords_for_category("products")
+
+        with pytest.raises(TypeError):
+            products["شراب"] = ("شراب",)
+        with pytest.raises(TypeError):
+            manager.keywords["products"]["شراب"] = ("شراب",)
+        with pytest.raises(AttributeError):
+            products["فستان"].append("شراب")
+        assert manager.get_keywords_for_category("missing") == {}
+
+    def test_caller_lists_are_copied(self, manager):
+        """Test editing a list passed to add_keywords does not reach the manager"""
+        variations = ["شراب صوف"]
+        manager.add_keywords("socks", {"شراب": variations})
+
+        variations.append("جوارب")
+
+        assert manager.get_keywords_for_category("socks")["شراب"] == ("شراب صوف",)
+        assert manager.detect_category("جوارب") is None
+
+
+@pytest.fixture(params=[True, False], ids=["rapidfuzz", "pure-python"])
+def scoring_manager(request, monkeypatch):
+    """Initialized keyword manager scoring with and without rapidfuzz"""
+    if request.param and not keyword_manager_module.rapidfuzz_available:
+        pytest.skip("rapidfuzz not installed")
+    monkeypatch.setattr(keyword_manager_module, "rapidfuzz_available", request.param)
+    keyword_manager = KeywordManager()
+    keyword_manager.initialize()
+    return keyword_manager
+
+
+class TestFuzzyScoring:
+    """Test the Indel similarity scores and thresholds used for fuzzy matching"""
+
+    def test_search_keywords_scores(self, scoring_manager):
+        """Test a query also returns keywords sharing most of its letters"""
+        results = scoring_manager.search_keywords("سعر")
+
+        assert [(category, keyword) for category, keyword, _ in results] == [
+            ("price", "سعر"), ("price", "عرض")
+        ]
+        assert results[0][2] == 1.0
+        assert results[1][2] == pytest.approx(2 / 3)
+
+    def test_ratio_matches_at_threshold(self, scoring_manager):
+        """Test a score equal to the threshold matches and anything stricter does not"""
+        assert scoring_manager._sequence_ratio("بنطل", "بنطلون") == pytest.approx(0.8)
+        assert scoring_manager.fuzzy_match("بنطل", ["بنطلون"], threshold=0.8) == "بنطلون"
+        assert scoring_manager.fuzzy_match("بنطل", ["بنطلون"], threshold=0.81) is None
+
+    @pytest.mark.parametrize("text, category", [
+        ("فستن", "products"),
+        ("مقسات", "size"),
+    ])
+    def test_misspelling_detected(self, scoring_manager, text, category):
+        """Test misspelled keywords still reach the 0.7 detection threshold"""
+        assert scoring_manager.detect_category(text) == category
+
+    @pytest.mark.parametrize("s1, s2, distance", [
+        ("kitten", "sitting", 3),
+        ("قميص", "قمسي", 2),
+        ("", "abc", 3),
+    ])
+    def test_levenshtein_distance(self, scoring_manager, s1, s2, distance):
+        """Test the public edit distance helper"""
+        assert scoring_manager.levenshtein_distance(s1, s2) == distance
@@ -0,0 +1,54 @@
+"""
+Tests for MessageSourceTracker post and ad lookups
+"""
+import json
+
+import pytest
+
+from database import Post, PostType
+from app.services.business import message_source_tracker as tracker_module
+from app.services.business.message_source_tracker import MessageSourceTracker
+
+
+@pytest.fixture
+def db_session_targets():
+    """Point the tracker's sessions at the session_factory database"""
+    return [(tracker_module, "get_db_session")]
+
+
+def _add_post(session_factory, post_id="post_1"):
+    """Insert a post with nested product data"""
+    with session_factory() as db:
+        db.add(Post(facebook_post_id=post_id, post_type=PostType.PRODUCT_POST,
+                    post_data=json.dumps({"sizes": ["M", "L"]})))
+        db.commit()
+
+
+class TestPostInfoCache:
+    """Test cached post lookups"""
+
+    def test_cached_info_is_not_shared(self, session_factory):
+        """Test mutating a returned post dict does not change later lookups"""
+        _add_post(session_factory)
+        tracker = MessageSourceTracker()
+
+        first = tracker.get_post_info("post_1")
+        first["post_content"] = "changed"
+        first["post_data"]["sizes"].append("XL")
+
+        second = tracker.get_post_info("post_1")
+        assert second["post_content"] is None
+        assert second["post_data"] == {"sizes": ["M", "L"]}
+
+    def test_miss_expires_quickly(self, session_factory, monkeypatch):
+        """Test an unknown post is looked up again once the short miss TTL passes"""
+        now = [1000.0]
+        monkeypatch.setattr(tracker_module.time, "monotonic", lambda: now[0])
+        tracker = MessageSourceTracker()
+
+        assert tracker.get_post_info("post_1") is None
+        _add_post(session_factory)
+        assert tracker.get_post_info("post_1") is None
+
+        now[0] += tracker_module._INFO_MISS_TTL
+        assert tracker.get_post_info("post_1")["post_id"] == "post_1"
@@ -0,0 +1,174 @@
+"""
+Tests for ProductRecommender preference tracking
+"""
+import asyncio
+import logging
+
+from app.services.ai.product_recommender import (
+    ProductRecommender,
+    _MAX_VIEWS,
+    _PREFS_IDLE_SECONDS,
+    _build_outfit,
+)
+
+
+def _product(category="فستان", color="أحمر", price=450):
+    """Build a viewed product"""
+    return {"category": category, "color": color, "price": price}
+
+
+class TestPreferenceTracking:
+    """Test in-process preference tracking"""
+
+    def test_track_and_recommend(self):
+        """Test tracked searches drive recommendations and status"""
+        recommender = ProductRecommender()
+        recommender.track_product_interest("user_1", "فستان سهرة", [_product(), _product()])
+
+        recommendations = recommender.get_recommendations("user_1")
+
+        assert recommendations["has_recommendations"]
+        assert recommendations["customer_profile"]["favorite_category"] == "فستان"
+        assert recommender.get_service_status()["tracked_customers"] == 1
+
+    def test_view_history_is_capped(self):
+        """Test viewed categories keep only the latest entries"""
+        recommender = ProductRecommender()
+        recommender.track_product_interest("user_1", "q", [_product()] * (_MAX_VIEWS + 10))
+
+        prefs = recommender.get_customer_preferences("user_1")
+
+        assert len(prefs.viewed_categories) == _MAX_VIEWS
+        assert len(prefs.price_range) == _MAX_VIEWS
+
+    def test_least_recent_customer_is_evicted(self):
+        """Test the store keeps at most max_customers users"""
+        recommender = ProductRecommender(max_customers=2)
+        for user_id in ("a", "b", "c"):
+            recommender.track_product_interest(user_id, "q", [_product()])
+
+        assert recommender.get_customer_preferences("a") is None
+        assert recommender.get_service_status()["tracked_customers"] == 2
+
+    def test_idle_customer_expires(self):
+        """Test preferences untouched for the idle period are dropped on read"""
+        recommender = ProductRecommender()
+        recommender.track_product_interest("user_1", "q", [_product()])
+        recommender.get_customer_preferences("user_1").last_seen -= _PREFS_IDLE_SECONDS + 1
+
+        assert recommender.get_customer_preferences("user_1") is None
+        assert not recommender.get_recommendations("user_1")["has_recommendations"]
+
+    def test_idle_customers_are_evicted_on_tracking(self):
+        """Test tracking drops every idle customer, not only when over capacity"""
+        recommender = ProductRecommender()
+        for user_id in ("a", "b", "c"):
+            recommender.track_product_interest(user_id, "q", [_product()])
+        for user_id in ("a", "b"):
+            recommender.customer_preferences[user_id].last_seen -= _PREFS_IDLE_SECONDS + 1
+
+        recommender.track_product_interest("d", "q", [_product()])
+
+        assert list(recommender.customer_preferences) == ["c", "d"]
+
+
+class TestSmartResponse:
+    """Test response generation with background tracking"""
+
+    def test_tracking_runs_after_response(self):
+        """Test the search is tracked once the response has been produced"""
+        recommender = ProductRecommender()
+
+        async def respond():
+            response = await recommender.generate_smart_response("user_1", "فستان", [_product()])
+            assert recommender.get_customer_preferences("user_1") is None
+            await asyncio.sleep(0)
+            return response
+
+        assert "1" in asyncio.run(respond())
+        assert recommender.get_customer_preferences("user_1").last_query == "فستان"
+
+    def test_tracking_failure_is_logged(self, monkeypatch, caplog):
+        """Test an exception in background tracking is logged by the recommender"""
+        recommender = ProductRecommender()
+
+        def fail(*args):
+            raise RuntimeError("tracking failed")
+
+        monkeypatch.setattr(recommender, "track_product_interest", fail)
+
+        async def respond():
+            await recommender.generate_smart_response("user_1", "فستان", [_product()])
+            await asyncio.sleep(0)
+
+        with caplog.at_level(logging.ERROR, logger="app.services.ai.product_recommender"):
+            asyncio.run(respond())
+
+        messages = [record.getMessage() for record in caplog.records
+                    if record.name == "app.services.ai.product_recommender"]
+        assert any("tracking failed" in message for message in messages)
+
+
+class TestOutfitSuggestions:
+    """Test cached outfit suggestions"""
+
+    def test_suggestions_are_not_shared_between_calls(self):
+        """Test mutating a returned suggestion does not leak into later calls"""
+        recommender = ProductRecommender()
+        first = recommender.suggest_outfit_combinations(_product(color="أحمر"))
+        first["suggestions"][0]["message"] = "changed"
+
+        second = recommender.suggest_outfit_combinations(_product(color="أحمر"))
+
+        assert second["suggestions"][0]["message"] != "changed"
+
+    def test_color_variants_share_one_cache_entry(self):
+        """Test spacing and case variants of a color normalize to one key"""
+        _build_outfit.cache_clear()
+        recommender = ProductRecommender()
+        for color in ("Navy Blue", " navy  blue ", "NAVY BLUE"):
+            product = _product(category="بنطلون", color=color)
+            result = recommender.suggest_outfit_combinations(product)
+            assert result["suggestions"][0]["search_query"] == "بلوزة navy blue"
+
+        assert _build_outfit.cache_info().currsize == 1
+
+
+class TestTrackMany:
+    """Test batched tracking"""
+
+    def test_malformed_event_is_skipped(self):
+        """Test a bad event mid-batch is skipped and the rest are applied"""
+        recommender = ProductRecommender()
+        events = [
+            ("user_1", "فستان", [_product()]),
+            ("user_2", "بنطلون", ["not a product"]),
+            ("user_3", "جاكيت", [_product(category="جاكيت")]),
+            ("user_4",),
+        ]
+
+        assert recommender.track_many(events) == 2
+
+        assert recommender.get_customer_preferences("user_1").search_count == 1
+        assert recommender.get_customer_preferences("user_2") is None
+        assert list(recommender.get_customer_preferences("user_3").viewed_categories) == ["جاكيت"]
+
+    def test_bad_price_does_not_skip_event(self):
+        """Test a non-numeric price is ignored without dropping the event"""
+        recommender = ProductRecommender()
+
+        assert recommender.track_many([("user_1", "q", [_product(price="n/a"), _product()])]) == 1
+        assert list(recommender.get_customer_preferences("user_1").price_range) == [450.0]
+
+    def test_unhashable_category_is_not_tracked(self):
+        """Test an unhashable category or color is dropped instead of breaking recommendations"""
+        recommender = ProductRecommender()
+
+        assert recommender.track_many([
+            ("user_1", "q", [_product(category=["فستان"], color={"name": "أحمر"}), _product()])
+        ]) == 1
+
+        prefs = recommender.get_customer_preferences("user_1")
+        assert list(prefs.viewed_categories) == ["فستان"]
+        assert list(prefs.viewed_colors) == ["أحمر"]
+        assert recommender.get_recommendations("user_1")["has_recommendations"]